@@ -1,28 +1,78 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-import tempfile
 import uvicorn
 import json
 import os
 import asyncio
 import base64
 from dotenv import load_dotenv
-from groq import Groq
 import logging
-from typing import Dict, List
-from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional, Union
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.routing import Match
 import io
 from datetime import datetime
 import uuid
+import time
+from contextlib import asynccontextmanager
+from model_gateway import DEFAULT_CHAT_MODEL, DEFAULT_STT_MODEL, ModelGateway
+from call_policy import FAST_CHAT_MODEL, FAST_STT_MODEL, CallPolicy, breakers
+from scheduler import (PRIORITY_BACKGROUND, PRIORITY_FEEDBACK, PRIORITY_INTERACTIVE, PRIORITY_VOICE, Scheduler,
+                       call_priority, call_session)
+from sentence_stream import SentenceSplitter
+from audio_frames import (AI_AUDIO, AUDIO_CHUNK, CODEC_MP3, CODEC_NAMES, CODEC_PCM16, CODEC_UNKNOWN,
+                          CODEC_WAV, FLAG_FINAL, FrameError, decode_frame, encode_frame)
+from audio_processing import (UtteranceSegmenter, VadConfig, decode_pcm16, encode_wav, guess_audio_filename,
+                              normalize_for_transcription)
+from audio_quality import AudioQualityMonitor, analyze_samples, unanalyzable_report
+from prescoring import LocalScorer
+from pronunciation import (DEFAULT_LEXICON_PATH, PronunciationLexicon, estimate_score, feedback_text,
+                           text_metrics, timing_metrics)
+from tts_cache import TTSCache
+from session_store import SessionStore, session_store_from_env
+from session_archive import SessionArchive
+from conversation import ConversationHistory
+from inbound_queue import AudioItem, InboundQueue
+from batching import MicroBatcher, numbered_items, parse_batch_results
+from result_cache import ResultCache
+from fanout import ENCODER, SendBuffer, dumps, message_timestamp
+from prompt_builder import PromptBuilder, PromptTemplate, estimate_tokens
+from question_bank import BankQuestion, QuestionBank
+from metrics import (HTTP_SECONDS, PROMPT_TOKENS, REGISTRY, TURN_SECONDS, Gauge, endpoint_label, part_label,
+                     part_name, stage)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Init app
-app = FastAPI(title="Real-time IELTS Voice Chat API")
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prewarm = asyncio.create_task(prewarm_tts_cache()) if TTS_CACHE_PREWARM else None
+    control_listener = asyncio.create_task(session_store.subscribe(handle_session_control))
+    send_watchdog = asyncio.create_task(manager.watch_send_buffers())
+    if session_archive is not None:
+        await session_archive.start()
+    if question_bank is not None:
+        question_bank.start()
+    yield
+    if prewarm is not None:
+        prewarm.cancel()
+    control_listener.cancel()
+    send_watchdog.cancel()
+    await session_store.close()
+    if session_archive is not None:
+        await session_archive.close()
+    if question_bank is not None:
+        await question_bank.close()
+    await tts_cache.flush()
+    await gateway.aclose()
+
+# Init app
+app = FastAPI(title="Real-time IELTS Voice Chat API", lifespan=lifespan)
+
 # CORS setup
 origins = [
     "http://localhost:3000",
@@ -40,284 +90,1211 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Admission priority of model calls made by REST endpoints (live voice turns come first)
+ENDPOINT_PRIORITIES = {
+    "/realtime-feedback": PRIORITY_FEEDBACK,
+    "/save-session": PRIORITY_BACKGROUND,
+}
+
+def request_session(request, path_params: dict) -> str:
+    """Key REST calls share the model budget by: the session (X-Session-Id, or a session_id path or
+    query parameter), else the client address, which behind a proxy is every user at once"""
+    session_id = (request.headers.get("x-session-id") or path_params.get("session_id")
+                  or request.query_params.get("session_id"))
+    if session_id:
+        return session_id
+    return request.client.host if request.client else ""
+
+def use_body_session(session_id: Optional[str]):
+    """Share the model budget by the session_id from a JSON body, when the request has one"""
+    if isinstance(session_id, str) and session_id:
+        call_session.set(session_id)
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """Label stage timings with the route and record REST request latency"""
+    # Unknown paths share one label, so stray URLs cannot add series without bound
+    endpoint = "unmatched"
+    path_params = {}
+    for route in app.router.routes:
+        match, child_scope = route.matches(request.scope)
+        if match == Match.FULL:
+            endpoint = route.path
+            path_params = child_scope.get("path_params", {})
+            break
+    endpoint_label.set(endpoint)
+    call_priority.set(ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_INTERACTIVE))
+    call_session.set(request_session(request, path_params))
+    start = time.perf_counter()
+    response = await call_next(request)
+    HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status=str(response.status_code))
+    return response
+
+# Every model call is admitted by the scheduler under per-model request and token budgets
+# (RATE_LIMIT_RPM / RATE_LIMIT_TPM, adapted from the provider's rate-limit headers)
+scheduler = Scheduler.from_env()
+
+# Groq model gateway (pooled async client shared by every model call)
+gateway = ModelGateway.from_env(scheduler)
+
+# Run independent turn stages concurrently (set to 0 for the old sequential order)
+TURN_PIPELINE = os.getenv("VOICE_TURN_PIPELINE", "1") != "0"
+
+# Server-side voice activity detection for PCM/WAV audio (set to 0 to transcribe every chunk)
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") != "0"
+vad_config = VadConfig.from_env()
+CODECS_BY_NAME = {name: code for code, name in CODEC_NAMES.items()}
+
+# Check level, clipping and noise of PCM/WAV audio streamed over the WebSocket and tell
+# the client when the verdict changes (set to 0 to turn off)
+AUDIO_QUALITY_MONITOR = os.getenv("AUDIO_QUALITY_MONITOR", "1") != "0"
+
+# Words that are often mispronounced, compiled once into a single-pass matcher
+pronunciation_lexicon = PronunciationLexicon.load(os.getenv("PRONUNCIATION_LEXICON", DEFAULT_LEXICON_PATH))
+
+# Convert WAV uploads to 16 kHz mono and trim silence before Whisper (set to 0 to upload as-is)
+TRANSCRIBE_NORMALIZE = os.getenv("TRANSCRIBE_NORMALIZE", "1") != "0"
+
+# Per-session inbound audio queue: chunks held while transcription catches up, and what
+# to do when it is full (drop_oldest, coalesce or reject with a "busy" message)
+INBOUND_AUDIO_QUEUE = int(os.getenv("INBOUND_AUDIO_QUEUE", "16"))
+INBOUND_OVERFLOW = os.getenv("INBOUND_OVERFLOW", "coalesce")
+# Largest chunk coalescing may build; past it the oldest chunk is dropped instead
+INBOUND_COALESCE_MAX_BYTES = int(float(os.getenv("INBOUND_COALESCE_MAX_KB", "1024")) * 1024)
+# Utterances a session may have waiting for transcription before its queue stops draining
+MAX_PENDING_TRANSCRIPTIONS = int(os.getenv("MAX_PENDING_TRANSCRIPTIONS", "2"))
+
+# WebSocket subprotocol for clients that send and receive audio as binary frames
+BINARY_AUDIO_SUBPROTOCOL = "ielts.audio.v1"
+
+INITIAL_GREETING = "Hello! Welcome to your IELTS Speaking practice session. Let's start with Part 1. Can you tell me your name and where you're from?"
+
+PART_INSTRUCTIONS = {
+    2: "Now let's move to Part 2. I'll give you a topic card. You'll have 1 minute to prepare and then speak for 1-2 minutes.",
+    3: "Finally, let's do Part 3. I'll ask you some more abstract questions for discussion."
+}
+
+EXAMINER_FALLBACK_RESPONSES = {
+    1: "That's interesting. Can you tell me more about that?",
+    2: "Take your time to prepare. Let me know when you're ready to start.",
+    3: "That's a good point. How do you think this might change in the future?"
+}
+
+# Examiner system prompts for the live session; the conversation follows as chat messages
+EXAMINER_SYSTEM_PROMPTS = {
+    1: """You are an IELTS Speaking examiner conducting Part 1. Ask short, personal questions about 
+    familiar topics like hometown, hobbies, work, study, daily routine. Keep responses natural and 
+    encouraging. Ask follow-up questions based on the candidate's answers.""",
+    
+    2: """You are an IELTS Speaking examiner conducting Part 2. Give the candidate a cue card topic 
+    and tell them they have 1 minute to prepare and 1-2 minutes to speak. Topics should be about 
+    describing a person, place, experience, or object.""",
+    
+    3: """You are an IELTS Speaking examiner conducting Part 3. Ask abstract, analytical questions 
+    related to the Part 2 topic. Focus on opinions, comparisons, predictions, and societal issues. 
+    Encourage detailed responses."""
+}
+
+# Instructions for /generate-examiner-response; the conversation comes after them in the
+# user message, so the system prompt is identical on every call for a part
+EXAMINER_REQUEST_PROMPTS = {
+    1: """You are an IELTS Speaking examiner conducting Part 1. Generate the next appropriate question or response. Keep it natural, encouraging, and ask follow-up questions about familiar topics like hobbies, hometown, work, study, daily routine, food, or family. Questions should be simple and direct, suitable for 20-30 second answers.
+
+If the candidate seems nervous, be more encouraging. If they give very short answers, ask follow-up questions. If they give detailed answers, acknowledge and move to a related topic.""",
+
+    2: """You are an IELTS Speaking examiner conducting Part 2. If this is the beginning of Part 2, give a cue card topic with bullet points. If the candidate is preparing, give encouragement. If they're speaking, listen and give minimal responses. Topics should be about describing a person, place, experience, or object.
+
+Example format: "Now I'd like you to describe [topic]. You have one minute to think about what you're going to say. You can make some notes if you wish. Here's your topic: Describe a [something]. You should say: - [bullet point 1] - [bullet point 2] - [bullet point 3] - and explain [why/how/what you felt]".""",
+
+    3: """You are an IELTS Speaking examiner conducting Part 3. Ask abstract, analytical questions that require longer responses. Focus on opinions, comparisons, predictions, and societal issues. Questions should be thought-provoking and related to broader themes from Part 2.
+
+Examples: "How do you think...", "What are the advantages and disadvantages of...", "Do you believe...", "How might this change in the future?", "What impact does... have on society?"."""
+}
+EXAMINER_REQUEST_TRANSCRIPT = """Based on this conversation:
+
+{conversation}
+
+Reply with the examiner's next turn only."""
+
+SUMMARY_PROMPT = PromptTemplate("""
+    Update the running summary of an IELTS Speaking practice session. In at most 5 sentences, keep
+    the topics covered, what the candidate said about themselves and which questions were already asked.
+    
+    Summary so far: {summary}
+    
+    New turns:
+    
+    {transcript}
+    """)
+
+# Examiner prompts are packed newest turn first into a token budget (PROMPT_BUDGET_<SITE>)
+examiner_prompts = PromptBuilder.from_env("examiner", EXAMINER_SYSTEM_PROMPTS, budget_tokens=1200)
+examiner_request_prompts = PromptBuilder.from_env(
+    "examiner-response", EXAMINER_REQUEST_PROMPTS, budget_tokens=1200, max_turns=6,
+    transcript=EXAMINER_REQUEST_TRANSCRIPT)
+
+# Context-free examiner turns (a Part 1 topic opener, the Part 2 cue card, a new Part 3
+# question) come from the question bank, pre-generated with these prompts; after
+# QUESTION_BANK_FOLLOW_UPS live follow-ups, Parts 1 and 3 move on to a bank question
+QUESTION_BANK_FOLLOW_UPS = int(os.getenv("QUESTION_BANK_FOLLOW_UPS", "2"))
+QUESTION_BANK_PROMPTS = {
+    1: PromptTemplate("""
+        Write {count} different IELTS Speaking Part 1 questions about {topic}. They should be short,
+        personal questions suitable for 20-30 second answers.
+        
+        Write one question per line, with no numbering or other text."""),
+    2: PromptTemplate("""
+        Write {count} different IELTS Speaking Part 2 cue cards on the theme of {topic}. Write each
+        card on one line in this format: Describe a [something]. You should say: - [bullet point 1]
+        - [bullet point 2] - [bullet point 3] - and explain [why/how/what you felt].
+        
+        Write one cue card per line, with no numbering or other text."""),
+    3: PromptTemplate("""
+        Write {count} different IELTS Speaking Part 3 questions on the theme of {topic}. They should
+        be abstract, analytical questions about opinions, comparisons, predictions or society that
+        need longer answers.
+        
+        Write one question per line, with no numbering or other text."""),
+}
+
+# Evaluation calls arriving within EVAL_BATCH_WINDOW_MS are scored together in one request
+# (up to EVAL_BATCH_MAX_ITEMS per request; set EVAL_BATCHING=0 for one request per answer)
+EVAL_BATCHING = os.getenv("EVAL_BATCHING", "1") != "0"
+EVAL_BATCH_WINDOW_MS = float(os.getenv("EVAL_BATCH_WINDOW_MS", "30"))
+EVAL_BATCH_MAX_ITEMS = int(os.getenv("EVAL_BATCH_MAX_ITEMS", "8"))
+
+# Local band estimate from the transcript, sent before the model's evaluation arrives
+# and used instead of it when Groq fails. REST evaluations wait at most
+# EVAL_DEADLINE_SECONDS for the model (0 = no limit) before answering with the local
+# estimate; the model call keeps running and its result is cached for a retry.
+PROVISIONAL_FEEDBACK = os.getenv("PROVISIONAL_FEEDBACK", "1") != "0"
+EVAL_DEADLINE_SECONDS = float(os.getenv("EVAL_DEADLINE_SECONDS", "5"))
+local_scorer = LocalScorer.load()
+
+# Results of identical REST requests (retries, double submits) are reused, and concurrent
+# duplicates share one model call; RESULT_CACHE_<ENDPOINT>_TTL / _MAX_ENTRIES per endpoint
+examiner_response_cache = ResultCache.from_env("examiner-response", ttl_seconds=60)
+quick_evaluate_cache = ResultCache.from_env("quick-evaluate")
+realtime_feedback_cache = ResultCache.from_env("realtime-feedback")
+
+# TTS cache for examiner audio; the static prompts above are synthesized at startup
+tts_cache = TTSCache.from_env()
+TTS_CACHE_PREWARM = os.getenv("TTS_CACHE_PREWARM", "1") != "0"
+TTS_MODEL = "tts-1"  # This might not exist in Groq yet
+TTS_VOICE = "alloy"
+
+# Latency budget (seconds) and routing per model call site. Slow calls are hedged after the
+# site's p95 latency, and while a model's circuit is open the site uses its fallback model
+# (MODEL_BUDGET_<SITE> overrides a budget, FAST_CHAT_MODEL / FAST_STT_MODEL the fallbacks)
+FAST_CHAT_MODEL = os.getenv("FAST_CHAT_MODEL", FAST_CHAT_MODEL)
+FAST_STT_MODEL = os.getenv("FAST_STT_MODEL", FAST_STT_MODEL)
+examiner_policy = CallPolicy.from_env("examiner", 6.0, DEFAULT_CHAT_MODEL, FAST_CHAT_MODEL)
+summary_policy = CallPolicy.from_env("summary", 15.0, DEFAULT_CHAT_MODEL, FAST_CHAT_MODEL, hedge=False)
+question_bank_policy = CallPolicy.from_env("question-bank", 30.0, DEFAULT_CHAT_MODEL, FAST_CHAT_MODEL, hedge=False)
+transcribe_policy = CallPolicy.from_env("transcribe", 10.0, DEFAULT_STT_MODEL, FAST_STT_MODEL)
+speech_policy = CallPolicy.from_env("speech", 8.0, TTS_MODEL, hedge=False)
+
+# Session state shared across workers (SESSION_STORE=memory or redis)
+session_store = session_store_from_env()
+
+# Ended and saved sessions are appended to a local SQLite archive (SESSION_ARCHIVE_PATH,
+# empty to disable); writes are queued and group-committed off the request path
+session_archive = SessionArchive.from_env()
+
+# Outgoing frames wait in a per-connection buffer; a client that lets SEND_BUFFER_FRAMES
+# pile up, or takes SEND_TIMEOUT_SECONDS over one frame, is disconnected
+SEND_BUFFER_FRAMES = int(os.getenv("SEND_BUFFER_FRAMES", "256"))
+SEND_TIMEOUT_SECONDS = float(os.getenv("SEND_TIMEOUT_SECONDS", "10"))
+SLOW_CONSUMER_CLOSE_CODE = 1013  # Try again later
 
 # Connection manager for WebSocket connections
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, store: SessionStore):
+        self.store = store
         self.active_connections: Dict[str, WebSocket] = {}
         self.user_sessions: Dict[str, dict] = {}
+        self.session_tasks: Dict[str, set] = {}
+        self.turn_locks: Dict[str, asyncio.Lock] = {}
+        self.turn_counters: Dict[str, int] = {}
+        self.reply_tasks: Dict[str, asyncio.Task] = {}
+        self.segmenters: Dict[str, UtteranceSegmenter] = {}
+        self.transcribe_slots: Dict[str, asyncio.Semaphore] = {}
+        self.inboxes: Dict[str, InboundQueue] = {}
+        self.quality_monitors: Dict[str, AudioQualityMonitor] = {}
+        self.send_buffers: Dict[str, SendBuffer] = {}
+        self.evictions: set = set()
+        self.evicted_count = 0
 
-    async def connect(self, websocket: WebSocket, session_id: str):
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, session_id: str, stream_replies: bool = False,
+                      binary_audio: bool = False, trace: bool = False):
+        await websocket.accept(subprotocol=BINARY_AUDIO_SUBPROTOCOL if binary_audio else None)
         self.active_connections[session_id] = websocket
+        self.attach_send_buffer(session_id, websocket)
         self.user_sessions[session_id] = {
             "connected_at": datetime.now(),
             "current_question": None,
-            "conversation_history": [],
+            "conversation_history": ConversationHistory.from_env(),
             "current_part": 1,
-            "question_count": 0
+            "question_count": 0,
+            "stream_replies": stream_replies,
+            "binary_audio": binary_audio,
+            "trace": trace,
+            # The greeting is the opening question: the next context-free turn opens a bank topic
+            "question_topic": None,
+            "follow_ups": QUESTION_BANK_FOLLOW_UPS,
+            "questions_asked": 0
         }
+        self.session_tasks[session_id] = set()
+        self.turn_locks[session_id] = asyncio.Lock()
+        self.transcribe_slots[session_id] = asyncio.Semaphore(MAX_PENDING_TRANSCRIPTIONS)
+        if VAD_ENABLED:
+            self.segmenters[session_id] = UtteranceSegmenter(vad_config)
+        if AUDIO_QUALITY_MONITOR:
+            self.quality_monitors[session_id] = AudioQualityMonitor()
+        await self.save_session(session_id)
         logger.info(f"User {session_id} connected")
 
-    def disconnect(self, session_id: str):
+    async def disconnect(self, session_id: str):
+        if session_id not in self.active_connections and session_id not in self.user_sessions:
+            return
         if session_id in self.active_connections:
             del self.active_connections[session_id]
+        buffer = self.send_buffers.pop(session_id, None)
+        if buffer is not None:
+            buffer.close()
         if session_id in self.user_sessions:
-            del self.user_sessions[session_id]
+            self.archive_session(session_id, self.user_sessions.pop(session_id))
+        # Cancel in-flight model calls for this session
+        for task in self.session_tasks.pop(session_id, set()):
+            task.cancel()
+        self.turn_locks.pop(session_id, None)
+        self.transcribe_slots.pop(session_id, None)
+        self.inboxes.pop(session_id, None)
+        self.quality_monitors.pop(session_id, None)
+        self.turn_counters.pop(session_id, None)
+        self.reply_tasks.pop(session_id, None)
+        segmenter = self.segmenters.pop(session_id, None)
+        if segmenter is not None and segmenter.chunks_received:
+            logger.info(f"VAD for session {session_id}: {segmenter.chunks_received} chunks -> "
+                        f"{segmenter.utterances_emitted} utterances ({segmenter.utterances_dropped} dropped as noise)")
+        try:
+            await self.store.delete(session_id)
+        except Exception as e:
+            logger.error(f"Session store delete failed for {session_id}: {e}")
         logger.info(f"User {session_id} disconnected")
 
+    def add_turn(self, session_id: str, session: dict, role: str, content: str):
+        """Append a turn to the session's history and queue it for the archive, which keeps
+        the whole transcript (the history only keeps a window of recent turns)"""
+        history = session["conversation_history"]
+        history.append(role, content)
+        if session_archive is not None:
+            session_archive.submit(session_id, "turn", {**history.recent[-1].to_dict(), "turn": len(history)})
+
+    def archive_session(self, session_id: str, session: dict):
+        """Queue the ended session's summary and progress for the archive (its turns are already there)"""
+        if session_archive is None:
+            return
+        history = session["conversation_history"]
+        session_archive.submit(session_id, "ended", {
+            "summary": history.summary,
+            "total_turns": len(history),
+            "current_part": session["current_part"],
+            "question_count": session["question_count"],
+            "connected_at": session["connected_at"].isoformat(),
+            "ended_at": datetime.now().isoformat(),
+        })
+
+    def attach_send_buffer(self, session_id: str, websocket: WebSocket):
+        buffer = SendBuffer(websocket, lambda reason: self.evict(session_id, reason),
+                            SEND_BUFFER_FRAMES, SEND_TIMEOUT_SECONDS)
+        buffer.start()
+        self.send_buffers[session_id] = buffer
+
+    def evict(self, session_id: str, reason: str):
+        """Disconnect a client that cannot keep up with what is sent to it"""
+        logger.warning(f"Evicting slow client {session_id}: {reason}")
+        self.evicted_count += 1
+        # Not a session task: disconnect cancels those
+        task = asyncio.create_task(self.close_session(session_id, SLOW_CONSUMER_CLOSE_CODE, flush=False))
+        self.evictions.add(task)
+        task.add_done_callback(self.evictions.discard)
+
+    async def close_session(self, session_id: str, code: int = 1000, flush: bool = True):
+        """Close the session's socket (if this worker holds it) and drop its state"""
+        websocket = self.active_connections.get(session_id)
+        buffer = self.send_buffers.get(session_id)
+        if buffer is not None and flush:
+            await buffer.flush()
+        if websocket is not None:
+            try:
+                # A stalled client can block the close frame as well
+                await asyncio.wait_for(websocket.close(code=code), SEND_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.warning(f"Closing socket for session {session_id} failed: {e}")
+        await self.disconnect(session_id)
+
+    async def save_session(self, session_id: str):
+        """Write a snapshot of the live session to the shared store"""
+        session = self.user_sessions.get(session_id)
+        if session is None:
+            return
+        try:
+            await self.store.save(session_id, session)
+        except Exception as e:
+            logger.error(f"Session store save failed for {session_id}: {e}")
+
+    def start_task(self, session_id: str, coro) -> asyncio.Task:
+        """Run work for a session in the background, cancelled on disconnect"""
+        task = asyncio.create_task(coro)
+        tasks = self.session_tasks.get(session_id)
+        if tasks is None:
+            task.cancel()
+            return task
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return task
+
+    def begin_turn(self, session_id: str) -> int:
+        """Register new candidate audio and cancel the reply still being produced for an older turn"""
+        turn_id = self.turn_counters.get(session_id, 0) + 1
+        self.turn_counters[session_id] = turn_id
+        reply_task = self.reply_tasks.pop(session_id, None)
+        if reply_task is not None:
+            reply_task.cancel()
+        return turn_id
+
+    def is_current_turn(self, session_id: str, turn_id: int) -> bool:
+        return self.turn_counters.get(session_id) == turn_id
+
     async def send_message(self, session_id: str, message: dict):
-        if session_id in self.active_connections:
-            await self.active_connections[session_id].send_text(json.dumps(message))
+        """Queue a message for the session's socket; it is written in order in the background"""
+        buffer = self.send_buffers.get(session_id)
+        if buffer is not None:
+            with stage("send"):
+                buffer.offer(dumps(message))
 
-    async def broadcast(self, message: dict):
-        for session_id in self.active_connections:
-            await self.send_message(session_id, message)
+    async def send_audio(self, session_id: str, audio: bytes, seq: int = 0):
+        """Send examiner audio: a binary frame for binary clients, base64 JSON otherwise"""
+        buffer = self.send_buffers.get(session_id)
+        session = self.user_sessions.get(session_id)
+        if buffer is None or session is None:
+            return
+        with stage("send"):
+            if session["binary_audio"]:
+                buffer.offer(encode_frame(AI_AUDIO, audio, seq, CODEC_MP3))
+            else:
+                buffer.offer(dumps({
+                    "type": "ai_audio",
+                    "audio_data": base64.b64encode(audio).decode(),
+                    "seq": seq,
+                    "timestamp": message_timestamp()
+                }))
 
-manager = ConnectionManager()
+    async def broadcast(self, message: dict) -> int:
+        """Serialise once and queue for every connection; returns how many accepted it"""
+        frame = dumps(message)
+        with stage("send"):
+            return sum(buffer.offer(frame) for buffer in list(self.send_buffers.values()))
 
-def transcribe_audio_chunk(audio_data: bytes) -> str:
+    async def watch_send_buffers(self, interval: float = 1.0):
+        """Evict clients stuck on one send for longer than SEND_TIMEOUT_SECONDS"""
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            for buffer in list(self.send_buffers.values()):
+                buffer.check_stalled(now)
+
+    def send_stats(self) -> dict:
+        queued = [buffer.queued() for buffer in self.send_buffers.values()]
+        return {
+            "encoder": ENCODER,
+            "connections": len(queued),
+            "queued_frames": sum(queued),
+            "max_queued_frames": max(queued, default=0),
+            "evicted": self.evicted_count,
+        }
+
+manager = ConnectionManager(session_store)
+
+# Scraped alongside the stage histograms on /metrics
+REGISTRY.register(Gauge("voice_active_connections", "Open voice WebSockets on this worker",
+                        lambda: len(manager.active_connections)))
+REGISTRY.register(Gauge("voice_inbound_audio_queued", "Audio chunks waiting in session inbound queues",
+                        lambda: sum(len(inbox.audio) for inbox in manager.inboxes.values())))
+REGISTRY.register(Gauge("voice_inbound_control_queued", "Control messages waiting in session inbound queues",
+                        lambda: sum(inbox.control.qsize() for inbox in manager.inboxes.values())))
+REGISTRY.register(Gauge("voice_session_tasks", "Background tasks running for voice sessions",
+                        lambda: sum(len(tasks) for tasks in manager.session_tasks.values())))
+REGISTRY.register(Gauge("model_calls_in_flight", "Groq calls in flight",
+                        lambda: gateway.stats()["in_flight"]))
+REGISTRY.register(Gauge("model_calls_waiting", "Groq calls waiting for a concurrency slot",
+                        lambda: gateway.stats()["waiting"]))
+REGISTRY.register(Gauge("scheduler_queued_calls", "Model calls queued for admission under the rate limits",
+                        lambda: scheduler.queued() if scheduler is not None else 0))
+REGISTRY.register(Gauge("question_bank_questions", "Pre-generated examiner questions in the question bank",
+                        lambda: len(question_bank.texts) if question_bank is not None else 0))
+
+async def handle_session_control(message: dict):
+    """Apply a control message published by another worker"""
+    session_id = message.get("session_id")
+    if message.get("action") == "end_session" and session_id in manager.active_connections:
+        logger.info(f"Ending session {session_id} on request from another worker")
+        await manager.close_session(session_id)
+
+async def transcribe_audio_chunk(audio_data: bytes) -> str:
     """Transcribe audio chunk using Whisper on Groq"""
     try:
-        # Save audio data to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-            tmp_file.write(audio_data)
-            tmp_file.flush()
-            
-            with open(tmp_file.name, "rb") as f:
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-large-v3",
-                    file=f
-                )
-            
-            os.unlink(tmp_file.name)  # Clean up temp file
-            return transcript.text if transcript else ""
+        if TRANSCRIBE_NORMALIZE:
+            with stage("normalize"):
+                audio_data = normalize_for_transcription(audio_data)
+            if not audio_data:
+                return ""  # Silence only: nothing for Whisper to hear
+        # Uploaded straight from memory: no temp file to write, reopen or leak
+        with stage("transcribe"):
+            return await transcribe_policy.run(lambda model, timeout: gateway.transcribe(
+                (guess_audio_filename(audio_data), audio_data), model=model, timeout=timeout))
     except Exception as e:
         logger.error(f"Transcription error: {e}")
         return ""
 
-def generate_ai_response(conversation_history: List[dict], current_part: int) -> str:
+EXAMINER_FALLBACK = "I'm sorry, could you repeat that please?"
+
+def build_examiner_messages(conversation_history: ConversationHistory, current_part: int) -> List[dict]:
+    """Chat messages for the examiner's next turn"""
+    # Earlier turns only appear as the rolling summary; recent ones as far as the budget allows
+    prompt = examiner_prompts.build(
+        current_part, ((turn.role, turn.content) for turn in conversation_history.prompt_turns()),
+        conversation_history.summary)
+    logger.debug(f"Examiner prompt: {prompt.prompt_tokens} tokens, {prompt.turns_included} turns")
+    return prompt.messages
+
+async def generate_ai_response(conversation_history: ConversationHistory, current_part: int) -> str:
     """Generate AI examiner response based on conversation history"""
-    
-    # System prompts for different parts
-    system_prompts = {
-        1: """You are an IELTS Speaking examiner conducting Part 1. Ask short, personal questions about 
-        familiar topics like hometown, hobbies, work, study, daily routine. Keep responses natural and 
-        encouraging. Ask follow-up questions based on the candidate's answers.""",
-        
-        2: """You are an IELTS Speaking examiner conducting Part 2. Give the candidate a cue card topic 
-        and tell them they have 1 minute to prepare and 1-2 minutes to speak. Topics should be about 
-        describing a person, place, experience, or object.""",
-        
-        3: """You are an IELTS Speaking examiner conducting Part 3. Ask abstract, analytical questions 
-        related to the Part 2 topic. Focus on opinions, comparisons, predictions, and societal issues. 
-        Encourage detailed responses."""
-    }
-    
-    messages = [
-        {"role": "system", "content": system_prompts.get(current_part, system_prompts[1])}
-    ]
-    
-    # Add conversation history
-    for entry in conversation_history[-10:]:  # Last 10 exchanges to avoid token limit
-        messages.append({"role": "user" if entry["type"] == "candidate" else "assistant", 
-                        "content": entry["content"]})
-    
+    messages = build_examiner_messages(conversation_history, current_part)
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=150,
-        )
-        return response.choices[0].message.content.strip()
+        with stage("generate"):
+            response = await examiner_policy.run(lambda model, timeout: gateway.chat(
+                messages, model=model, temperature=0.7, max_tokens=150, timeout=timeout))
+        return response.strip()
     except Exception as e:
         logger.error(f"AI response generation error: {e}")
-        return "I'm sorry, could you repeat that please?"
+        return EXAMINER_FALLBACK
 
-def synthesize_speech_stream(text: str) -> bytes:
-    """Convert text to speech using Groq TTS"""
+async def stream_ai_response(conversation_history: ConversationHistory, current_part: int) -> AsyncIterator[str]:
+    """Yield the examiner response token by token as the model produces it"""
+    messages = build_examiner_messages(conversation_history, current_part)
+    produced = False
+    try:
+        with stage("generate"):
+            async for delta in examiner_policy.stream(lambda model, timeout: gateway.chat_stream(
+                    messages, model=model, temperature=0.7, max_tokens=150, timeout=timeout)):
+                produced = True
+                yield delta
+    except Exception as e:
+        logger.error(f"AI response streaming error: {e}")
+        if not produced:
+            yield EXAMINER_FALLBACK
+
+async def summarize_history(session_id: str, conversation_history: ConversationHistory):
+    """Fold the turns that left the prompt window into the session's rolling summary"""
+    # Nobody waits on the summary, so it yields to the session's live turns
+    call_priority.set(PRIORITY_BACKGROUND)
+    folded = list(conversation_history.pending)
+    transcript = "\n".join(f"{'Candidate' if turn.role == 'candidate' else 'Examiner'}: {turn.content}"
+                           for turn in folded)
+    prompt = SUMMARY_PROMPT.render(summary=conversation_history.summary or "(none)", transcript=transcript)
+    PROMPT_TOKENS.observe(SUMMARY_PROMPT.static_tokens + estimate_tokens(conversation_history.summary)
+                          + sum(estimate_tokens(turn.content) + 3 for turn in folded), site="summary")
+    try:
+        summary = await summary_policy.run(lambda model, timeout: gateway.chat(
+            [{"role": "user", "content": prompt}],
+            model=model,
+            temperature=0.3,
+            max_tokens=200,
+            timeout=timeout,
+        ))
+        conversation_history.fold_summary(folded, summary.strip())
+        await manager.save_session(session_id)
+    except Exception as e:
+        logger.error(f"History summarisation error for session {session_id}: {e}")
+    finally:
+        conversation_history.summarizing = False
+
+async def generate_bank_questions(part: int, topic: str, count: int) -> str:
+    """Model call behind a question bank refill; nobody waits on it, so it yields to live turns"""
+    endpoint_label.set("question-bank")
+    part_label.set(part_name(part))
+    call_priority.set(PRIORITY_BACKGROUND)
+    prompt = QUESTION_BANK_PROMPTS[part].render(count=str(count), topic=topic)
+    PROMPT_TOKENS.observe(estimate_tokens(prompt), site="question-bank", part=part_name(part))
+    return await question_bank_policy.run(lambda model, timeout: gateway.chat(
+        [{"role": "user", "content": prompt}],
+        model=model,
+        temperature=0.9,
+        max_tokens=80 * count,
+        timeout=timeout,
+    ))
+
+# Seeded from data/question_bank.tsv and refilled in the background (QUESTION_BANK=0 to disable)
+question_bank = QuestionBank.from_env(generate_bank_questions)
+
+def examiner_question_text(question: BankQuestion) -> str:
+    """What the examiner says to ask a bank question"""
+    if question.part == 1:
+        return f"Let's talk about {question.topic}. {question.text}"
+    return question.text
+
+def draw_examiner_question(session: dict, opening: bool = False) -> Optional[BankQuestion]:
+    """A bank question for a context-free examiner turn, or None when the turn is a live follow-up.
+
+    ``opening`` is the first turn of a part. Otherwise Part 2 (the candidate's
+    talk) is always followed up live, and Parts 1 and 3 once they have had
+    QUESTION_BANK_FOLLOW_UPS follow-ups. Part 1 then moves to a new topic,
+    while Part 3 stays on the theme of the cue card as long as it can. The
+    session is left alone until the turn is sent (``record_examiner_question``).
+    """
+    if question_bank is None:
+        return None
+    part = session["current_part"]
+    if not opening and (part == 2 or session["follow_ups"] < QUESTION_BANK_FOLLOW_UPS):
+        return None
+    topic = session["question_topic"]
+    return question_bank.draw(part, topic if part == 3 else None, session["questions_asked"],
+                              exclude_topic=topic if part == 1 else None)
+
+def record_examiner_question(session: dict, question: Optional[BankQuestion]):
+    """Count an examiner turn once it has been sent: a bank question starts a new topic,
+    a live reply is one more follow-up. A turn cancelled before then is not counted."""
+    if question is None:
+        session["follow_ups"] += 1
+        return
+    session["questions_asked"] |= 1 << question.id
+    session["question_topic"] = question.topic
+    session["follow_ups"] = 0
+
+async def synthesize_speech_stream(text: str) -> bytes:
+    """Convert text to speech using Groq TTS, served from the TTS cache when possible"""
+    cache_key = TTSCache.key(text, TTS_VOICE, TTS_MODEL)
+    cached = await tts_cache.get(cache_key)
+    if cached is not None:
+        return cached
     try:
         # Note: Groq might not have TTS yet, this is a placeholder
         # You might need to use another service like ElevenLabs, OpenAI TTS, or Azure
-        response = client.audio.speech.create(
-            model="tts-1",  # This might not exist in Groq yet
-            voice="alloy",
-            input=text,
-        )
-        return response.content
+        with stage("synthesize"):
+            audio = await speech_policy.run(lambda model, timeout: gateway.speech(
+                text, model=model, voice=TTS_VOICE, timeout=timeout))
+        tts_cache.put(cache_key, audio)
+        return audio
     except Exception as e:
         logger.error(f"TTS error: {e}")
         # Return empty bytes or use a fallback TTS service
         return b""
 
-def evaluate_response_realtime(question: str, answer: str) -> dict:
-    """Quick evaluation for real-time feedback"""
-    prompt = f"""
-    Quickly evaluate this IELTS speaking response. Give brief feedback in 2-3 sentences.
+async def prewarm_tts_cache():
+    """Synthesize the fixed examiner prompts once so sessions never wait on them"""
+    endpoint_label.set("prewarm")
+    call_priority.set(PRIORITY_BACKGROUND)
+    texts = [INITIAL_GREETING, EXAMINER_FALLBACK, *PART_INSTRUCTIONS.values(),
+             *EXAMINER_FALLBACK_RESPONSES.values()]
+    await asyncio.gather(*(synthesize_speech_stream(text) for text in texts))
+    logger.info(f"TTS cache prewarmed: {tts_cache.stats()}")
+
+evaluation_policies: Dict[str, CallPolicy] = {}
+
+def evaluation_batcher(name: str, task: str, schema: str, required: tuple, max_tokens: int,
+                       guidance: str = "", budget: float = 4.0) -> MicroBatcher:
+    """Batcher for one kind of evaluation: a single-item prompt, and a multi-item
+    prompt that asks for a JSON array with one result per item. Both run under the
+    evaluation's call policy, falling back to the fast model"""
+    policy = evaluation_policies[name] = CallPolicy.from_env(name, budget, DEFAULT_CHAT_MODEL, FAST_CHAT_MODEL)
+
+    async def run_single(item: str) -> dict:
+        prompt = f"""
+    {task}
+    
+    {item}
     
-    Question: "{question}"
-    Answer: "{answer}"
+    Return JSON with: {schema}
     
-    Return JSON with: {{"feedback": "brief feedback text", "score": estimated_band_score}}
+    {guidance}
     """
+        with stage("evaluate"):
+            text_output = await policy.run(lambda model, timeout: gateway.chat(
+                [{"role": "user", "content": prompt}],
+                model=model,
+                temperature=0.3,
+                max_tokens=max_tokens,
+                timeout=timeout,
+            ))
+        with stage("parse"):
+            return json.loads(text_output[text_output.index("{"): text_output.rindex("}")+1])
+
+    async def run_batch(items: List[str]) -> List[dict]:
+        prompt = f"""
+    {task} There are {len(items)} separate items below; evaluate each one on its own.
+    
+    {numbered_items(items)}
     
+    Return a JSON array with one object per item, in the same order. Each object has
+    "item" (the item number) and: {schema}
+    
+    {guidance}
+    """
+        with stage("evaluate"):
+            text_output = await policy.run(lambda model, timeout: gateway.chat(
+                [{"role": "user", "content": prompt}],
+                model=model,
+                temperature=0.3,
+                max_tokens=max_tokens * len(items),
+                timeout=timeout,
+            ))
+        # Items the model skipped or answered without the required fields are retried singly
+        with stage("parse"):
+            return [result if result is not None and all(key in result for key in required) else None
+                    for result in parse_batch_results(text_output, len(items))]
+
+    return MicroBatcher(run_batch, run_single, EVAL_BATCH_WINDOW_MS, EVAL_BATCH_MAX_ITEMS, name)
+
+answer_evaluator = evaluation_batcher(
+    "answer-evaluation",
+    "Quickly evaluate this IELTS speaking response. Give brief feedback in 2-3 sentences.",
+    '{"feedback": "brief feedback text", "score": estimated_band_score}',
+    ("feedback", "score"),
+    max_tokens=100,
+    budget=4.0,
+)
+
+quick_evaluator = evaluation_batcher(
+    "quick-evaluate",
+    "Quickly evaluate this IELTS speaking response in 1-2 sentences:",
+    """{
+        "feedback": "Brief encouraging feedback (1-2 sentences)",
+        "score": estimated_band_score_float,
+        "strengths": ["strength1", "strength2"],
+        "suggestions": ["suggestion1", "suggestion2"]
+    }""",
+    ("feedback", "score", "strengths", "suggestions"),
+    max_tokens=120,
+    guidance="Be encouraging and constructive. Focus on what they did well and one area for improvement.",
+    budget=4.0,
+)
+
+realtime_evaluator = evaluation_batcher(
+    "realtime-feedback",
+    "Analyze these recent IELTS speaking responses and provide brief feedback:",
+    """{
+        "feedback": "Brief feedback (1-2 sentences)",
+        "fluency": score_0_to_9,
+        "vocabulary": score_0_to_9,
+        "grammar": score_0_to_9,
+        "pronunciation": score_0_to_9,
+        "suggestions": ["quick suggestion1", "quick suggestion2"]
+    }""",
+    ("feedback", "fluency", "vocabulary", "grammar", "pronunciation", "suggestions"),
+    max_tokens=150,
+    guidance="Focus on immediate improvements they can make in the next response.",
+    budget=5.0,
+)
+
+async def run_evaluation(batcher: MicroBatcher, item: str) -> dict:
+    if EVAL_BATCHING:
+        return await batcher.submit(item)
+    return await batcher.run_single(item)
+
+def local_evaluation(answer: str) -> dict:
+    with stage("prescore"):
+        return local_scorer.score(answer)
+
+def local_realtime_feedback(text: str, provisional: bool = False) -> dict:
+    local = local_evaluation(text)
+    return {
+        "feedback": local["feedback"],
+        "fluency": local["fluency"],
+        "vocabulary": local["vocabulary"],
+        "grammar": local["grammar"],
+        "pronunciation": local["pronunciation"],
+        "suggestions": local["suggestions"],
+        "source": "local",
+        "provisional": provisional
+    }
+
+async def within_deadline(evaluation) -> dict:
+    """Await a (shielded, cached) evaluation for at most EVAL_DEADLINE_SECONDS"""
+    if EVAL_DEADLINE_SECONDS <= 0:
+        return await evaluation
+    return await asyncio.wait_for(evaluation, EVAL_DEADLINE_SECONDS)
+
+async def evaluate_response_realtime(question: str, answer: str) -> dict:
+    """Quick evaluation for real-time feedback"""
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=100,
-        )
-        text_output = response.choices[0].message.content
-        result = json.loads(text_output[text_output.index("{"): text_output.rindex("}")+1])
-        return result
+        result = await run_evaluation(answer_evaluator, f'Question: "{question}"\n    Answer: "{answer}"')
+        return {**result, "source": "model"}
     except Exception as e:
         logger.error(f"Evaluation error: {e}")
-        return {"feedback": "Good response, keep going!", "score": 6.0}
+        local = local_evaluation(answer)
+        return {"feedback": local["feedback"], "score": local["score"], "source": "local"}
 
-@app.websocket("/ws/voice-chat/{session_id}")
-async def voice_chat_websocket(websocket: WebSocket, session_id: str):
-    await manager.connect(websocket, session_id)
-    
-    # Send initial greeting
-    initial_greeting = "Hello! Welcome to your IELTS Speaking practice session. Let's start with Part 1. Can you tell me your name and where you're from?"
-    
-    await manager.send_message(session_id, {
+class TurnTimer:
+    """Per-turn timing: time-to-first-message is what the candidate waits for"""
+
+    def __init__(self, session_id: str, turn_id: int, trace: bool = False):
+        self.session_id = session_id
+        self.turn_id = turn_id
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.marks: Dict[str, float] = {}
+        # Clients that connect with ?trace=1 get the turn's trace in every message
+        self.trace_id = uuid.uuid4().hex[:16] if trace else None
+
+    def mark(self, stage: str):
+        self.marks.setdefault(stage, (time.perf_counter() - self.started) * 1000)
+
+    def trace(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "turn_id": self.turn_id,
+            "started_at": round(self.started_at * 1000),
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "spans": {stage: round(ms, 1) for stage, ms in self.marks.items()},
+        }
+
+    async def send(self, message: dict):
+        """Send a turn result and record when the first one went out"""
+        if self.trace_id is not None:
+            message["trace"] = self.trace()
+        await manager.send_message(self.session_id, message)
+        self.mark("first_message")
+        self.mark(message["type"])
+
+    async def send_audio(self, audio: bytes, seq: int = 0):
+        await manager.send_audio(self.session_id, audio, seq)
+        self.mark("first_message")
+        self.mark("ai_audio")
+
+    def log(self, outcome: str = "done"):
+        stages = ", ".join(f"{stage}={ms:.0f}ms" for stage, ms in self.marks.items())
+        mode = "pipelined" if TURN_PIPELINE else "sequential"
+        logger.info(f"Turn {self.turn_id} for session {self.session_id} {outcome} ({mode}): {stages}")
+        if outcome == "done":
+            for milestone, ms in self.marks.items():
+                TURN_SECONDS.observe(ms / 1000, milestone=milestone, part=part_label.get())
+
+    async def send_trace(self):
+        """Final spans of a traced turn, so the client can line them up with its own clock"""
+        if self.trace_id is not None:
+            await manager.send_message(self.session_id, {
+                "type": "turn_trace",
+                "trace": self.trace(),
+                "timestamp": message_timestamp()
+            })
+
+async def send_examiner_reply(timer: TurnTimer, session: dict, question: Optional[BankQuestion] = None):
+    """Generate the examiner reply (unless it is a bank question), send it, then synthesize and send its audio"""
+    if question is not None:
+        ai_response = examiner_question_text(question)
+    else:
+        ai_response = await generate_ai_response(
+            session["conversation_history"],
+            session["current_part"]
+        )
+    timer.mark("generate")
+
+    manager.add_turn(timer.session_id, session, "examiner", ai_response)
+    await manager.save_session(timer.session_id)
+
+    # Send AI response
+    await timer.send({
         "type": "ai_response",
-        "content": initial_greeting,
-        "timestamp": datetime.now().isoformat()
+        "content": ai_response,
+        "timestamp": message_timestamp()
     })
-    
-    # Generate TTS for greeting (if available)
+    record_examiner_question(session, question)
+
+    # Generate and send TTS
     try:
-        tts_data = synthesize_speech_stream(initial_greeting)
+        tts_data = await synthesize_speech_stream(ai_response)
+        timer.mark("synthesize")
         if tts_data:
-            tts_base64 = base64.b64encode(tts_data).decode()
+            await timer.send_audio(tts_data)
+    except Exception as e:
+        logger.error(f"TTS generation failed: {e}")
+
+async def send_sentence_audio(timer: TurnTimer, tts_queue: asyncio.Queue):
+    """Send synthesized sentences in order as each one becomes ready"""
+    seq = 0
+    while True:
+        tts_task = await tts_queue.get()
+        if tts_task is None:
+            break
+        tts_data = await tts_task
+        if tts_data:
+            await timer.send_audio(tts_data, seq)
+        seq += 1
+    timer.mark("synthesize")
+
+async def stream_examiner_reply(timer: TurnTimer, session: dict):
+    """Stream the examiner reply as text deltas and synthesize it sentence by sentence.
+
+    TTS for a sentence starts as soon as it is complete, while later sentences
+    are still being generated; audio goes out as ordered ``ai_audio`` chunks.
+    """
+    splitter = SentenceSplitter()
+    tts_queue: asyncio.Queue = asyncio.Queue()
+    tts_tasks = []
+    sender = asyncio.create_task(send_sentence_audio(timer, tts_queue))
+
+    def synthesize(sentence: str):
+        tts_task = asyncio.create_task(synthesize_speech_stream(sentence))
+        tts_tasks.append(tts_task)
+        tts_queue.put_nowait(tts_task)
+
+    try:
+        parts = []
+        async for delta in stream_ai_response(session["conversation_history"], session["current_part"]):
+            parts.append(delta)
+            await timer.send({
+                "type": "ai_response_delta",
+                "content": delta,
+                "timestamp": message_timestamp()
+            })
+            for sentence in splitter.feed(delta):
+                synthesize(sentence)
+        rest = splitter.flush()
+        if rest:
+            synthesize(rest)
+        timer.mark("generate")
+
+        ai_response = "".join(parts).strip()
+        manager.add_turn(timer.session_id, session, "examiner", ai_response)
+        await manager.save_session(timer.session_id)
+
+        # Full text for clients that ignore deltas; tells everyone how many audio chunks follow
+        await timer.send({
+            "type": "ai_response",
+            "content": ai_response,
+            "audio_segments": len(tts_tasks),
+            "timestamp": message_timestamp()
+        })
+        record_examiner_question(session, None)
+        tts_queue.put_nowait(None)
+        await sender
+    finally:
+        sender.cancel()
+        for tts_task in tts_tasks:
+            tts_task.cancel()
+
+async def send_feedback(timer: TurnTimer, question: str, transcript: str):
+    """Score the candidate's answer and send real-time feedback: the local estimate
+    straight away, then the model's evaluation when it arrives"""
+    if PROVISIONAL_FEEDBACK:
+        local = local_evaluation(transcript)
+        await timer.send({
+            "type": "feedback",
+            "feedback": local["feedback"],
+            "score": local["score"],
+            "provisional": True,
+            "source": "local",
+            "timestamp": message_timestamp()
+        })
+    feedback = await evaluate_response_realtime(question, transcript)
+    timer.mark("evaluate")
+    await timer.send({
+        "type": "feedback",
+        "feedback": feedback["feedback"],
+        "score": feedback["score"],
+        "provisional": False,
+        "source": feedback["source"],
+        "timestamp": message_timestamp()
+    })
+
+async def process_audio_chunk(session_id: str, audio_data: bytes, turn_id: int,
+                              transcribe_slot: Optional[asyncio.Semaphore] = None):
+    """Handle one candidate audio chunk: transcript, examiner reply, audio and feedback"""
+    session = manager.user_sessions.get(session_id)
+    if session is None:
+        return
+    part_label.set(part_name(session["current_part"]))
+    timer = TurnTimer(session_id, turn_id, session["trace"])
+    try:
+        try:
+            # Transcripts are recorded one at a time, in arrival order
+            async with manager.turn_locks[session_id]:
+                transcript = await transcribe_audio_chunk(audio_data)
+                timer.mark("transcribe")
+                if not transcript:
+                    return
+
+                # Send transcription back to client
+                await manager.send_message(session_id, {
+                    "type": "transcription",
+                    "content": transcript,
+                    "timestamp": message_timestamp()
+                })
+
+                # The question being answered is the latest examiner entry
+                history = session["conversation_history"]
+                question = history.last_question or INITIAL_GREETING
+
+                # Add to conversation history
+                manager.add_turn(session_id, session, "candidate", transcript)
+                await manager.save_session(session_id)
+        finally:
+            # Transcription is over: the session's inbound queue can hand over the next utterance
+            if transcribe_slot is not None:
+                transcribe_slot.release()
+
+        # The candidate has already started speaking again: the newer turn will reply
+        if not manager.is_current_turn(session_id, turn_id):
+            timer.log("superseded")
+            return
+        manager.reply_tasks[session_id] = asyncio.current_task()
+
+        # Moving on to a new question needs no model call; only follow-ups are generated
+        bank_question = draw_examiner_question(session)
+        if bank_question is not None:
+            reply = send_examiner_reply(timer, session, bank_question)
+        elif session["stream_replies"]:
+            reply = stream_examiner_reply(timer, session)
+        else:
+            reply = send_examiner_reply(timer, session)
+        if TURN_PIPELINE:
+            # Scoring does not depend on the examiner reply, so both run at once
+            # and each message goes out as soon as it is ready
+            await asyncio.gather(
+                reply,
+                send_feedback(timer, question, transcript),
+            )
+        else:
+            await reply
+            await send_feedback(timer, question, transcript)
+        if history.needs_summary():
+            history.summarizing = True
+            manager.start_task(session_id, summarize_history(session_id, history))
+        timer.log()
+        await timer.send_trace()
+    except asyncio.CancelledError:
+        timer.log("cancelled")
+        raise
+    except Exception as e:
+        logger.error(f"Turn processing error for session {session_id}: {e}")
+    finally:
+        if manager.reply_tasks.get(session_id) is asyncio.current_task():
+            del manager.reply_tasks[session_id]
+
+async def start_audio_turn(session_id: str, audio_data: bytes):
+    """Start processing candidate audio as a new turn, once a transcription slot is free.
+
+    Waiting here is the backpressure: while transcriptions are backed up the
+    session's audio worker stops draining its inbound queue.
+    """
+    transcribe_slot = manager.transcribe_slots.get(session_id)
+    if transcribe_slot is None:
+        return
+    await transcribe_slot.acquire()
+    turn_id = manager.begin_turn(session_id)
+    manager.start_task(session_id, process_audio_chunk(session_id, audio_data, turn_id, transcribe_slot))
+
+async def ingest_audio(session_id: str, audio_data: Union[bytes, memoryview], codec: int = CODEC_UNKNOWN,
+                       final: bool = False):
+    """Buffer candidate audio and start a turn for each complete utterance.
+
+    PCM and WAV audio goes through the session's VAD segmenter, so silence and
+    half-finished words never reach Whisper. Compressed audio (webm, ogg, mp3)
+    cannot be segmented here and is still transcribed chunk by chunk.
+    """
+    segmenter = manager.segmenters.get(session_id)
+    monitor = manager.quality_monitors.get(session_id)
+    decoded = None
+    if segmenter is not None or monitor is not None:
+        if codec == CODEC_PCM16 or (codec in (CODEC_UNKNOWN, CODEC_WAV) and audio_data[:4] == b"RIFF"):
+            decoded = decode_pcm16(audio_data)
+    if decoded is not None and monitor is not None:
+        await check_audio_quality(session_id, monitor, *decoded)
+    if decoded is None or segmenter is None:
+        # The whole chunk is uploaded: the only copy a binary frame's payload needs
+        await start_audio_turn(session_id, bytes(audio_data))
+        return
+
+    samples, sample_rate = decoded
+    events = segmenter.feed(samples, sample_rate)
+    if final:
+        events += segmenter.flush()
+    for event, utterance in events:
+        if event == "speech_start":
+            # Candidate is talking again: any reply still being produced is stale
+            manager.begin_turn(session_id)
+        else:
+            await start_audio_turn(session_id, encode_wav(utterance, segmenter.sample_rate))
+
+async def check_audio_quality(session_id: str, monitor: AudioQualityMonitor, samples, sample_rate: int):
+    """Feed the session's quality monitor and tell the client when its verdict changes"""
+    try:
+        report = monitor.feed(samples, sample_rate)
+    except Exception as e:
+        # A bad chunk must not stop the audio reaching the segmenter
+        logger.warning(f"Audio quality check failed for session {session_id}: {e}")
+        return
+    if report is not None:
+        await manager.send_message(session_id, {
+            "type": "audio_quality",
+            **report,
+            "timestamp": message_timestamp()
+        })
+
+async def queue_audio(session_id: str, inbox: InboundQueue, item: AudioItem):
+    """Queue candidate audio for the session's audio worker, telling the client if it is refused"""
+    if not inbox.put_audio(item):
+        await manager.send_message(session_id, {
+            "type": "busy",
+            "message": "Audio is arriving faster than it can be processed; this chunk was dropped.",
+            "timestamp": message_timestamp()
+        })
+
+async def process_inbound_audio(session_id: str, inbox: InboundQueue):
+    """Audio worker: feed queued chunks to VAD and transcription, in order"""
+    while True:
+        item = await inbox.get_audio()
+        try:
+            await ingest_audio(session_id, item.data, item.codec, item.final)
+        except Exception as e:
+            logger.error(f"Audio ingest error for session {session_id}: {e}")
+
+async def handle_control_message(session_id: str, message: dict):
+    if message["type"] == "next_part":
+        # Move to next part of the test
+        session = manager.user_sessions[session_id]
+        session["current_part"] += 1
+        await manager.save_session(session_id)
+        
+        if session["current_part"] > 3:
+            # End of test
+            await manager.send_message(session_id, {
+                "type": "test_complete",
+                "message": "Congratulations! You've completed all three parts of the IELTS Speaking test.",
+                "timestamp": message_timestamp()
+            })
+        else:
+            instruction = PART_INSTRUCTIONS[session["current_part"]]
             await manager.send_message(session_id, {
-                "type": "ai_audio",
-                "audio_data": tts_base64,
-                "timestamp": datetime.now().isoformat()
+                "type": "part_transition",
+                "part": session["current_part"],
+                "instruction": instruction,
+                "timestamp": message_timestamp()
             })
+            # The part opens with a bank question (the cue card in Part 2) straight away
+            question = draw_examiner_question(session, opening=True)
+            if question is not None:
+                await send_examiner_question(session_id, question)
+    
+    elif message["type"] == "ping":
+        # Heartbeat to keep connection alive
+        await manager.send_message(session_id, {
+            "type": "pong",
+            "timestamp": message_timestamp()
+        })
+
+async def process_inbound_control(session_id: str, inbox: InboundQueue):
+    """Control worker: the priority lane, never behind queued audio"""
+    while True:
+        message = await inbox.get_control()
+        try:
+            await handle_control_message(session_id, message)
+        except Exception as e:
+            logger.error(f"Control message error for session {session_id}: {e}")
+
+async def send_examiner_question(session_id: str, question: BankQuestion):
+    """Ask a bank question outside a candidate turn, with its audio"""
+    session = manager.user_sessions[session_id]
+    text = examiner_question_text(question)
+    manager.add_turn(session_id, session, "examiner", text)
+    await manager.save_session(session_id)
+    await manager.send_message(session_id, {
+        "type": "ai_response",
+        "content": text,
+        "timestamp": message_timestamp()
+    })
+    record_examiner_question(session, question)
+    manager.start_task(session_id, send_examiner_audio(session_id, text))
+
+async def send_examiner_audio(session_id: str, text: str):
+    try:
+        tts_data = await synthesize_speech_stream(text)
+        if tts_data:
+            await manager.send_audio(session_id, tts_data)
     except Exception as e:
         logger.error(f"TTS generation failed: {e}")
+
+@app.websocket("/ws/voice-chat/{session_id}")
+async def voice_chat_websocket(websocket: WebSocket, session_id: str):
+    # Clients opt in to token streaming with ?stream=1
+    stream_replies = websocket.query_params.get("stream") in ("1", "true")
+    # Clients that offer the binary audio subprotocol get raw audio frames;
+    # everyone else keeps base64 audio inside JSON text frames
+    binary_audio = BINARY_AUDIO_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    # ?trace=1 adds per-turn trace spans to the messages of each turn
+    trace = websocket.query_params.get("trace") in ("1", "true")
+    endpoint_label.set("ws")
+    call_priority.set(PRIORITY_VOICE)
+    call_session.set(session_id)
+    await manager.connect(websocket, session_id, stream_replies, binary_audio, trace)
+    
+    # Send initial greeting
+    await manager.send_message(session_id, {
+        "type": "ai_response",
+        "content": INITIAL_GREETING,
+        "timestamp": message_timestamp()
+    })
+    
+    # Generate TTS for greeting (if available), without holding up the reader
+    manager.start_task(session_id, send_examiner_audio(session_id, INITIAL_GREETING))
+    
+    # The loop below only reads; audio and control messages are handled by
+    # separate workers so a ping never waits behind a transcription
+    inbox = InboundQueue(INBOUND_AUDIO_QUEUE, INBOUND_OVERFLOW, max_merge_bytes=INBOUND_COALESCE_MAX_BYTES)
+    manager.inboxes[session_id] = inbox
+    manager.start_task(session_id, process_inbound_audio(session_id, inbox))
+    manager.start_task(session_id, process_inbound_control(session_id, inbox))
     
     try:
         while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            # Receive message from client: JSON in text frames, audio in binary frames
+            data = await websocket.receive()
+            if data["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
             
-            if message["type"] == "audio_chunk":
-                # Handle real-time audio transcription
-                audio_data = base64.b64decode(message["audio_data"])
-                transcript = transcribe_audio_chunk(audio_data)
-                
-                if transcript:
-                    # Send transcription back to client
-                    await manager.send_message(session_id, {
-                        "type": "transcription",
-                        "content": transcript,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                    # Add to conversation history
-                    session = manager.user_sessions[session_id]
-                    session["conversation_history"].append({
-                        "type": "candidate",
-                        "content": transcript,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                    # Generate AI response
-                    ai_response = generate_ai_response(
-                        session["conversation_history"],
-                        session["current_part"]
-                    )
-                    
-                    session["conversation_history"].append({
-                        "type": "examiner",
-                        "content": ai_response,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                    # Send AI response
-                    await manager.send_message(session_id, {
-                        "type": "ai_response",
-                        "content": ai_response,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                    # Generate and send TTS
-                    try:
-                        tts_data = synthesize_speech_stream(ai_response)
-                        if tts_data:
-                            tts_base64 = base64.b64encode(tts_data).decode()
-                            await manager.send_message(session_id, {
-                                "type": "ai_audio",
-                                "audio_data": tts_base64,
-                                "timestamp": datetime.now().isoformat()
-                            })
-                    except Exception as e:
-                        logger.error(f"TTS generation failed: {e}")
-                    
-                    # Provide real-time feedback
-                    if len(session["conversation_history"]) >= 2:
-                        last_question = None
-                        for entry in reversed(session["conversation_history"]):
-                            if entry["type"] == "examiner":
-                                last_question = entry["content"]
-                                break
-                        
-                        if last_question:
-                            feedback = evaluate_response_realtime(last_question, transcript)
-                            await manager.send_message(session_id, {
-                                "type": "feedback",
-                                "feedback": feedback["feedback"],
-                                "score": feedback["score"],
-                                "timestamp": datetime.now().isoformat()
-                            })
+            if data.get("bytes") is not None:
+                try:
+                    frame = decode_frame(data["bytes"])
+                except FrameError as e:
+                    logger.warning(f"Bad audio frame from session {session_id}: {e}")
+                    continue
+                if frame.msg_type == AUDIO_CHUNK:
+                    # The payload stays a view into the frame; it is copied only if it is kept
+                    await queue_audio(session_id, inbox, AudioItem(frame.payload, frame.codec,
+                                                                   bool(frame.flags & FLAG_FINAL)))
+                continue
             
-            elif message["type"] == "next_part":
-                # Move to next part of the test
-                session = manager.user_sessions[session_id]
-                session["current_part"] += 1
-                
-                if session["current_part"] > 3:
-                    # End of test
-                    await manager.send_message(session_id, {
-                        "type": "test_complete",
-                        "message": "Congratulations! You've completed all three parts of the IELTS Speaking test.",
-                        "timestamp": datetime.now().isoformat()
-                    })
-                else:
-                    part_instructions = {
-                        2: "Now let's move to Part 2. I'll give you a topic card. You'll have 1 minute to prepare and then speak for 1-2 minutes.",
-                        3: "Finally, let's do Part 3. I'll ask you some more abstract questions for discussion."
-                    }
-                    
-                    instruction = part_instructions[session["current_part"]]
-                    await manager.send_message(session_id, {
-                        "type": "part_transition",
-                        "part": session["current_part"],
-                        "instruction": instruction,
-                        "timestamp": datetime.now().isoformat()
-                    })
+            message = json.loads(data["text"])
             
-            elif message["type"] == "ping":
-                # Heartbeat to keep connection alive
-                await manager.send_message(session_id, {
-                    "type": "pong",
-                    "timestamp": datetime.now().isoformat()
-                })
+            if message["type"] == "audio_chunk":
+                await queue_audio(session_id, inbox, AudioItem(
+                    base64.b64decode(message["audio_data"]),
+                    CODECS_BY_NAME.get(message.get("codec"), CODEC_UNKNOWN),
+                    bool(message.get("final"))
+                ))
+            elif not inbox.put_control(message):
+                logger.warning(f"Control queue full for session {session_id}, dropped {message['type']}")
     
     except WebSocketDisconnect:
-        manager.disconnect(session_id)
+        await manager.disconnect(session_id)
     except Exception as e:
         logger.error(f"WebSocket error for session {session_id}: {e}")
-        manager.disconnect(session_id)
+        await manager.disconnect(session_id)
+    finally:
+        if inbox.audio_dropped or inbox.audio_coalesced or inbox.audio_rejected:
+            logger.info(f"Inbound queue for session {session_id}: {inbox.stats()}")
 
 @app.post("/start-session")
 async def start_session():
@@ -328,8 +1305,9 @@ async def start_session():
 @app.get("/session/{session_id}/status")
 async def get_session_status(session_id: str):
     """Get current session status"""
-    if session_id in manager.user_sessions:
-        session = manager.user_sessions[session_id]
+    # Sessions held by another worker are read from the shared store
+    session = manager.user_sessions.get(session_id) or await session_store.load(session_id)
+    if session is not None:
         return {
             "active": True,
             "current_part": session["current_part"],
@@ -343,43 +1321,170 @@ async def end_session(session_id: str):
     """End a voice chat session"""
     if session_id in manager.user_sessions:
         session = manager.user_sessions[session_id]
-        conversation_history = session["conversation_history"]
-        manager.disconnect(session_id)
-        
-        return {
-            "message": "Session ended successfully",
-            "conversation_history": conversation_history,
-            "total_duration": len(conversation_history)
-        }
-    return {"message": "Session not found"}
+        await manager.close_session(session_id)
+    else:
+        session = await session_store.load(session_id)
+        if session is None:
+            return {"message": "Session not found"}
+        # The socket lives on another worker: ask it to close the session
+        await session_store.publish({"action": "end_session", "session_id": session_id})
+        await session_store.delete(session_id)
+    
+    # Only the recent turns are kept in memory; the archive has the whole transcript
+    conversation_history = session["conversation_history"]
+    entries = conversation_history.entries()
+    if session_archive is not None:
+        archived = await session_archive.transcript(session_id)
+        # A session served by another worker was archived there
+        if len(archived) > len(entries):
+            entries = archived
+    return {
+        "message": "Session ended successfully",
+        "conversation_history": entries,
+        "summary": conversation_history.summary,
+        "total_duration": len(conversation_history)
+    }
 
 # Additional endpoints for real-time functionality
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Stage latency histograms and pipeline gauges in Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/tts-cache/stats")
+async def tts_cache_stats():
+    """TTS cache hit rate and size, for sizing the cache"""
+    return tts_cache.stats()
+
+@app.get("/evaluation-batching/stats")
+async def evaluation_batching_stats():
+    """Jobs, batches and model calls saved by evaluation micro-batching"""
+    return {batcher.name: batcher.stats() for batcher in (answer_evaluator, quick_evaluator, realtime_evaluator)}
+
+@app.get("/result-cache/stats")
+async def result_cache_stats():
+    """Hits, misses and coalesced requests for the per-endpoint result caches"""
+    return {cache.name: cache.stats()
+            for cache in (examiner_response_cache, quick_evaluate_cache, realtime_feedback_cache)}
+
+@app.get("/model-policy/stats")
+async def model_policy_stats():
+    """Budgets, hedges, fallbacks and timeouts per model call site, and circuit breaker states"""
+    policies = [examiner_policy, summary_policy, question_bank_policy, transcribe_policy, speech_policy,
+                *evaluation_policies.values()]
+    return {
+        "policies": {policy.name: policy.stats() for policy in policies},
+        "breakers": {model: breaker.stats() for model, breaker in breakers.items()},
+    }
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """Rate-limit budgets, queued calls by priority and rate-limit responses per model"""
+    if scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, "models": scheduler.stats()}
+
+@app.get("/send-buffers/stats")
+async def send_buffer_stats():
+    """Frames waiting in per-connection send buffers and slow clients evicted"""
+    return manager.send_stats()
+
+@app.get("/prompt-builder/stats")
+async def prompt_builder_stats():
+    """Prompt tokens per call, and turns truncated or left out to stay within each token budget"""
+    return {builder.name: builder.stats() for builder in (examiner_prompts, examiner_request_prompts)}
+
+@app.get("/question-bank/stats")
+async def question_bank_stats():
+    """Pre-generated questions by part, draws served and missed, and background refills"""
+    if question_bank is None:
+        return {"enabled": False}
+    return {"enabled": True, **question_bank.stats()}
+
+@app.get("/session-archive/stats")
+async def session_archive_stats():
+    """Queue depth, records and batches written, and last commit time of the session archive"""
+    if session_archive is None:
+        return {"enabled": False}
+    return {"enabled": True, **session_archive.stats()}
+
+def _archive_time(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds from a query parameter given as epoch seconds or an ISO timestamp"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(400, f"Invalid time {value!r}: expected epoch seconds or an ISO timestamp")
+
+@app.get("/session-archive/export")
+async def export_session_archive(since: Optional[str] = None, until: Optional[str] = None):
+    """Every archived record in the time range as newline-delimited JSON, streamed page by page"""
+    if session_archive is None:
+        return {"error": "Session archive is disabled"}
+
+    # Parsed up front: a bad time is a 400, not an error halfway through the stream
+    since_time, until_time = _archive_time(since), _archive_time(until)
+
+    async def lines():
+        async for record in session_archive.export(since_time, until_time):
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/session-archive")
+async def lookup_session_archive(since: Optional[str] = None, until: Optional[str] = None, limit: int = 100):
+    """Archived records in a time range (epoch seconds or ISO timestamps), oldest first"""
+    if session_archive is None:
+        return {"error": "Session archive is disabled"}
+    records = await session_archive.lookup(since=_archive_time(since), until=_archive_time(until),
+                                           limit=min(limit, 1000))
+    return {"records": records}
+
+@app.get("/session-archive/{session_id}")
+async def get_archived_session(session_id: str, limit: int = 100):
+    """Archived records (ended and saved) for one session, oldest first"""
+    if session_archive is None:
+        return {"error": "Session archive is disabled"}
+    records = await session_archive.lookup(session_id=session_id, limit=min(limit, 1000))
+    return {"session_id": session_id, "records": records}
+
 @app.post("/transcribe")
 async def transcribe_only(audio: UploadFile = File(...)):
     """Transcribe audio without evaluation"""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-            content = await audio.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            transcript = transcribe_audio_chunk(content)
-            os.unlink(tmp_file.name)
-            
-            return {"transcript": transcript}
+        head = await audio.read(12)
+        await audio.seek(0)
+        if TRANSCRIBE_NORMALIZE and head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            # WAV is decoded and normalised in memory before upload
+            transcript = await transcribe_audio_chunk(await audio.read())
+        else:
+            # Anything else streams from the upload's spooled file to Whisper
+            filename = audio.filename or guess_audio_filename(head)
+            with stage("transcribe"):
+                # A spooled upload cannot be sent twice, so this call is not hedged
+                transcript = await transcribe_policy.run(lambda model, timeout: gateway.transcribe(
+                    (filename, audio.file), model=model, timeout=timeout), hedge=False)
+        
+        return {"transcript": transcript}
     except Exception as e:
         return {"error": str(e)}
 
 @app.post("/synthesize-speech")
 async def synthesize_speech_endpoint(request: dict):
     """Convert text to speech"""
+    use_body_session(request.get("session_id"))
     text = request.get("text", "")
     if not text:
         return {"error": "No text provided"}
     
     try:
-        audio_data = synthesize_speech_stream(text)
+        audio_data = await synthesize_speech_stream(text)
         if audio_data:
             return StreamingResponse(
                 io.BytesIO(audio_data),
@@ -394,117 +1499,94 @@ async def synthesize_speech_endpoint(request: dict):
 @app.post("/generate-examiner-response")
 async def generate_examiner_response_endpoint(request: dict):
     """Generate contextual examiner response"""
+    use_body_session(request.get("session_id"))
     conversation_history = request.get("conversation_history", [])
     current_part = request.get("current_part", 1)
     question_count = request.get("question_count", 0)
+    part_label.set(part_name(current_part))
     
-    # Create context from conversation history
-    recent_exchanges = conversation_history[-6:]  # Last 3 exchanges
-    context = ""
+    # Opening questions (no conversation yet, or "new_topic": true) come from the question
+    # bank, skipping any the conversation already contains
+    if question_bank is not None and (not conversation_history or request.get("new_topic")):
+        asked = question_bank.seen_mask(entry["content"] for entry in conversation_history
+                                        if entry["type"] != "candidate")
+        question = question_bank.draw(current_part, request.get("topic"), asked)
+        if question is not None:
+            return {"response": examiner_question_text(question), "prompt_tokens": 0,
+                    "source": "question-bank", "topic": question.topic}
     
-    for entry in recent_exchanges:
-        role = "Candidate" if entry["type"] == "candidate" else "Examiner"
-        context += f"{role}: {entry['content']}\n"
+    # The last 3 exchanges, newest first as far as the token budget allows
+    prompt = examiner_request_prompts.build(
+        current_part, (("candidate" if entry["type"] == "candidate" else "examiner", entry["content"])
+                       for entry in conversation_history))
+    context = prompt.messages[-1]["content"]
     
-    # Generate appropriate response based on part and context
-    system_prompts = {
-        1: f"""You are an IELTS Speaking examiner conducting Part 1. Based on this conversation:
-
-{context}
-
-Generate the next appropriate question or response. Keep it natural, encouraging, and ask follow-up questions about familiar topics like hobbies, hometown, work, study, daily routine, food, or family. Questions should be simple and direct, suitable for 20-30 second answers.
-
-If the candidate seems nervous, be more encouraging. If they give very short answers, ask follow-up questions. If they give detailed answers, acknowledge and move to a related topic.""",
-
-        2: f"""You are an IELTS Speaking examiner conducting Part 2. Based on this conversation:
-
-{context}
-
-If this is the beginning of Part 2, give a cue card topic with bullet points. If the candidate is preparing, give encouragement. If they're speaking, listen and give minimal responses. Topics should be about describing a person, place, experience, or object.
-
-Example format: "Now I'd like you to describe [topic]. You have one minute to think about what you're going to say. You can make some notes if you wish. Here's your topic: Describe a [something]. You should say: - [bullet point 1] - [bullet point 2] - [bullet point 3] - and explain [why/how/what you felt]".""",
-
-        3: f"""You are an IELTS Speaking examiner conducting Part 3. Based on this conversation:
-
-{context}
-
-Ask abstract, analytical questions that require longer responses. Focus on opinions, comparisons, predictions, and societal issues. Questions should be thought-provoking and related to broader themes from Part 2.
-
-Examples: "How do you think...", "What are the advantages and disadvantages of...", "Do you believe...", "How might this change in the future?", "What impact does... have on society?"."""
-    }
+    cache_key = ResultCache.key(DEFAULT_CHAT_MODEL, 0.7, current_part, context)
     
-    prompt = system_prompts.get(current_part, system_prompts[1])
+    async def examiner_reply() -> str:
+        with stage("generate"):
+            return await examiner_policy.run(lambda model, timeout: gateway.chat(
+                prompt.messages,
+                model=model,
+                temperature=0.7,
+                max_tokens=150,
+                timeout=timeout,
+            ))
     
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=150,
-        )
+        response = await examiner_response_cache.get_or_compute(cache_key, examiner_reply)
         
-        ai_response = response.choices[0].message.content.strip()
-        return {"response": ai_response}
+        ai_response = response.strip()
+        return {"response": ai_response, "prompt_tokens": prompt.prompt_tokens, "source": "model"}
         
     except Exception as e:
         logger.error(f"Examiner response generation error: {e}")
-        fallback_responses = {
-            1: "That's interesting. Can you tell me more about that?",
-            2: "Take your time to prepare. Let me know when you're ready to start.",
-            3: "That's a good point. How do you think this might change in the future?"
-        }
-        return {"response": fallback_responses.get(current_part, "Please continue.")}
+        return {"response": EXAMINER_FALLBACK_RESPONSES.get(current_part, "Please continue."),
+                "prompt_tokens": prompt.prompt_tokens, "source": "fallback"}
 
 @app.post("/quick-evaluate")
 async def quick_evaluate(request: dict):
     """Quick evaluation for real-time feedback"""
+    use_body_session(request.get("session_id"))
     answer = request.get("answer", "")
     question = request.get("question", "")
     
-    prompt = f"""
-    Quickly evaluate this IELTS speaking response in 1-2 sentences:
-    
-    Question: "{question}"
-    Answer: "{answer}"
-    
-    Return JSON with:
-    {{
-        "feedback": "Brief encouraging feedback (1-2 sentences)",
-        "score": estimated_band_score_float,
-        "strengths": ["strength1", "strength2"],
-        "suggestions": ["suggestion1", "suggestion2"]
-    }}
-    
-    Be encouraging and constructive. Focus on what they did well and one area for improvement.
-    """
+    cache_key = ResultCache.key(DEFAULT_CHAT_MODEL, 0.3, question, answer)
     
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=120,
-        )
-        
-        text_output = response.choices[0].message.content
-        result = json.loads(text_output[text_output.index("{"): text_output.rindex("}")+1])
-        return result
+        result = await within_deadline(quick_evaluate_cache.get_or_compute(cache_key, lambda: run_evaluation(
+            quick_evaluator, f'Question: "{question}"\n    Answer: "{answer}"')))
+        return {**result, "source": "model", "provisional": False}
         
     except Exception as e:
-        logger.error(f"Quick evaluation error: {e}")
+        timed_out = isinstance(e, asyncio.TimeoutError)
+        if timed_out:
+            logger.warning("Quick evaluation past its deadline, answering with the local estimate")
+        else:
+            logger.error(f"Quick evaluation error: {e}")
+        local = local_evaluation(answer)
         return {
-            "feedback": "Good response! Keep practicing to improve fluency.",
-            "score": 6.0,
-            "strengths": ["Clear communication"],
-            "suggestions": ["Try to elaborate more on your ideas"]
+            "feedback": local["feedback"],
+            "score": local["score"],
+            "strengths": local["strengths"],
+            "suggestions": local["suggestions"],
+            "source": "local",
+            "provisional": timed_out
         }
 
 @app.post("/realtime-feedback")
 async def realtime_feedback(request: dict):
     """Generate real-time feedback based on recent conversation"""
+    use_body_session(request.get("session_id"))
     recent_conversation = request.get("recent_conversation", [])
     
+    # Extract candidate responses
+    candidate_responses = [entry["content"] for entry in recent_conversation if entry["type"] == "candidate"]
+    combined_response = " ".join(candidate_responses)
+    
     if len(recent_conversation) < 2:
+        if combined_response:
+            return local_realtime_feedback(combined_response)
         return {
             "feedback": "Keep going! You're doing well.",
             "fluency": 6.0,
@@ -514,50 +1596,20 @@ async def realtime_feedback(request: dict):
             "suggestions": ["Continue speaking naturally"]
         }
     
-    # Extract candidate responses
-    candidate_responses = [entry["content"] for entry in recent_conversation if entry["type"] == "candidate"]
-    combined_response = " ".join(candidate_responses)
-    
-    prompt = f"""
-    Analyze these recent IELTS speaking responses and provide brief feedback:
-    
-    Recent responses: "{combined_response}"
-    
-    Return JSON with:
-    {{
-        "feedback": "Brief feedback (1-2 sentences)",
-        "fluency": score_0_to_9,
-        "vocabulary": score_0_to_9,
-        "grammar": score_0_to_9,
-        "pronunciation": score_0_to_9,
-        "suggestions": ["quick suggestion1", "quick suggestion2"]
-    }}
-    
-    Focus on immediate improvements they can make in the next response.
-    """
+    cache_key = ResultCache.key(DEFAULT_CHAT_MODEL, 0.3, combined_response)
     
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=150,
-        )
-        
-        text_output = response.choices[0].message.content
-        result = json.loads(text_output[text_output.index("{"): text_output.rindex("}")+1])
-        return result
+        result = await within_deadline(realtime_feedback_cache.get_or_compute(cache_key, lambda: run_evaluation(
+            realtime_evaluator, f'Recent responses: "{combined_response}"')))
+        return {**result, "source": "model", "provisional": False}
         
     except Exception as e:
-        logger.error(f"Realtime feedback error: {e}")
-        return {
-            "feedback": "You're making good progress!",
-            "fluency": 6.0,
-            "vocabulary": 6.0,
-            "grammar": 6.0,
-            "pronunciation": 6.0,
-            "suggestions": ["Continue speaking with confidence"]
-        }
+        timed_out = isinstance(e, asyncio.TimeoutError)
+        if timed_out:
+            logger.warning("Realtime feedback past its deadline, answering with the local estimate")
+        else:
+            logger.error(f"Realtime feedback error: {e}")
+        return local_realtime_feedback(combined_response, provisional=timed_out)
 
 @app.post("/save-session")
 async def save_session_endpoint(request: dict):
@@ -567,45 +1619,87 @@ async def save_session_endpoint(request: dict):
     total_duration = request.get("total_duration", 0)
     parts_completed = request.get("parts_completed", 0)
     
-    # Here you could save to database, send to analytics service, etc.
     logger.info(f"Session {session_id} completed: {len(conversation_history)} exchanges, {parts_completed} parts, {total_duration}ms duration")
+    # Queued only: the write is group-committed in the background
+    if session_archive is not None and session_id:
+        session_archive.submit(session_id, "saved", request)
     
     return {"status": "saved", "session_id": session_id}
 
 @app.post("/analyze-audio-quality")
 async def analyze_audio_quality_endpoint(request: dict):
-    """Analyze audio quality and provide suggestions"""
-    audio_chunk = request.get("audio_chunk", "")
-    
-    # This is a simplified version - you could use actual audio analysis
-    # For now, return general suggestions
-    return {
-        "quality": "fair",
-        "suggestions": [
-            "Speak closer to your microphone",
-            "Try to minimize background noise",
-            "Speak at a steady pace"
-        ]
-    }
+    """Analyze audio quality and provide suggestions.
+
+    ``audio_chunk`` is base64 16-bit PCM WAV (or raw PCM16 at ``sample_rate``,
+    16 kHz by default); compressed audio is reported as ``unknown``.
+    """
+    try:
+        audio_data = base64.b64decode(request.get("audio_chunk", ""))
+    except Exception as e:
+        logger.warning(f"Audio quality request with unreadable audio: {e}")
+        audio_data = b""
+    if not audio_data:
+        return unanalyzable_report("no_audio")
+    # Anything without a known container signature is taken as raw PCM16
+    try:
+        decoded = None
+        if guess_audio_filename(audio_data) == "audio.wav":
+            decoded = decode_pcm16(audio_data, int(request.get("sample_rate", 16000)))
+        if decoded is None:
+            return unanalyzable_report("unsupported_format")
+        return analyze_samples(*decoded)
+    except Exception as e:
+        logger.warning(f"Audio quality request with malformed audio: {e}")
+        return unanalyzable_report("unsupported_format")
+
+class TimedWord(BaseModel):
+    word: str
+    start: float
+    end: float
+
+class PronunciationRequest(BaseModel):
+    transcript: str = ""
+    audio_chunk: str = ""
+    words: List[TimedWord] = []
+    session_id: Optional[str] = None
 
 @app.post("/pronunciation-feedback")
-async def pronunciation_feedback_endpoint(request: dict):
-    """Provide pronunciation-specific feedback"""
-    audio_chunk = request.get("audio_chunk", "")
-    transcript = request.get("transcript", "")
-    
-    # Simplified pronunciation feedback
-    # In a real implementation, you'd use specialized pronunciation analysis tools
+async def pronunciation_feedback_endpoint(request: PronunciationRequest):
+    """Provide pronunciation-specific feedback.
+
+    Scored locally from the lexicon and fluency metrics, with no model call.
+    Speech rate and pauses need word timestamps: pass ``words`` (Whisper
+    ``{"word", "start", "end"}`` entries) or ``audio_chunk`` (base64 audio,
+    transcribed here with word timestamps).
+    """
+    use_body_session(request.session_id)
+    audio_chunk = request.audio_chunk
+    transcript = request.transcript
+    words = [{"word": word.word, "start": word.start, "end": word.end} for word in request.words]
     
-    words = transcript.lower().split()
-    common_difficult_words = ["think", "three", "through", "world", "work", "comfortable", "development"]
+    if audio_chunk and not words:
+        try:
+            audio_data = base64.b64decode(audio_chunk)
+            with stage("transcribe"):
+                result = await transcribe_policy.run(lambda model, timeout: gateway.transcribe_words(
+                    (guess_audio_filename(audio_data), audio_data), model=model, timeout=timeout))
+            words = result["words"]
+            transcript = transcript or result["text"]
+        except Exception as e:
+            logger.error(f"Word timestamp transcription error: {e}")
+    if not transcript and words:
+        transcript = " ".join(word["word"] for word in words)
     
-    problematic_words = [word for word in words if any(diff in word for diff in common_difficult_words)]
+    difficult = pronunciation_lexicon.difficult_words(transcript)
+    text = text_metrics(transcript)
+    timing = timing_metrics(words)
     
     return {
-        "score": 6.5,
-        "feedback": "Your pronunciation is generally clear. Focus on consonant sounds and word stress.",
-        "problematic_words": problematic_words[:3]  # Top 3 challenging words
+        "score": estimate_score(text, timing, difficult),
+        "feedback": feedback_text(difficult, text, timing),
+        "problematic_words": list(dict.fromkeys(entry["word"] for entry in difficult))[:3],  # Top 3 challenging words
+        "difficult_words": difficult,
+        "fluency": {**text, **(timing or {})}
     }
 
 if __name__ == "__main__":
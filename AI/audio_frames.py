@@ -0,0 +1,67 @@
+import struct
+from typing import NamedTuple, Union
+
+# Binary WebSocket frame: 8-byte big-endian header followed by the raw audio.
+#
+#   version (u8) | message type (u8) | codec (u8) | flags (u8) | sequence (u32)
+#
+# JSON control messages keep using text frames; only audio travels as binary.
+HEADER = struct.Struct(">BBBBI")
+HEADER_SIZE = HEADER.size
+PROTOCOL_VERSION = 1
+
+# Message types
+AUDIO_CHUNK = 1  # client -> server: candidate audio
+AI_AUDIO = 2     # server -> client: examiner TTS
+
+# Codecs
+CODEC_UNKNOWN = 0
+CODEC_WAV = 1
+CODEC_MP3 = 2
+CODEC_WEBM = 3
+CODEC_PCM16 = 4  # raw signed 16-bit little-endian, 16 kHz mono
+CODEC_OGG = 5
+
+CODEC_NAMES = {
+    CODEC_UNKNOWN: "unknown",
+    CODEC_WAV: "wav",
+    CODEC_MP3: "mp3",
+    CODEC_WEBM: "webm",
+    CODEC_PCM16: "pcm16",
+    CODEC_OGG: "ogg",
+}
+
+# Flags
+FLAG_FINAL = 0x01  # last audio frame of an utterance / reply
+
+
+class FrameError(ValueError):
+    pass
+
+
+class AudioFrame(NamedTuple):
+    msg_type: int
+    codec: int
+    flags: int
+    seq: int
+    payload: memoryview  # view into the received frame, not a copy
+
+    @property
+    def codec_name(self) -> str:
+        return CODEC_NAMES.get(self.codec, "unknown")
+
+
+def encode_frame(msg_type: int, payload: bytes, seq: int = 0,
+                 codec: int = CODEC_UNKNOWN, flags: int = 0) -> bytes:
+    """Build a binary frame: header plus payload, copied once into one buffer"""
+    return HEADER.pack(PROTOCOL_VERSION, msg_type, codec, flags, seq & 0xFFFFFFFF) + payload
+
+
+def decode_frame(data: Union[bytes, bytearray, memoryview]) -> AudioFrame:
+    """Parse a binary frame without copying the payload"""
+    if len(data) < HEADER_SIZE:
+        raise FrameError(f"Frame too short: {len(data)} bytes")
+    version, msg_type, codec, flags, seq = HEADER.unpack_from(data, 0)
+    if version != PROTOCOL_VERSION:
+        raise FrameError(f"Unsupported frame version {version}")
+    return AudioFrame(msg_type, codec, flags, seq, memoryview(data)[HEADER_SIZE:])
@@ -0,0 +1,310 @@
+import os
+import struct
+from collections import deque
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_SAMPLE_RATE = 16000
+# Sample rates outside this range are taken as a corrupt header
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+
+
+def decode_pcm16(data: bytes, sample_rate: int = DEFAULT_SAMPLE_RATE) -> Optional[Tuple[np.ndarray, int]]:
+    """Decode a 16-bit PCM WAV clip (or raw PCM16 if it has no RIFF header).
+
+    Returns (mono int16 samples, sample rate), or None for audio this module
+    cannot read (compressed codecs, non-16-bit WAV, truncated or implausible
+    headers). Mono samples are a view into ``data``, not a copy.
+    """
+    if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+        return None
+    if data[:4] != b"RIFF":
+        usable = len(data) - len(data) % 2
+        return np.frombuffer(data, dtype="<i2", count=usable // 2), sample_rate
+    if data[8:12] != b"WAVE":
+        return None
+
+    channels = bits = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or body + 16 > len(data):
+                return None
+            audio_format, channels, sample_rate = struct.unpack_from("<HHI", data, body)
+            bits = struct.unpack_from("<H", data, body + 14)[0]
+            if audio_format not in (1, 0xFFFE) or bits != 16 or channels <= 0:
+                return None
+            if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+                return None
+        elif chunk_id == b"data":
+            if channels is None:
+                return None
+            # Streaming writers often leave the size at 0 or 0xFFFFFFFF
+            end = min(len(data), body + chunk_size) if 0 < chunk_size < 0xFFFFFFFF else len(data)
+            frame_bytes = 2 * channels
+            count = (end - body) // frame_bytes * channels
+            samples = np.frombuffer(data, dtype="<i2", count=count, offset=body)
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+            return samples, sample_rate
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int = DEFAULT_SAMPLE_RATE) -> bytes:
+    """Wrap mono int16 samples in a WAV header"""
+    pcm = samples.astype("<i2", copy=False).tobytes()
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(pcm), b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", len(pcm),
+    )
+    return header + pcm
+
+
+def frame_features(samples: np.ndarray, frame_len: int) -> Tuple[np.ndarray, np.ndarray]:
+    """RMS level (0..1 full scale) and zero-crossing rate for each whole frame"""
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+    frames /= 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return rms, zcr
+
+
+class VadConfig:
+    """Voice activity detection and segmentation settings"""
+
+    def __init__(
+        self,
+        frame_ms: int = 20,
+        energy_threshold: float = 0.01,
+        noise_ratio: float = 3.0,
+        zcr_threshold: float = 0.25,
+        start_ms: int = 60,
+        silence_ms: int = 700,
+        min_utterance_ms: int = 250,
+        max_utterance_ms: int = 30000,
+        pre_roll_ms: int = 200,
+    ):
+        self.frame_ms = frame_ms
+        self.energy_threshold = energy_threshold
+        self.noise_ratio = noise_ratio
+        self.zcr_threshold = zcr_threshold
+        self.start_ms = start_ms
+        self.silence_ms = silence_ms
+        self.min_utterance_ms = min_utterance_ms
+        self.max_utterance_ms = max_utterance_ms
+        self.pre_roll_ms = pre_roll_ms
+
+    @classmethod
+    def from_env(cls) -> "VadConfig":
+        """Build a config from VAD_* environment variables"""
+        return cls(
+            energy_threshold=float(os.getenv("VAD_ENERGY_THRESHOLD", "0.01")),
+            silence_ms=int(os.getenv("VAD_SILENCE_MS", "700")),
+            min_utterance_ms=int(os.getenv("VAD_MIN_UTTERANCE_MS", "250")),
+            max_utterance_ms=int(os.getenv("VAD_MAX_UTTERANCE_MS", "30000")),
+        )
+
+
+class UtteranceSegmenter:
+    """Per-session audio buffer that turns streamed PCM into complete utterances.
+
+    Each frame is classified as speech by its energy against an adaptive
+    noise floor, with the zero-crossing rate keeping quiet fricatives
+    ("s", "f", "th") inside an utterance. An utterance starts after
+    ``start_ms`` of speech and ends after ``silence_ms`` of silence (or at
+    ``max_utterance_ms``); bursts with less than ``min_utterance_ms`` of
+    speech are dropped as noise.
+    """
+
+    def __init__(self, config: Optional[VadConfig] = None, sample_rate: int = DEFAULT_SAMPLE_RATE):
+        self.config = config or VadConfig()
+        self.sample_rate = sample_rate
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._pre_roll: deque = deque()
+        self._speech: List[np.ndarray] = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._voiced = 0
+        self._announced = False
+        self._noise_floor = self.config.energy_threshold / self.config.noise_ratio
+        # Counters for sizing the Whisper savings
+        self.chunks_received = 0
+        self.utterances_emitted = 0
+        self.utterances_dropped = 0
+
+    def _frames(self, ms: int) -> int:
+        return max(1, ms // self.config.frame_ms)
+
+    def feed(self, samples: np.ndarray, sample_rate: int = DEFAULT_SAMPLE_RATE) -> List[Tuple[str, Optional[np.ndarray]]]:
+        """Add audio and return events in order: ("speech_start", None) when
+        the candidate starts talking and ("utterance", samples) when an
+        utterance is complete"""
+        self.chunks_received += 1
+        if sample_rate != self.sample_rate:
+            # A client switching rate mid-session: close what we have first
+            events = self.flush()
+            self._remainder = np.zeros(0, dtype=np.int16)
+            self.sample_rate = sample_rate
+        else:
+            events = []
+
+        frame_len = self.sample_rate * self.config.frame_ms // 1000
+        if len(self._remainder):
+            samples = np.concatenate([self._remainder, samples])
+        n_frames = len(samples) // frame_len
+        self._remainder = samples[n_frames * frame_len:].copy()
+        if not n_frames:
+            return events
+
+        rms, zcr = frame_features(samples, frame_len)
+        cfg = self.config
+        start_frames = self._frames(cfg.start_ms)
+        silence_frames = self._frames(cfg.silence_ms)
+        max_frames = self._frames(cfg.max_utterance_ms)
+        pre_roll_frames = self._frames(cfg.pre_roll_ms)
+
+        for i in range(n_frames):
+            frame = samples[i * frame_len:(i + 1) * frame_len]
+            threshold = max(cfg.energy_threshold, self._noise_floor * cfg.noise_ratio)
+            level = rms[i]
+            is_speech = level > threshold or (level > threshold / 2 and zcr[i] > cfg.zcr_threshold)
+            if not is_speech:
+                # Track the background level only on non-speech frames
+                self._noise_floor = 0.95 * self._noise_floor + 0.05 * level
+
+            if not self._in_speech:
+                self._pre_roll.append(frame)
+                if len(self._pre_roll) > pre_roll_frames + start_frames:
+                    self._pre_roll.popleft()
+                self._speech_run = self._speech_run + 1 if is_speech else 0
+                if self._speech_run >= start_frames:
+                    self._in_speech = True
+                    self._silence_run = 0
+                    self._voiced = self._speech_run
+                    self._speech = list(self._pre_roll)
+                    self._pre_roll.clear()
+                continue
+
+            self._speech.append(frame)
+            self._silence_run = 0 if is_speech else self._silence_run + 1
+            self._voiced += is_speech
+            # Announce speech only once it is long enough to be an utterance,
+            # so a cough does not interrupt the examiner
+            if not self._announced and self._voiced * cfg.frame_ms >= cfg.min_utterance_ms:
+                self._announced = True
+                events.append(("speech_start", None))
+            if self._silence_run >= silence_frames or len(self._speech) >= max_frames:
+                events.extend(self._close_utterance())
+        return events
+
+    def flush(self) -> List[Tuple[str, Optional[np.ndarray]]]:
+        """End the current utterance now (client signalled end of speech)"""
+        if not self._in_speech:
+            return []
+        if len(self._remainder):
+            self._speech.append(self._remainder)
+            self._remainder = np.zeros(0, dtype=np.int16)
+        return self._close_utterance()
+
+    def _close_utterance(self) -> List[Tuple[str, Optional[np.ndarray]]]:
+        # Trailing silence beyond a short tail is not worth uploading
+        keep_tail = self._frames(200)
+        frames = self._speech
+        if self._silence_run > keep_tail:
+            frames = frames[:len(frames) - (self._silence_run - keep_tail)]
+        self._speech = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        voiced_ms = self._voiced * self.config.frame_ms
+        self._voiced = 0
+        self._announced = False
+        if voiced_ms < self.config.min_utterance_ms:
+            self.utterances_dropped += 1
+            return []
+        utterance = np.concatenate(frames)
+        self.utterances_emitted += 1
+        return [("utterance", utterance)]
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """Resample mono int16 audio (box-filter decimation for integer ratios)"""
+    if from_rate == to_rate or not len(samples):
+        return samples
+    if from_rate % to_rate == 0:
+        factor = from_rate // to_rate
+        usable = len(samples) - len(samples) % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1).astype(np.int16)
+    duration = len(samples) / from_rate
+    target_len = int(duration * to_rate)
+    positions = np.arange(target_len) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int, threshold: float = 0.01,
+                 pad_ms: int = 100, frame_ms: int = 20) -> np.ndarray:
+    """Drop leading and trailing frames quieter than ``threshold`` (a view, not a copy)"""
+    frame_len = sample_rate * frame_ms // 1000
+    if len(samples) < frame_len:
+        return samples
+    rms, _ = frame_features(samples, frame_len)
+    loud = np.flatnonzero(rms > threshold)
+    if not len(loud):
+        return samples[:0]
+    pad = sample_rate * pad_ms // 1000
+    start = max(0, loud[0] * frame_len - pad)
+    end = min(len(samples), (loud[-1] + 1) * frame_len + pad)
+    return samples[start:end]
+
+
+def normalize_for_transcription(audio_data: bytes, target_rate: int = DEFAULT_SAMPLE_RATE) -> bytes:
+    """Convert a PCM WAV clip to 16 kHz mono with leading/trailing silence trimmed.
+
+    Returns b"" when the clip is silent throughout, and the input unchanged
+    for formats this module cannot decode or when there is nothing to change.
+    """
+    if audio_data[:4] != b"RIFF":
+        return audio_data
+    decoded = decode_pcm16(audio_data)
+    if decoded is None:
+        return audio_data
+    samples, sample_rate = decoded
+    trimmed = trim_silence(resample(samples, sample_rate, target_rate), target_rate)
+    if not len(trimmed):
+        return b""
+    if sample_rate == target_rate and len(trimmed) == len(samples) and len(audio_data) == 44 + 2 * len(samples):
+        return audio_data
+    return encode_wav(trimmed, target_rate)
+
+
+# Leading bytes of the containers browsers and apps commonly send
+AUDIO_SIGNATURES = [
+    (b"RIFF", "audio.wav"),
+    (b"\x1aE\xdf\xa3", "audio.webm"),
+    (b"OggS", "audio.ogg"),
+    (b"fLaC", "audio.flac"),
+    (b"ID3", "audio.mp3"),
+    (b"\xff\xfb", "audio.mp3"),
+    (b"\xff\xf3", "audio.mp3"),
+]
+
+
+def guess_audio_filename(audio_data: bytes) -> str:
+    """File name with an extension matching the container, for the upload"""
+    for signature, filename in AUDIO_SIGNATURES:
+        if audio_data.startswith(signature):
+            return filename
+    if audio_data[4:8] == b"ftyp":
+        return "audio.m4a"
+    return "audio.wav"
@@ -0,0 +1,182 @@
+from typing import List, Optional
+
+import numpy as np
+
+from audio_processing import DEFAULT_SAMPLE_RATE
+
+# Levels are RMS or peak relative to full scale (1.0 == 0 dBFS)
+SILENCE_LEVEL = 0.003        # about -50 dBFS: frames below this count as silence
+QUIET_SPEECH_LEVEL = 0.0178  # about -35 dBFS: speech peaks below this are too quiet
+CLIP_THRESHOLD = 32600       # int16 magnitude treated as clipped
+MAX_CLIPPING_RATIO = 0.001
+MIN_SNR_DB = 15.0
+MAX_SILENCE_RATIO = 0.9
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+WIDEBAND_SAMPLE_RATE = 16000
+
+SUGGESTIONS = {
+    "no_audio": "No audio was received; check that your microphone is connected",
+    "too_short": "The recording is too short to check; send at least a second of audio",
+    "unsupported_format": "Send 16-bit PCM or WAV audio so it can be checked",
+    "invalid_sample_rate": "Your audio has an unusual sample rate; check your recording settings",
+    "clipping": "Your audio is distorting; move back from the microphone or lower its input level",
+    "too_quiet": "Speak closer to your microphone or raise its input level",
+    "mostly_silent": "We can hardly hear any speech; check that the right microphone is selected",
+    "noisy": "Try to minimize background noise",
+    "low_sample_rate": "Your microphone records at a low sample rate; a headset will sound clearer",
+}
+# Issues that make the audio hard to assess at all; the rest only degrade it
+SEVERE_ISSUES = {"unsupported_format", "invalid_sample_rate", "clipping", "too_quiet", "mostly_silent"}
+
+
+def to_dbfs(level: float) -> float:
+    return round(20 * float(np.log10(max(level, 1e-5))), 1)
+
+
+def frame_levels(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    """RMS level (0..1 full scale) of each whole frame; a trailing partial frame is ignored"""
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_len) / 32768.0
+
+
+def count_clipped(samples: np.ndarray) -> int:
+    return int(np.count_nonzero((samples >= CLIP_THRESHOLD) | (samples <= -CLIP_THRESHOLD)))
+
+
+def assess(levels: np.ndarray, clipped: int, n_samples: int, sample_rate: int,
+           report_silence: bool = True) -> dict:
+    """Quality report from per-frame levels and the clipped sample count"""
+    issues: List[str] = []
+    if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+        issues.append("invalid_sample_rate")
+    elif sample_rate < WIDEBAND_SAMPLE_RATE:
+        issues.append("low_sample_rate")
+
+    clipping_ratio = clipped / n_samples if n_samples else 0.0
+    report = {
+        "sample_rate": sample_rate,
+        "duration_ms": round(1000 * n_samples / sample_rate) if sample_rate else 0,
+        "rms_dbfs": None,
+        "speech_dbfs": None,
+        "noise_dbfs": None,
+        "snr_db": None,
+        "clipping_ratio": round(clipping_ratio, 5),
+        "silence_ratio": None,
+    }
+    if len(levels):
+        # Loud frames stand in for speech and quiet ones for the background
+        noise, speech = np.percentile(levels, (10, 95))
+        silence_ratio = float(np.count_nonzero(levels < SILENCE_LEVEL)) / len(levels)
+        report.update({
+            "rms_dbfs": to_dbfs(float(np.sqrt(np.mean(levels * levels)))),
+            "speech_dbfs": to_dbfs(speech),
+            "noise_dbfs": to_dbfs(noise),
+            "silence_ratio": round(silence_ratio, 3),
+        })
+        if clipping_ratio > MAX_CLIPPING_RATIO:
+            issues.append("clipping")
+        if silence_ratio > MAX_SILENCE_RATIO or speech < SILENCE_LEVEL:
+            if report_silence:
+                issues.append("mostly_silent")
+        elif speech < QUIET_SPEECH_LEVEL:
+            issues.append("too_quiet")
+        # Too few frames to tell speech from background
+        if len(levels) >= 10 and speech >= SILENCE_LEVEL:
+            report["snr_db"] = round(to_dbfs(speech) - to_dbfs(noise), 1)
+            if report["snr_db"] < MIN_SNR_DB:
+                issues.append("noisy")
+
+    if any(issue in SEVERE_ISSUES for issue in issues):
+        quality = "poor"
+    elif issues:
+        quality = "fair"
+    else:
+        quality = "good"
+    report.update({
+        "quality": quality,
+        "issues": issues,
+        "suggestions": [SUGGESTIONS[issue] for issue in issues],
+    })
+    return report
+
+
+def analyze_samples(samples: np.ndarray, sample_rate: int = DEFAULT_SAMPLE_RATE, frame_ms: int = 20) -> dict:
+    """Level, clipping, SNR and silence report for mono int16 samples (read in place, not copied)"""
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    if not len(samples):
+        return unanalyzable_report("no_audio")
+    # Not one whole frame: there are no levels to judge, which is not "good"
+    if len(samples) < frame_len:
+        return unanalyzable_report("too_short")
+    return assess(frame_levels(samples, frame_len), count_clipped(samples), len(samples), sample_rate)
+
+
+def unanalyzable_report(issue: str) -> dict:
+    """Report for audio that cannot be analysed: "no_audio", "too_short" (under one frame) or
+    "unsupported_format" (compressed codecs)"""
+    return {"quality": "unknown", "issues": [issue], "suggestions": [SUGGESTIONS[issue]]}
+
+
+class AudioQualityMonitor:
+    """Rolling audio quality for a live session, fed chunk by chunk.
+
+    Frame levels and clip counts of the last ``window_ms`` are kept in fixed
+    ring buffers, so each chunk is analysed once where it lies and the report
+    covers recent audio only. Long silences are normal on a live microphone
+    (the examiner is talking), so "mostly_silent" is not reported here.
+    """
+
+    def __init__(self, window_ms: int = 10000, frame_ms: int = 20, min_ms: int = 2000):
+        self.frame_ms = frame_ms
+        self.min_frames = max(1, min_ms // frame_ms)
+        size = max(1, window_ms // frame_ms)
+        self._levels = np.zeros(size, dtype=np.float32)
+        self._clipped = np.zeros(size, dtype=np.int32)
+        self._frame_len = DEFAULT_SAMPLE_RATE * frame_ms // 1000
+        self._next = 0
+        self._filled = 0
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+        self.verdict: Optional[tuple] = None
+
+    def feed(self, samples: np.ndarray, sample_rate: int = DEFAULT_SAMPLE_RATE) -> Optional[dict]:
+        """Add a chunk; returns a report when the verdict (quality and issues) changes"""
+        if sample_rate != self.sample_rate:
+            self.sample_rate = sample_rate
+            self._frame_len = max(1, sample_rate * self.frame_ms // 1000)
+            # Frames at the old rate are dropped: start the ring over
+            self._next = 0
+            self._filled = 0
+        frame_len = self._frame_len
+        n_frames = len(samples) // frame_len
+        if not n_frames:
+            return None
+        size = len(self._levels)
+        if n_frames > size:
+            samples = samples[(n_frames - size) * frame_len:]
+            n_frames = size
+        whole = samples[:n_frames * frame_len]
+        clipped = ((whole >= CLIP_THRESHOLD) | (whole <= -CLIP_THRESHOLD)).reshape(n_frames, frame_len)
+        positions = (self._next + np.arange(n_frames)) % size
+        self._levels[positions] = frame_levels(whole, frame_len)
+        self._clipped[positions] = np.count_nonzero(clipped, axis=1)
+        self._next = (self._next + n_frames) % size
+        self._filled = min(size, self._filled + n_frames)
+        if self._filled < self.min_frames:
+            return None
+
+        report = self.report()
+        verdict = (report["quality"], tuple(report["issues"]))
+        if verdict == self.verdict:
+            return None
+        self.verdict = verdict
+        return report
+
+    def report(self) -> dict:
+        levels = self._levels[:self._filled] if self._filled < len(self._levels) else self._levels
+        clipped = self._clipped[:self._filled] if self._filled < len(self._clipped) else self._clipped
+        report = assess(levels, int(clipped.sum()), len(levels) * self._frame_len, self.sample_rate,
+                        report_silence=False)
+        report["duration_ms"] = len(levels) * self.frame_ms
+        return report
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BatchRunner = Callable[[List[Any]], Awaitable[List[Optional[Any]]]]
+SingleRunner = Callable[[Any], Awaitable[Any]]
+
+
+class MicroBatcher:
+    """Coalesces jobs that arrive close together into one model call.
+
+    Jobs are collected for up to ``window_ms`` after the first one arrives,
+    or until ``max_items`` are waiting, then handed to ``run_batch`` together.
+    ``run_batch`` returns one result per job, with None for any it could not
+    produce; those jobs (or the whole batch, if ``run_batch`` fails) are
+    retried one by one with ``run_single``.
+    """
+
+    def __init__(self, run_batch: BatchRunner, run_single: SingleRunner, window_ms: float = 30.0,
+                 max_items: int = 8, name: str = "batch"):
+        self.run_batch = run_batch
+        self.run_single = run_single
+        self.window_ms = window_ms
+        self.max_items = max_items
+        self.name = name
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()
+        self.jobs = 0
+        self.batches = 0
+        self.model_calls = 0
+        self.fallbacks = 0
+
+    async def submit(self, job: Any) -> Any:
+        """Queue a job and wait for its own result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((job, future))
+        self.jobs += 1
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[tuple]):
+        jobs = [job for job, _ in batch]
+        results: List[Optional[Any]] = [None] * len(jobs)
+        if len(jobs) > 1:
+            self.batches += 1
+            self.model_calls += 1
+            try:
+                results = list(await self.run_batch(jobs))
+                if len(results) != len(jobs):
+                    raise ValueError(f"expected {len(jobs)} results, got {len(results)}")
+            except Exception as e:
+                logger.warning(f"{self.name}: batch of {len(jobs)} failed, falling back to single calls: {e}")
+                results = [None] * len(jobs)
+
+        retry = [i for i, result in enumerate(results) if result is None]
+        if retry:
+            if len(jobs) > 1:
+                self.fallbacks += len(retry)
+            self.model_calls += len(retry)
+            singles = await asyncio.gather(*(self.run_single(jobs[i]) for i in retry), return_exceptions=True)
+            for i, result in zip(retry, singles):
+                results[i] = result
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # Caller gave up waiting
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "jobs": self.jobs,
+            "batches": self.batches,
+            "model_calls": self.model_calls,
+            "fallbacks": self.fallbacks,
+            "calls_saved": self.jobs - self.model_calls,
+        }
+
+
+def numbered_items(items: List[str]) -> str:
+    """Items laid out as "Item 1: ..." blocks for a multi-item prompt"""
+    return "\n\n".join(f"Item {i}:\n{item}" for i, item in enumerate(items, 1))
+
+
+def parse_batch_results(text_output: str, count: int) -> List[Optional[dict]]:
+    """Read the JSON array answer to a multi-item prompt.
+
+    Results are matched by their "item" number when the model includes it,
+    by position otherwise; anything missing or malformed comes back as None.
+    """
+    parsed = json.loads(text_output[text_output.index("["): text_output.rindex("]") + 1])
+    results: List[Optional[dict]] = [None] * count
+    for position, entry in enumerate(parsed):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.pop("item", position + 1)
+        if isinstance(index, int) and 1 <= index <= count and results[index - 1] is None:
+            results[index - 1] = entry
+    return results
@@ -0,0 +1,104 @@
+"""Sustained write throughput of the session archive from many concurrent sessions.
+
+Each simulated session submits a record every ``--interval-ms`` (a saved
+snapshot the size of a finished session's history) while a probe task
+measures event loop lag, so the cost of archiving on the WebSocket loop
+shows up directly. The group-commit writer is compared with
+``batch_max=1`` (one transaction per record, as a naive insert-per-request
+store would do).
+
+    python bench/archive_throughput.py --sessions 100 500 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_archive import SessionArchive
+
+TURN = {"type": "candidate", "content": "I usually spend my weekends with my family, and sometimes we go "
+                                        "to the park near our house.", "timestamp": "2024-01-01T10:00:00"}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_session(archive: SessionArchive, session_id: str, stop_at: float, interval: float,
+                      turns: int, submit_us: list):
+    record = {"conversation_history": [TURN] * turns, "total_duration": 900000, "parts_completed": 3}
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        archive.submit(session_id, "saved", record)
+        submit_us.append((time.perf_counter() - start) * 1e6)
+        await asyncio.sleep(interval)
+
+
+async def probe_loop_lag(stop_at: float, lags: list):
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append((time.perf_counter() - start - 0.005) * 1000)
+
+
+async def run(path: str, sessions: int, seconds: float, interval_ms: float, turns: int, batch_max: int) -> dict:
+    archive = SessionArchive(path, batch_max=batch_max)
+    await archive.start()
+    submit_us, lags = [], []
+    start = time.perf_counter()
+    stop_at = start + seconds
+    await asyncio.gather(
+        probe_loop_lag(stop_at, lags),
+        *(run_session(archive, f"session-{batch_max}-{i}", stop_at, interval_ms / 1000, turns, submit_us)
+          for i in range(sessions)))
+    submitted_in = time.perf_counter() - start
+    await archive.close()
+    drained_in = time.perf_counter() - start
+    stats = archive.stats()
+    return {
+        "batch_max": batch_max,
+        "sessions": sessions,
+        "submitted": len(submit_us),
+        "written": stats["records_written"],
+        "dropped": stats["records_dropped"],
+        "offered_per_s": len(submit_us) / submitted_in,
+        "written_per_s": stats["records_written"] / drained_in,
+        "backlog_s": drained_in - submitted_in,
+        "mean_batch": stats["mean_batch_size"],
+        "submit_p99_us": percentile(submit_us, 99),
+        "lag_p50_ms": statistics.median(lags),
+        "lag_p99_ms": percentile(lags, 99),
+    }
+
+
+async def main(args):
+    header = (f"{'batch':>6} {'sessions':>8} {'offered/s':>10} {'written/s':>10} {'backlog s':>9} "
+              f"{'mean batch':>10} {'submit p99 us':>13} {'lag p50 ms':>10} {'lag p99 ms':>10} {'dropped':>7}")
+    print(header)
+    with tempfile.TemporaryDirectory() as tmp:
+        for sessions in args.sessions:
+            for batch_max in (args.batch_max, 1):
+                path = os.path.join(tmp, f"archive-{sessions}-{batch_max}.db")
+                row = await run(path, sessions, args.seconds, args.interval_ms, args.turns, batch_max)
+                print(f"{row['batch_max']:>6} {row['sessions']:>8} {row['offered_per_s']:>10.0f} "
+                      f"{row['written_per_s']:>10.0f} {row['backlog_s']:>9.2f} {row['mean_batch']:>10.1f} "
+                      f"{row['submit_p99_us']:>13.1f} {row['lag_p50_ms']:>10.2f} {row['lag_p99_ms']:>10.2f} "
+                      f"{row['dropped']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[100, 300, 500])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--interval-ms", type=float, default=50.0,
+                        help="Time between records from one session")
+    parser.add_argument("--turns", type=int, default=20, help="History turns in each record")
+    parser.add_argument("--batch-max", type=int, default=512)
+    asyncio.run(main(parser.parse_args()))
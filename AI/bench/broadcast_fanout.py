@@ -0,0 +1,153 @@
+"""Broadcast to thousands of simulated sockets: sequential sends vs buffered fan-out.
+
+Each simulated socket records when a frame reaches it. A share of them are
+slow (every send takes ``--slow-ms``) and, for the fan-out path, a few are
+stalled (a send never completes). The old ``broadcast`` awaited each socket
+in turn with ``json.dumps`` per recipient, so every healthy client waits
+behind the slow ones (and forever behind a stalled one, which is why that
+case is only run for fan-out). With per-connection send buffers, a
+broadcast serialises once and returns after queueing; healthy clients get
+the message within the writer tasks' scheduling time and stalled ones are
+evicted by the send watchdog after ``SEND_TIMEOUT_SECONDS``.
+
+    python bench/broadcast_fanout.py --sockets 5000 --slow 0.01 --stalled 0.002
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GROQ_API_KEY", "fake-key")
+os.environ.setdefault("SESSION_ARCHIVE_PATH", "")
+
+
+class SimulatedSocket:
+    def __init__(self, delay: float = 0.0, stalled: bool = False):
+        self.delay = delay
+        self.stalled = stalled
+        self.received_at = None
+
+    async def send_text(self, text: str):
+        if self.stalled:
+            await asyncio.Event().wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received_at = time.perf_counter()
+
+    async def send_bytes(self, data: bytes):
+        await self.send_text("")
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_sockets(count: int, slow: float, stalled: float, slow_ms: float) -> list:
+    n_slow, n_stalled = int(count * slow), int(count * stalled)
+    # Spread the slow and stalled ones through the connection order
+    sockets = [SimulatedSocket() for _ in range(count)]
+    for i in range(n_slow):
+        sockets[(i * 7919) % count].delay = slow_ms / 1000
+    for i in range(n_stalled):
+        sockets[(i * 104729 + 1) % count].stalled = True
+    return sockets
+
+
+async def sequential_broadcast(sockets: dict, message: dict):
+    # The previous ConnectionManager.broadcast
+    for session_id in sockets:
+        await sockets[session_id].send_text(json.dumps(message))
+
+
+def report(label: str, sockets: list, start: float, returned: float, evicted: int = 0) -> dict:
+    healthy = [s for s in sockets if not s.delay and not s.stalled]
+    delivered = [(s.received_at - start) * 1000 for s in healthy if s.received_at is not None]
+    return {
+        "path": label,
+        "returned_ms": (returned - start) * 1000,
+        "delivered": f"{len(delivered)}/{len(healthy)}",
+        "p50_ms": statistics.median(delivered) if delivered else float("nan"),
+        "p99_ms": percentile(delivered, 99) if delivered else float("nan"),
+        "max_ms": max(delivered) if delivered else float("nan"),
+        "evicted": evicted,
+    }
+
+
+async def run_sequential(args, message: dict) -> dict:
+    sockets = make_sockets(args.sockets, args.slow, 0.0, args.slow_ms)
+    start = time.perf_counter()
+    await sequential_broadcast({f"s{i}": ws for i, ws in enumerate(sockets)}, message)
+    return report("sequential", sockets, start, time.perf_counter())
+
+
+async def run_fanout(app_module, args, message: dict, stalled: float) -> dict:
+    manager = app_module.manager
+    sockets = make_sockets(args.sockets, args.slow, stalled, args.slow_ms)
+    for i, websocket in enumerate(sockets):
+        manager.active_connections[f"fanout-{i}"] = websocket
+        manager.attach_send_buffer(f"fanout-{i}", websocket)
+    evicted_before = manager.evicted_count
+    # Let the writer tasks start before timing
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await manager.broadcast(message)
+    returned = time.perf_counter()
+    healthy = [s for s in sockets if not s.delay and not s.stalled]
+    pending = healthy
+    while pending and time.perf_counter() - start < 5:
+        await asyncio.sleep(0)
+        pending = [s for s in pending if s.received_at is None]
+    row = report("fan-out" + (" +stalled" if stalled else ""), sockets, start, returned)
+    if stalled:
+        # Stalled clients are evicted once SEND_TIMEOUT_SECONDS has passed
+        await asyncio.sleep(app_module.SEND_TIMEOUT_SECONDS + 0.2)
+        row["evicted"] = manager.evicted_count - evicted_before
+    for i in range(len(sockets)):
+        await manager.disconnect(f"fanout-{i}")
+    # Let the cancelled writers finish
+    await asyncio.sleep(0.01)
+    return row
+
+
+async def main(args):
+    os.environ.setdefault("SEND_TIMEOUT_SECONDS", str(args.send_timeout))
+    logging.disable(logging.WARNING)
+    import app as app_module
+    from fanout import ENCODER
+
+    message = {"type": "announcement", "message": "The practice server will restart in 5 minutes.",
+               "timestamp": app_module.message_timestamp()}
+    print(f"{args.sockets} sockets, {args.slow:.1%} slow ({args.slow_ms:.0f} ms per send), "
+          f"encoder {ENCODER}")
+    watchdog = asyncio.create_task(app_module.manager.watch_send_buffers(0.1))
+    rows = [await run_sequential(args, message), await run_fanout(app_module, args, message, 0.0)]
+    if args.stalled:
+        rows.append(await run_fanout(app_module, args, message, args.stalled))
+    watchdog.cancel()
+    print(f"{'path':<18} {'returned ms':>11} {'delivered':>11} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'evicted':>7}")
+    for row in rows:
+        print(f"{row['path']:<18} {row['returned_ms']:>11.1f} {row['delivered']:>11} {row['p50_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['evicted']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, default=5000)
+    parser.add_argument("--slow", type=float, default=0.01, help="Share of sockets that are slow")
+    parser.add_argument("--slow-ms", type=float, default=50.0)
+    parser.add_argument("--stalled", type=float, default=0.002, help="Share of sockets that never finish a send")
+    parser.add_argument("--send-timeout", type=float, default=1.0,
+                        help="SEND_TIMEOUT_SECONDS for this run, so stalled clients are evicted quickly")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""Model requests and latency for evaluation calls, with and without micro-batching.
+
+Answer evaluations arrive as a Poisson process at each ``--rates`` (per
+second) for ``--seconds``; the same arrivals are run once with one request
+per answer and once through the micro-batcher.
+
+    python bench/eval_batching.py --rates 5 20 100 400 --window-ms 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_groq import FakeGroqServer
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(app, rate: float, seconds: float, batching: bool, seed: int = 0) -> dict:
+    app.EVAL_BATCHING = batching
+    rng = random.Random(seed)
+    before = app.answer_evaluator.stats()
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        await app.evaluate_response_realtime("Do you like reading?", "Yes, I read every evening before bed.")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tasks = []
+    elapsed = 0.0
+    started = time.perf_counter()
+    while True:
+        elapsed += rng.expovariate(rate)
+        if elapsed > seconds:
+            break
+        await asyncio.sleep(max(0.0, started + elapsed - time.perf_counter()))
+        tasks.append(asyncio.create_task(one()))
+    await asyncio.gather(*tasks)
+
+    after = app.answer_evaluator.stats()
+    return {
+        "jobs": len(tasks),
+        "requests": after["model_calls"] - before["model_calls"] if batching else len(tasks),
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+async def main(args):
+    import logging
+    logging.disable(logging.INFO)
+    import app
+
+    print(f"window={args.window_ms}ms max_items={args.max_items}, model latency {args.latency_ms}ms")
+    print(f"{'rate/s':>7} {'jobs':>5} {'single reqs':>11} {'batched reqs':>12} {'saved':>6} "
+          f"{'single p50':>10} {'batched p50':>11} {'single p99':>10} {'batched p99':>11}")
+    for rate in args.rates:
+        single = await run(app, rate, args.seconds, batching=False)
+        batched = await run(app, rate, args.seconds, batching=True)
+        saved = 1 - batched["requests"] / single["requests"]
+        print(f"{rate:>7g} {single['jobs']:>5} {single['requests']:>11} {batched['requests']:>12} {saved:>6.0%} "
+              f"{single['p50']:>10.0f} {batched['p50']:>11.0f} {single['p99']:>10.0f} {batched['p99']:>11.0f}")
+    await app.gateway.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", type=float, nargs="+", default=[5, 20, 100, 400])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=1.0)
+    parser.add_argument("--window-ms", type=float, default=30.0)
+    parser.add_argument("--max-items", type=int, default=8)
+    args = parser.parse_args()
+
+    with FakeGroqServer(latency_ms=args.latency_ms, token_ms=args.token_ms) as server:
+        os.environ.update({
+            "GROQ_API_KEY": "bench",
+            "GROQ_BASE_URL": server.base_url,
+            "EVAL_BATCH_WINDOW_MS": str(args.window_ms),
+            "EVAL_BATCH_MAX_ITEMS": str(args.max_items),
+        })
+        asyncio.run(main(args))
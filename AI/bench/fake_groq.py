@@ -0,0 +1,237 @@
+"""Local stand-in for the Groq HTTP API, used by the benchmarks in this folder.
+
+Serves the three endpoints the voice service calls (chat completions, Whisper
+transcriptions and speech) with canned responses after a delay drawn from a
+configurable distribution (seeded, so runs are repeatable). With
+``tokens_per_minute`` set, chat completions are rate limited like Groq: every
+response carries x-ratelimit-* headers and calls over the budget get a 429
+with retry-after.
+
+    python bench/fake_groq.py --port 8900 --latency-ms 200 --jitter-ms 50 --distribution lognormal
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import random
+import re
+import socket
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+
+CANNED_REPLY = ("That's interesting, thank you for sharing that with me. "
+                "Can you tell me a little more about why you enjoy it? "
+                "And how often do you usually find time for it?")
+CANNED_EVALUATION = json.dumps({
+    "feedback": "Clear answer with relevant detail.",
+    "score": 6.5,
+    "strengths": ["Relevant ideas"],
+    "suggestions": ["Add an example"],
+    "fluency": 6.5,
+    "vocabulary": 6.0,
+    "grammar": 6.5,
+    "pronunciation": 6.5,
+})
+CANNED_TRANSCRIPT = "I live in Tashkent and I really enjoy reading books in my free time."
+CANNED_AUDIO = b"ID3" + bytes(16 * 1024)
+
+LATENCY_DISTRIBUTIONS = ("normal", "lognormal", "exponential", "fixed")
+
+
+def sample_latency(rng: random.Random, distribution: str, mean: float, jitter: float) -> float:
+    """One delay in ms; ``jitter`` is the standard deviation (unused by exponential)"""
+    if distribution == "exponential":
+        return rng.expovariate(1 / mean) if mean > 0 else 0.0
+    if distribution == "fixed" or not jitter or mean <= 0:
+        return mean
+    if distribution == "lognormal":
+        # Long right tail like real API latency, with the requested mean and spread
+        sigma2 = math.log(1 + (jitter / mean) ** 2)
+        return rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+    return max(0.0, rng.gauss(mean, jitter))
+
+
+def create_app(latency_ms: float = 200.0, jitter_ms: float = 0.0, seed: int = 0,
+               endpoint_latency_ms: Optional[Dict[str, float]] = None,
+               token_ms: float = 0.0, tts_char_ms: float = 0.0, distribution: str = "normal",
+               tokens_per_minute: float = 0.0) -> FastAPI:
+    """``endpoint_latency_ms`` overrides the mean latency for "chat",
+    "transcribe" or "speech"; chat latency is time to first token and
+    ``token_ms`` is added per generated word, streamed or not. Speech takes
+    an extra ``tts_char_ms`` per input character. ``distribution`` is one of
+    LATENCY_DISTRIBUTIONS. ``tokens_per_minute`` (0 for no limit) rate limits
+    chat completions on prompt characters / 4 plus ``max_tokens``."""
+    if distribution not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+    app = FastAPI(title="Fake Groq")
+    rng = random.Random(seed)
+    overrides = endpoint_latency_ms or {}
+    app.state.requests = 0
+    app.state.rate_limited = 0
+    bucket = {"level": tokens_per_minute, "updated": time.monotonic()}
+
+    @app.exception_handler(ClientDisconnect)
+    async def client_disconnected(request: Request, exc: ClientDisconnect):
+        # The caller gave up mid-request (a cancelled turn or a lost hedge): not a server error
+        return Response(status_code=499)
+
+    def rate_limit(body: dict):
+        """(headers, retry_after) for a chat call; retry_after is None if it is within the budget"""
+        if not tokens_per_minute:
+            return {}, None
+        now = time.monotonic()
+        rate = tokens_per_minute / 60
+        bucket["level"] = min(tokens_per_minute, bucket["level"] + (now - bucket["updated"]) * rate)
+        bucket["updated"] = now
+        tokens = sum(len(m["content"]) for m in body["messages"]) // 4 + body.get("max_tokens", 0)
+        retry_after = None
+        if tokens > bucket["level"]:
+            retry_after = (tokens - bucket["level"]) / rate
+        else:
+            bucket["level"] -= tokens
+        headers = {
+            "x-ratelimit-limit-requests": "14400",
+            "x-ratelimit-remaining-requests": "14000",
+            "x-ratelimit-limit-tokens": str(int(tokens_per_minute)),
+            "x-ratelimit-remaining-tokens": str(int(bucket["level"])),
+            "x-ratelimit-reset-tokens": f"{(tokens_per_minute - bucket['level']) / rate:.2f}s",
+        }
+        if retry_after is not None:
+            headers["retry-after"] = str(max(1, math.ceil(retry_after)))
+        return headers, retry_after
+
+    async def delay(endpoint: str):
+        app.state.requests += 1
+        mean = overrides.get(endpoint, latency_ms)
+        wait = sample_latency(rng, distribution, mean, jitter_ms)
+        await asyncio.sleep(wait / 1000)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        limit_headers, retry_after = rate_limit(body)
+        if retry_after is not None:
+            app.state.rate_limited += 1
+            return JSONResponse({"error": {"message": "Rate limit reached", "type": "tokens",
+                                           "code": "rate_limit_exceeded"}},
+                                status_code=429, headers=limit_headers)
+        await delay("chat")
+        prompt = body["messages"][-1]["content"]
+        if "JSON array" in prompt:
+            # Multi-item evaluation prompt: one result per "Item N:" block
+            items = len(re.findall(r"^\s*Item \d+:", prompt, re.MULTILINE))
+            content = json.dumps([{"item": i, **json.loads(CANNED_EVALUATION)} for i in range(1, items + 1)])
+        else:
+            content = CANNED_EVALUATION if "JSON" in prompt else CANNED_REPLY
+        words = content.split(" ")
+        if body.get("stream"):
+            return StreamingResponse(stream_words(body.get("model"), words),
+                                     media_type="text/event-stream", headers=limit_headers)
+        await asyncio.sleep(len(words) * token_ms / 1000)
+        return JSONResponse({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 20, "total_tokens": 70},
+        }, headers=limit_headers)
+
+    async def stream_words(model, words):
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(token_ms / 1000)
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else " " + word},
+                    "finish_reason": None,
+                }],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        form = await request.form()
+        await delay("transcribe")
+        if form.get("response_format") != "verbose_json":
+            return JSONResponse({"text": CANNED_TRANSCRIPT})
+        # Evenly paced words with one long pause, for the fluency metrics
+        words, t = [], 0.0
+        for i, word in enumerate(CANNED_TRANSCRIPT.rstrip(".").split()):
+            t += 1.2 if i == 5 else 0.08
+            words.append({"word": word, "start": round(t, 2), "end": round(t + 0.3, 2)})
+            t += 0.3
+        return JSONResponse({"text": CANNED_TRANSCRIPT, "duration": t, "words": words})
+
+    @app.post("/openai/v1/audio/speech")
+    async def speech(request: Request):
+        body = await request.json()
+        await delay("speech")
+        await asyncio.sleep(len(body.get("input", "")) * tts_char_ms / 1000)
+        return Response(CANNED_AUDIO, media_type="audio/mpeg")
+
+    return app
+
+
+def _serve(port: int, kwargs: dict):
+    uvicorn.run(create_app(**kwargs), host="127.0.0.1", port=port,
+                log_level="warning", backlog=4096)
+
+
+class FakeGroqServer:
+    """Runs the fake API in a child process so it does not share the GIL
+    with the code being measured"""
+
+    def __init__(self, port: int = 8900, **kwargs):
+        self.port = port
+        self.process = multiprocessing.Process(target=_serve, args=(port, kwargs), daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.process.start()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.2).close()
+                return self
+            except OSError:
+                time.sleep(0.05)
+        self.process.terminate()
+        raise RuntimeError(f"Fake Groq server did not start on port {self.port}")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=0.0)
+    parser.add_argument("--distribution", default="normal", choices=LATENCY_DISTRIBUTIONS)
+    parser.add_argument("--tokens-per-minute", type=float, default=0.0)
+    args = parser.parse_args()
+    _serve(args.port, {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                       "token_ms": args.token_ms, "distribution": args.distribution,
+                       "tokens_per_minute": args.tokens_per_minute})
@@ -0,0 +1,127 @@
+"""Minimal Redis-protocol stand-in for running the shared session store offline.
+
+Speaks enough RESP2 for RedisSessionStore: PING, GET, SET (with EX), DEL,
+EXPIRE, PUBLISH, SUBSCRIBE and UNSUBSCRIBE, plus the CLIENT handshake
+redis-py sends on connect. Clients must stay on RESP2 (redis-py 8 defaults
+to RESP3, so use a URL like ``redis://127.0.0.1:6390/0?protocol=2``).
+
+    python bench/fake_redis.py --port 6390
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Set
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: Dict[bytes, bytes] = {}
+        self.expiry: Dict[bytes, float] = {}
+        self.channels: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        deadline = self.expiry.get(key)
+        if deadline is not None and deadline < time.monotonic():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return self.data.get(key)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 6390):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriptions: Set[bytes] = set()
+        try:
+            while True:
+                command = await read_command(reader)
+                if command is None:
+                    break
+                writer.write(self.execute(command, writer, subscriptions))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in subscriptions:
+                self.channels.get(channel, set()).discard(writer)
+            writer.close()
+
+    def execute(self, command: List[bytes], writer, subscriptions: Set[bytes]) -> bytes:
+        name = command[0].upper()
+        args = command[1:]
+        if name == b"PING":
+            return encode([b"pong", b""]) if subscriptions else b"+PONG\r\n"
+        if name in (b"CLIENT", b"SELECT"):
+            return b"+OK\r\n"
+        if name == b"GET":
+            return encode(self._get(args[0]))
+        if name == b"SET":
+            self.data[args[0]] = args[1]
+            self.expiry.pop(args[0], None)
+            if len(args) >= 4 and args[2].upper() == b"EX":
+                self.expiry[args[0]] = time.monotonic() + int(args[3])
+            return b"+OK\r\n"
+        if name == b"DEL":
+            removed = 0
+            for key in args:
+                removed += self.data.pop(key, None) is not None
+                self.expiry.pop(key, None)
+            return encode(removed)
+        if name == b"EXPIRE":
+            if self._get(args[0]) is None:
+                return encode(0)
+            self.expiry[args[0]] = time.monotonic() + int(args[1])
+            return encode(1)
+        if name == b"PUBLISH":
+            listeners = self.channels.get(args[0], set())
+            for listener in list(listeners):
+                listener.write(encode([b"message", args[0], args[1]]))
+            return encode(len(listeners))
+        if name == b"SUBSCRIBE":
+            replies = b""
+            for channel in args:
+                subscriptions.add(channel)
+                self.channels.setdefault(channel, set()).add(writer)
+                replies += encode([b"subscribe", channel, len(subscriptions)])
+            return replies
+        if name == b"UNSUBSCRIBE":
+            replies = b""
+            for channel in args or list(subscriptions):
+                subscriptions.discard(channel)
+                self.channels.get(channel, set()).discard(writer)
+                replies += encode([b"unsubscribe", channel, len(subscriptions)])
+            return replies
+        return b"-ERR unknown command '" + command[0] + b"'\r\n"
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.strip().split()  # inline command
+    parts = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        parts.append((await reader.readexactly(size + 2))[:-2])
+    return parts
+
+
+def encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+    raise TypeError(f"Cannot encode {type(value)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(FakeRedis().serve(port=args.port))
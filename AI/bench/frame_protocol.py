@@ -0,0 +1,92 @@
+"""Bytes on the wire and per-message CPU: base64-in-JSON vs binary audio frames.
+
+Measures what the voice WebSocket does for one audio message in each
+direction, for a range of clip sizes:
+
+* outbound ``ai_audio``: base64 + json.dumps + UTF-8 encode, vs encode_frame
+* inbound ``audio_chunk``: json.loads + base64 decode, vs decode_frame + bytes()
+
+    python bench/frame_protocol.py --sizes 16 64 256 1024
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_frames import AI_AUDIO, AUDIO_CHUNK, CODEC_MP3, CODEC_WAV, decode_frame, encode_frame
+
+
+def ws_header_size(payload_len: int) -> int:
+    # Server frames are unmasked; client frames add a 4-byte mask
+    if payload_len < 126:
+        return 2
+    if payload_len < 65536:
+        return 4
+    return 10
+
+
+def per_call_us(fn, budget_s: float = 0.3) -> float:
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < budget_s:
+        fn()
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def measure(size_kb: int) -> dict:
+    audio = os.urandom(size_kb * 1024)
+
+    def json_out():
+        return json.dumps({
+            "type": "ai_audio",
+            "audio_data": base64.b64encode(audio).decode(),
+            "seq": 0,
+            "timestamp": datetime.now().isoformat(),
+        }).encode()
+
+    def binary_out():
+        return encode_frame(AI_AUDIO, audio, 0, CODEC_MP3)
+
+    json_in_text = json.dumps({"type": "audio_chunk",
+                               "audio_data": base64.b64encode(audio).decode()})
+    binary_in_frame = encode_frame(AUDIO_CHUNK, audio, 0, CODEC_WAV)
+
+    def json_in():
+        return base64.b64decode(json.loads(json_in_text)["audio_data"])
+
+    def binary_in():
+        return bytes(decode_frame(binary_in_frame).payload)
+
+    json_wire = len(json_out())
+    binary_wire = len(binary_out())
+    return {
+        "size_kb": size_kb,
+        "json_wire": json_wire + ws_header_size(json_wire),
+        "binary_wire": binary_wire + ws_header_size(binary_wire),
+        "json_out_us": per_call_us(json_out),
+        "binary_out_us": per_call_us(binary_out),
+        "json_in_us": per_call_us(json_in),
+        "binary_in_us": per_call_us(binary_in),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 64, 256, 1024],
+                        help="clip sizes in KiB")
+    args = parser.parse_args()
+
+    print(f"{'clip KiB':>8} {'json bytes':>11} {'bin bytes':>10} {'saved':>6} "
+          f"{'json out us':>11} {'bin out us':>10} {'json in us':>10} {'bin in us':>9}")
+    for size in args.sizes:
+        row = measure(size)
+        saved = 1 - row["binary_wire"] / row["json_wire"]
+        print(f"{row['size_kb']:>8} {row['json_wire']:>11} {row['binary_wire']:>10} {saved:>6.0%} "
+              f"{row['json_out_us']:>11.1f} {row['binary_out_us']:>10.1f} "
+              f"{row['json_in_us']:>10.1f} {row['binary_in_us']:>9.1f}")
@@ -0,0 +1,88 @@
+"""Ping round-trip time on the voice WebSocket while a burst of audio is transcribed.
+
+The candidate floods the socket with audio chunks against a slow fake Groq
+server, then pings every ``--interval-ms``; pongs must keep coming back
+quickly even though transcriptions are backed up.
+
+    python bench/heartbeat_latency.py --chunks 40 --latency-ms 1500 --overflow coalesce
+"""
+import argparse
+import base64
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_groq import FakeGroqServer
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(client, chunks: int, pings: int, interval_ms: int) -> dict:
+    with client.websocket_connect("/ws/voice-chat/heartbeat") as ws:
+        pongs: queue.Queue = queue.Queue()
+        counts = {}
+
+        def reader():
+            while True:
+                try:
+                    message = json.loads(ws.receive_text())
+                except Exception:
+                    return
+                counts[message["type"]] = counts.get(message["type"], 0) + 1
+                if message["type"] == "pong":
+                    pongs.put(time.perf_counter())
+
+        threading.Thread(target=reader, daemon=True).start()
+        # Compressed audio is not segmented, so every chunk is a transcription
+        chunk = base64.b64encode(b"OggS" + os.urandom(4096)).decode()
+        for _ in range(chunks):
+            ws.send_text(json.dumps({"type": "audio_chunk", "audio_data": chunk}))
+
+        rtts = []
+        for _ in range(pings):
+            sent = time.perf_counter()
+            ws.send_text(json.dumps({"type": "ping"}))
+            rtts.append((pongs.get(timeout=10) - sent) * 1000)
+            time.sleep(interval_ms / 1000)
+        return {"rtts": rtts, "counts": counts}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--pings", type=int, default=30)
+    parser.add_argument("--interval-ms", type=int, default=100)
+    parser.add_argument("--latency-ms", type=int, default=1500)
+    parser.add_argument("--overflow", default="coalesce", choices=["drop_oldest", "coalesce", "reject"])
+    parser.add_argument("--queue", type=int, default=16)
+    args = parser.parse_args()
+
+    with FakeGroqServer(latency_ms=args.latency_ms) as server:
+        os.environ.update({
+            "GROQ_API_KEY": "bench",
+            "GROQ_BASE_URL": server.base_url,
+            "TTS_CACHE_PREWARM": "0",
+            "INBOUND_OVERFLOW": args.overflow,
+            "INBOUND_AUDIO_QUEUE": str(args.queue),
+        })
+        import logging
+        logging.disable(logging.INFO)
+        import app
+        from fastapi.testclient import TestClient
+
+        with TestClient(app.app) as client:
+            result = run(client, args.chunks, args.pings, args.interval_ms)
+
+    rtts = result["rtts"]
+    print(f"{args.chunks} chunks queued against {args.latency_ms} ms transcription, overflow={args.overflow}")
+    print(f"ping rtt: p50={percentile(rtts, 0.5):.1f}ms p99={percentile(rtts, 0.99):.1f}ms max={max(rtts):.1f}ms")
+    print(f"messages received: {result['counts']}")
@@ -0,0 +1,74 @@
+"""Per-session memory of the conversation history after a long session.
+
+Compares the old unbounded list of dicts (ISO timestamp strings) with
+ConversationHistory (slotted turns, ring-buffer window, rolling summary),
+measured with tracemalloc after N turns.
+
+    python bench/history_memory.py --turns 500
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation import ConversationHistory
+from session_store import deserialize_session, serialize_session
+
+CANDIDATE = "Well, I usually spend my weekends with my family, and sometimes we go to the park near our house. {}"
+EXAMINER = "That sounds lovely. Could you tell me a bit more about what you enjoy doing there? {}"
+# A rolling summary is capped by max_tokens=200 on the summariser call
+SUMMARY_CHARS = 900
+
+
+def text(template: str, i: int) -> str:
+    # Transcripts are distinct strings, so build a fresh one per turn
+    return template.format(i)
+
+
+def old_history(turns: int) -> list:
+    history = []
+    for i in range(turns):
+        history.append({
+            "type": "candidate" if i % 2 == 0 else "examiner",
+            "content": text(CANDIDATE if i % 2 == 0 else EXAMINER, i),
+            "timestamp": datetime.now().isoformat()
+        })
+    return history
+
+
+def new_history(turns: int) -> ConversationHistory:
+    history = ConversationHistory()
+    for i in range(turns):
+        history.append("candidate" if i % 2 == 0 else "examiner", text(CANDIDATE if i % 2 == 0 else EXAMINER, i))
+        if history.needs_summary():
+            # Stand-in for the summariser: fold the pending turns straight away
+            history.fold_summary(list(history.pending), "x" * SUMMARY_CHARS)
+    return history
+
+
+def measure(build, turns: int):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    history = build(turns)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return history, used
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 500, 5000])
+    args = parser.parse_args()
+
+    print(f"{'turns':>6} {'old bytes':>10} {'new bytes':>10} {'old snapshot':>12} {'new snapshot':>12}")
+    for turns in args.turns:
+        old, old_bytes = measure(old_history, turns)
+        new, new_bytes = measure(new_history, turns)
+        old_snapshot = len(serialize_session({"conversation_history": old}))
+        new_snapshot = serialize_session({"conversation_history": new})
+        restored = deserialize_session(new_snapshot)["conversation_history"]
+        assert len(restored) == turns and restored.summary == new.summary
+        print(f"{turns:>6} {old_bytes:>10} {new_bytes:>10} {old_snapshot:>12} {len(new_snapshot):>12}")
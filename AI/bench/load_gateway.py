@@ -0,0 +1,106 @@
+"""Load test for the async model gateway against a local fake Groq server.
+
+Each simulated session runs a few candidate turns through the same helpers the
+WebSocket handler uses (transcribe, examiner reply, TTS, evaluation) and the
+turn latency percentiles are reported per concurrency level. With the async
+gateway p99 tracks the fake server latency as sessions grow, until the box
+runs out of CPU (the fake server runs in a second process, so give it a spare
+core); ``--sync-baseline`` runs the old blocking Groq client for contrast,
+where every session queues behind every other one.
+
+    python bench/load_gateway.py --sessions 1 10 50 100 200 --latency-ms 100
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation import ConversationHistory
+from fake_groq import FakeGroqServer
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_session(app_module, turns: int, latencies: list):
+    history = ConversationHistory()
+    for _ in range(turns):
+        start = time.perf_counter()
+        transcript = await app_module.transcribe_audio_chunk(b"RIFF" + bytes(32000))
+        history.append("candidate", transcript)
+        reply = await app_module.generate_ai_response(history, 1)
+        history.append("examiner", reply)
+        await app_module.synthesize_speech_stream(reply)
+        await app_module.evaluate_response_realtime(reply, transcript)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_sync_session(client, turns: int, latencies: list):
+    # The pre-gateway code path: blocking Groq calls made on the event loop
+    for _ in range(turns):
+        start = time.perf_counter()
+        client.audio.transcriptions.create(model="whisper-large-v3", file=("a.wav", b"RIFF" + bytes(32000)))
+        messages = [{"role": "user", "content": "Hello"}]
+        client.chat.completions.create(model="llama-3.3-70b-versatile", messages=messages, max_tokens=150)
+        client.audio.speech.create(model="tts-1", voice="alloy", input="Hello")
+        client.chat.completions.create(model="llama-3.3-70b-versatile",
+                                       messages=[{"role": "user", "content": "Return JSON"}], max_tokens=100)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_level(app_module, sessions: int, turns: int, sync_client=None) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    if sync_client is not None:
+        await asyncio.gather(*(run_sync_session(sync_client, turns, latencies) for _ in range(sessions)))
+    else:
+        await asyncio.gather(*(run_session(app_module, turns, latencies) for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "turns": len(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "turns_per_s": len(latencies) / elapsed,
+    }
+
+
+async def main(args):
+    import app as app_module
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    sync_client = None
+    if args.sync_baseline:
+        from groq import Groq
+        sync_client = Groq(max_retries=0)
+
+    print(f"{'sessions':>8} {'turns':>6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'turns/s':>8}")
+    for sessions in args.sessions:
+        row = await run_level(app_module, sessions, args.turns, sync_client)
+        print(f"{row['sessions']:>8} {row['turns']:>6} {row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+              f"{row['max_ms']:>9.1f} {row['turns_per_s']:>8.1f}")
+    await app_module.gateway.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--sync-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with FakeGroqServer(port=args.port, latency_ms=args.latency_ms) as server:
+        os.environ["GROQ_API_KEY"] = "fake-key"
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        asyncio.run(main(args))
@@ -0,0 +1,489 @@
+"""Ramp up concurrent voice sessions on /ws/voice-chat and find where one server saturates.
+
+Starts the app under uvicorn in a child process, with the fake Groq server
+as its model stub (or targets a running server with ``--url``), and replays
+candidate sessions over real WebSockets: PCM audio chunks sent in real time
+with trailing silence for the server's VAD, ``next_part`` transitions and a
+``ping`` every ``--ping-interval`` seconds. Each virtual candidate goes
+through its session, waits for the examiner's reply to every answer, then
+starts a new session, so the number of open sessions is the concurrency.
+
+Concurrency rises by ``--step`` sessions every ``--step-seconds`` up to
+``--sessions``. For each step the report shows reply latency (end of speech
+to the examiner's first reply message), ping round trip, errors (failed
+connects, replies later than ``--turn-timeout``, dropped sockets), the
+server's RSS and CPU and the load generator's own event-loop lag (if that grows, the
+generator is the bottleneck, not the server). A step is saturated when reply
+p95 exceeds ``--turn-slo``, ping p99 exceeds ``--ping-slo`` or more than 1% of
+connects and turns fail; the ramp stops at the first one. Memory per session
+is the slope of server RSS against open sessions.
+
+Sessions are synthetic unless ``--sessions-file`` names recorded ones: one
+JSON object per line, ``{"turns": [{"think": seconds, "speech_end": seconds,
+"messages": [{"at": seconds, "message": {...}}]}]}``, with ``message`` the
+client's JSON exactly as sent (``audio_chunk``, ``next_part``, ``ping``) and
+``at`` its offset in the turn. ``--write-sessions`` saves the synthetic
+sessions in that format as a starting point.
+
+    python bench/loadgen.py --sessions 200 --step 20 --step-seconds 20 --latency-ms 300
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_groq import FakeGroqServer
+
+try:
+    import websockets
+except ImportError:  # pip install websockets (uvicorn needs it to serve WebSockets too)
+    websockets = None
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RATE = 16000
+
+logger = logging.getLogger("loadgen")
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def speech(seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """Voiced-sounding PCM16: a pitch contour with syllable-rate loudness changes and some noise"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.3 * t + rng.uniform(0, 6))
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t + rng.uniform(0, 6))
+    signal = (np.sin(phase) + 0.3 * np.sin(3 * phase)) * envelope * 7000 + rng.normal(0, 150, t.size)
+    return signal.astype(np.int16)
+
+
+def audio_turn(seconds: float, chunk_ms: int, silence_ms: int, rng: np.random.Generator,
+               think: float) -> dict:
+    """One answer: ``seconds`` of speech then ``silence_ms`` of room noise, in real-time chunks"""
+    samples = np.concatenate([speech(seconds, rng),
+                              rng.normal(0, 60, SAMPLE_RATE * silence_ms // 1000).astype(np.int16)])
+    chunk = SAMPLE_RATE * chunk_ms // 1000
+    messages = []
+    for i, start in enumerate(range(0, samples.size, chunk)):
+        messages.append({"at": i * chunk_ms / 1000, "message": {
+            "type": "audio_chunk",
+            "codec": "pcm16",
+            "audio_data": base64.b64encode(samples[start:start + chunk].tobytes()).decode(),
+        }})
+    return {"think": think, "speech_end": seconds, "messages": messages}
+
+
+def control_turn(message_type: str) -> dict:
+    return {"think": 0.5, "messages": [{"at": 0.0, "message": {"type": message_type}}]}
+
+
+def synthetic_session(args, seed: int) -> dict:
+    """Part 1 answers, a Part 2 long turn and Part 3 answers, with the transitions between them"""
+    rng = np.random.default_rng(seed)
+    think = lambda: float(rng.uniform(0.5, 2.0))
+    turns = [audio_turn(float(rng.uniform(3, 7)), args.chunk_ms, args.silence_ms, rng, think())
+             for _ in range(args.part1_turns)]
+    turns.append(control_turn("next_part"))
+    turns.append(audio_turn(args.part2_seconds, args.chunk_ms, args.silence_ms, rng, think()))
+    turns.append(control_turn("next_part"))
+    turns += [audio_turn(float(rng.uniform(5, 10)), args.chunk_ms, args.silence_ms, rng, think())
+              for _ in range(args.part3_turns)]
+    turns.append(control_turn("next_part"))
+    return {"turns": turns}
+
+
+def compile_session(session: dict) -> List[tuple]:
+    """(think, speech_end, [(at, text)], last_speech) per turn, with every message serialised once;
+    ``last_speech`` is the index of the message that ends the answer (None without audio)"""
+    compiled = []
+    for turn in session["turns"]:
+        messages = [(message["at"], json.dumps(message["message"])) for message in turn["messages"]]
+        speech_end = turn.get("speech_end", messages[-1][0] if messages else 0.0)
+        audio = [i for i, message in enumerate(turn["messages"])
+                 if message["message"]["type"] == "audio_chunk" and message["at"] <= speech_end]
+        compiled.append((turn.get("think", 0.0), speech_end, messages, audio[-1] if audio else None))
+    return compiled
+
+
+class Results:
+    """Samples from every session, timestamped so each ramp step reads its own window"""
+
+    def __init__(self):
+        self.replies: List[tuple] = []
+        self.transcriptions: List[tuple] = []
+        self.pings: List[tuple] = []
+        self.connects: List[tuple] = []
+        self.errors: List[tuple] = []
+        self.turns = 0
+        self.loop_lag: List[tuple] = []
+
+    @staticmethod
+    def window(samples: List[tuple], start: float, end: float) -> list:
+        return [value for at, value in samples if start <= at < end]
+
+    def error(self, kind: str):
+        self.errors.append((time.perf_counter(), kind))
+
+
+class VirtualCandidate:
+    """Replays sessions back to back on one WebSocket at a time until stopped"""
+
+    def __init__(self, number: int, url: str, sessions: List[list], results: Results, args):
+        self.number = number
+        self.url = url
+        self.sessions = sessions
+        self.results = results
+        self.args = args
+        self.stopped = False
+        self.reply = asyncio.Event()
+        self.speech_ended: Optional[float] = None
+        self.pings_sent: deque = deque()
+
+    async def run(self):
+        count = 0
+        while not self.stopped:
+            session = self.sessions[(self.number + count) % len(self.sessions)]
+            session_id = f"load-{self.number}-{count}"
+            count += 1
+            try:
+                await self.run_session(session_id, session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Session {session_id} failed: {e!r}")
+                self.results.error("disconnect")
+                await asyncio.sleep(1.0)
+
+    async def run_session(self, session_id: str, session: list):
+        results = self.results
+        start = time.perf_counter()
+        try:
+            ws = await websockets.connect(f"{self.url}/ws/voice-chat/{session_id}", max_size=None,
+                                          ping_interval=None, open_timeout=self.args.turn_timeout,
+                                          compression="deflate" if self.args.deflate else None)
+        except Exception as e:
+            logger.debug(f"Connect failed for {session_id}: {e!r}")
+            results.error("connect")
+            await asyncio.sleep(1.0)
+            return
+        self.reply.clear()
+        self.speech_ended = None
+        self.pings_sent.clear()
+        reader = asyncio.create_task(self.read(ws))
+        pinger = None
+        try:
+            # The greeting is the first reply
+            await asyncio.wait_for(self.reply.wait(), self.args.turn_timeout)
+            results.connects.append((time.perf_counter(), time.perf_counter() - start))
+            pinger = asyncio.create_task(self.ping(ws))
+            for think, _, messages, last_speech in session:
+                if self.stopped:
+                    break
+                await asyncio.sleep(think)
+                turn_start = time.perf_counter()
+                for i, (at, text) in enumerate(messages):
+                    delay = turn_start + at - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    await ws.send(text)
+                    if i == last_speech:
+                        # The reply clock starts when the candidate stops talking
+                        self.speech_ended = time.perf_counter()
+                        self.reply.clear()
+                if last_speech is None:
+                    continue
+                try:
+                    await asyncio.wait_for(self.reply.wait(), self.args.turn_timeout)
+                    results.turns += 1
+                except asyncio.TimeoutError:
+                    results.error("turn_timeout")
+                self.speech_ended = None
+        except asyncio.TimeoutError:
+            results.error("connect")
+        finally:
+            if pinger is not None:
+                pinger.cancel()
+            reader.cancel()
+            await ws.close()
+
+    async def read(self, ws):
+        results = self.results
+        async for data in ws:
+            if not isinstance(data, str):
+                continue  # Binary audio frames only go to binary clients
+            now = time.perf_counter()
+            message_type = json.loads(data).get("type")
+            if message_type in ("ai_response", "ai_response_delta"):
+                if self.speech_ended is not None and not self.reply.is_set():
+                    results.replies.append((now, now - self.speech_ended))
+                self.reply.set()
+            elif message_type == "transcription" and self.speech_ended is not None:
+                results.transcriptions.append((now, now - self.speech_ended))
+            elif message_type == "pong" and self.pings_sent:
+                results.pings.append((now, now - self.pings_sent.popleft()))
+
+    async def ping(self, ws):
+        while True:
+            await asyncio.sleep(self.args.ping_interval * random.uniform(0.8, 1.2))
+            self.pings_sent.append(time.perf_counter())
+            await ws.send('{"type": "ping"}')
+
+
+async def watch_loop_lag(results: Results, interval: float = 0.1):
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        results.loop_lag.append((now, max(0.0, now - expected)))
+
+
+class AppServer:
+    """The app under uvicorn in a child process, calling the fake Groq server"""
+
+    def __init__(self, port: int, groq_url: str, env: dict, verbose: bool = False):
+        self.port = port
+        self.verbose = verbose
+        self.env = {**os.environ, "GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": groq_url,
+                    "SESSION_ARCHIVE_PATH": "", **env}
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--log-level", "warning", "--ws", "websockets", "--backlog", "4096"],
+            cwd=APP_DIR, env=self.env, stderr=None if self.verbose else subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"App server exited with code {self.process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.2).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.process.terminate()
+        raise RuntimeError(f"App server did not start on port {self.port}")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+
+
+def rss_bytes(pid: Optional[int]) -> Optional[int]:
+    """Resident memory of a process, from /proc (Linux only)"""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def cpu_seconds(pid: Optional[int]) -> Optional[float]:
+    """User plus system CPU time of a process, from /proc (Linux only)"""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesised command name; utime and stime are the 14th and 15th
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def step_row(results: Results, sessions: int, start: float, end: float, rss: Optional[int],
+             cpu: Optional[float], args) -> dict:
+    replies = Results.window(results.replies, start, end)
+    pings = Results.window(results.pings, start, end)
+    errors = Results.window(results.errors, start, end)
+    attempts = len(replies) + len(Results.window(results.connects, start, end)) + len(errors)
+    row = {
+        "sessions": sessions,
+        "replies": len(replies),
+        "reply_p50": percentile(replies, 50),
+        "reply_p95": percentile(replies, 95),
+        "reply_p99": percentile(replies, 99),
+        "transcription_p50": percentile(Results.window(results.transcriptions, start, end), 50),
+        "ping_p50": percentile(pings, 50),
+        "ping_p99": percentile(pings, 99),
+        "errors": len(errors),
+        "error_rate": len(errors) / attempts if attempts else 0.0,
+        "rss": rss,
+        "cpu": cpu,
+        "loop_lag_p99": percentile(Results.window(results.loop_lag, start, end), 99),
+    }
+    reasons = []
+    if row["reply_p95"] > args.turn_slo:
+        reasons.append(f"reply p95 {row['reply_p95']:.2f}s > {args.turn_slo:.2f}s")
+    if row["ping_p99"] > args.ping_slo:
+        reasons.append(f"ping p99 {row['ping_p99'] * 1000:.0f}ms > {args.ping_slo * 1000:.0f}ms")
+    if row["error_rate"] > 0.01:
+        reasons.append(f"{row['error_rate']:.1%} errors")
+    row["saturated"] = "; ".join(reasons)
+    return row
+
+
+def print_row(row: dict):
+    rss = f"{row['rss'] / 2 ** 20:.0f}" if row["rss"] is not None else "n/a"
+    cpu = f"{row['cpu']:.0%}" if row["cpu"] is not None else "n/a"
+    print(f"{row['sessions']:>8} {row['replies']:>7} {row['reply_p50'] * 1000:>8.0f} {row['reply_p95'] * 1000:>8.0f} "
+          f"{row['reply_p99'] * 1000:>8.0f} {row['ping_p50'] * 1000:>8.1f} {row['ping_p99'] * 1000:>8.1f} "
+          f"{row['errors']:>6} {rss:>7} {cpu:>6} {row['loop_lag_p99'] * 1000:>8.1f}  {row['saturated']}", flush=True)
+
+
+def memory_per_session(rows: List[dict], baseline: Optional[int]) -> Optional[float]:
+    """Least-squares slope of server RSS against open sessions, including the idle baseline"""
+    points = [(0, baseline)] if baseline is not None else []
+    points += [(row["sessions"], row["rss"]) for row in rows if row["rss"] is not None]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread if spread else None
+
+
+async def ramp(url: str, server_pid: Optional[int], sessions: List[list], args) -> List[dict]:
+    results = Results()
+    lag_watch = asyncio.create_task(watch_loop_lag(results))
+    candidates: List[VirtualCandidate] = []
+    tasks: List[asyncio.Task] = []
+    rows = []
+    baseline = rss_bytes(server_pid)
+    print(f"{'sessions':>8} {'replies':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ping p50':>8} "
+          f"{'ping p99':>8} {'errors':>6} {'rss MB':>7} {'cpu':>6} {'lag ms':>8}")
+    target = 0
+    try:
+        while target < args.sessions:
+            target = min(args.sessions, target + args.step)
+            while len(candidates) < target:
+                candidate = VirtualCandidate(len(candidates), url, sessions, results, args)
+                candidates.append(candidate)
+                tasks.append(asyncio.create_task(candidate.run()))
+                # Spread connects over the first second of the step
+                await asyncio.sleep(1.0 / args.step)
+            start, cpu_start = time.perf_counter(), cpu_seconds(server_pid)
+            await asyncio.sleep(args.step_seconds)
+            end, cpu_end = time.perf_counter(), cpu_seconds(server_pid)
+            cpu = (cpu_end - cpu_start) / (end - start) if cpu_start is not None and cpu_end is not None else None
+            row = step_row(results, target, start, end, rss_bytes(server_pid), cpu, args)
+            rows.append(row)
+            print_row(row)
+            if row["saturated"] and not args.keep_going:
+                break
+    finally:
+        for candidate in candidates:
+            candidate.stopped = True
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        lag_watch.cancel()
+
+    healthy = [row for row in rows if not row["saturated"]]
+    saturated = next((row for row in rows if row["saturated"]), None)
+    print(f"\n{results.turns} turns answered, {len(results.pings)} pings, "
+          f"{len(results.connects)} sessions started")
+    slope = memory_per_session(rows, baseline)
+    if slope is not None:
+        print(f"server memory: {baseline / 2 ** 20:.0f} MB idle, about {slope / 1024:.0f} KB per open session")
+    if saturated is not None:
+        capacity = healthy[-1]["sessions"] if healthy else 0
+        print(f"saturated at {saturated['sessions']} sessions ({saturated['saturated']}); "
+              f"last healthy step: {capacity} sessions")
+    else:
+        print(f"no saturation up to {rows[-1]['sessions'] if rows else 0} sessions")
+    if rows and max(row["loop_lag_p99"] for row in rows) > 0.05:
+        print("warning: the load generator's event loop lagged; its own limits may show in the figures")
+    return rows
+
+
+def load_sessions(args) -> List[list]:
+    if args.sessions_file:
+        with open(args.sessions_file, encoding="utf-8") as f:
+            scripts = [json.loads(line) for line in f if line.strip()]
+    else:
+        scripts = [synthetic_session(args, seed) for seed in range(args.scripts)]
+    if args.write_sessions:
+        with open(args.write_sessions, "w", encoding="utf-8") as f:
+            for script in scripts:
+                f.write(json.dumps(script) + "\n")
+    return [compile_session(script) for script in scripts]
+
+
+def main(args):
+    if websockets is None:
+        sys.exit("The load generator needs the websockets package: pip install websockets")
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    sessions = load_sessions(args)
+    audio_seconds = statistics.fmean(
+        sum(speech_end for _, speech_end, _, last_speech in session if last_speech is not None)
+        for session in sessions)
+    print(f"{len(sessions)} session scripts, {audio_seconds:.0f}s of speech each; ramp to {args.sessions} "
+          f"by {args.step} every {args.step_seconds:.0f}s; SLOs: reply p95 {args.turn_slo:.1f}s, "
+          f"ping p99 {args.ping_slo * 1000:.0f}ms")
+    if args.url:
+        asyncio.run(ramp(args.url.rstrip("/"), args.server_pid, sessions, args))
+        return
+    env = dict(setting.split("=", 1) for setting in args.server_env)
+    with FakeGroqServer(port=args.port + 1, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 4) as groq:
+        with AppServer(args.port, groq.base_url, env, args.verbose) as server:
+            asyncio.run(ramp(server.url, server.process.pid, sessions, args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200, help="Concurrent sessions to ramp up to")
+    parser.add_argument("--step", type=int, default=20, help="Sessions added per ramp step")
+    parser.add_argument("--step-seconds", type=float, default=20.0)
+    parser.add_argument("--keep-going", action="store_true", help="Keep ramping after the first saturated step")
+    parser.add_argument("--turn-slo", type=float, default=2.0, help="Reply p95 (seconds) before a step is saturated")
+    parser.add_argument("--ping-slo", type=float, default=0.25, help="Ping p99 (seconds) before a step is saturated")
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--ping-interval", type=float, default=5.0)
+    parser.add_argument("--sessions-file", help="Recorded sessions to replay (JSON lines, see above)")
+    parser.add_argument("--write-sessions", help="Save the session scripts used as JSON lines")
+    parser.add_argument("--scripts", type=int, default=8, help="Distinct synthetic sessions")
+    parser.add_argument("--part1-turns", type=int, default=4)
+    parser.add_argument("--part2-seconds", type=float, default=20.0)
+    parser.add_argument("--part3-turns", type=int, default=3)
+    parser.add_argument("--chunk-ms", type=int, default=250)
+    parser.add_argument("--silence-ms", type=int, default=1000, help="Room noise after each answer, for the VAD")
+    parser.add_argument("--deflate", action="store_true",
+                        help="Negotiate permessage-deflate like browsers do (costs the generator a lot of CPU)")
+    parser.add_argument("--url", help="Server to load (ws://host:port) instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="With --url: the server's pid, for its memory")
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Setting for the started server (repeatable), e.g. VAD_ENABLED=0")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Fake Groq latency per call")
+    parser.add_argument("--port", type=int, default=8930, help="App server port (the fake Groq server uses +1)")
+    parser.add_argument("--verbose", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+"""Context-free examiner turns: live generation vs the pre-generated question bank.
+
+Each simulated session asks for ``--openers`` new questions (Part 1 topic
+openers, the Part 2 cue card, Part 3 questions), once through the live
+examiner call against the fake Groq server (``--latency-ms`` per completion,
+roughly a 70B model) and once drawn from the question bank, and reports the
+time to the examiner's question. The bank draws also check that no session is
+asked the same question twice.
+
+    python bench/question_openers.py --sessions 200 --openers 6 --latency-ms 700
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_groq import FakeGroqServer
+
+os.environ.setdefault("GROQ_API_KEY", "fake-key")
+os.environ.setdefault("SESSION_ARCHIVE_PATH", "")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def new_session(app_module, part: int) -> dict:
+    return {"current_part": part, "conversation_history": app_module.ConversationHistory.from_env(),
+            "question_topic": None, "follow_ups": 0, "questions_asked": 0}
+
+
+async def live_openers(app_module, args) -> list:
+    async def session_openers():
+        timings = []
+        for i in range(args.openers):
+            session = new_session(app_module, 1 + i % 3)
+            start = time.perf_counter()
+            await app_module.generate_ai_response(session["conversation_history"], session["current_part"])
+            timings.append(time.perf_counter() - start)
+        return timings
+    results = await asyncio.gather(*(session_openers() for _ in range(args.sessions)))
+    return [timing for timings in results for timing in timings]
+
+
+def bank_openers(app_module, args) -> tuple:
+    timings, repeats, misses = [], 0, 0
+    for _ in range(args.sessions):
+        session = new_session(app_module, 1)
+        asked = set()
+        for i in range(args.openers):
+            session["current_part"] = 1 + i % 3
+            start = time.perf_counter()
+            question = app_module.draw_examiner_question(session, opening=True)
+            timings.append(time.perf_counter() - start)
+            if question is None:
+                misses += 1
+                continue
+            app_module.record_examiner_question(session, question)
+            if question.text in asked:
+                repeats += 1
+            asked.add(question.text)
+    return timings, repeats, misses
+
+
+def row(label: str, timings: list):
+    print(f"{label:<14} {statistics.median(timings) * 1000:>10.3f} {percentile(timings, 99) * 1000:>10.3f} "
+          f"{len(timings):>8}")
+
+
+async def main(args, base_url: str):
+    os.environ["GROQ_BASE_URL"] = base_url
+    logging.disable(logging.WARNING)
+    import app as app_module
+
+    live = await live_openers(app_module, args)
+    # No refills: the seed questions alone
+    app_module.question_bank.generate = None
+    bank, repeats, misses = bank_openers(app_module, args)
+    print(f"{args.sessions} sessions x {args.openers} new questions, {args.latency_ms:.0f} ms completions; "
+          f"bank holds {app_module.question_bank.stats()['questions']} seed questions")
+    print(f"{'path':<14} {'p50 ms':>10} {'p99 ms':>10} {'turns':>8}")
+    row("live", live)
+    row("question bank", bank)
+    print(f"bank: {repeats} repeated within a session, {misses} left to live generation")
+    await app_module.gateway.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--openers", type=int, default=6, help="New questions per session")
+    parser.add_argument("--latency-ms", type=float, default=700.0)
+    parser.add_argument("--port", type=int, default=8915)
+    args = parser.parse_args()
+    with FakeGroqServer(port=args.port, latency_ms=args.latency_ms) as server:
+        asyncio.run(main(args, server.base_url))
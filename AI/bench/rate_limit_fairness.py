@@ -0,0 +1,123 @@
+"""Voice turns and feedback traffic sharing one rate-limited model, with and without the scheduler.
+
+The fake Groq server enforces a tokens-per-minute budget and answers 429
+beyond it, like Groq. A few live voice sessions take a turn every
+``--turn-interval`` seconds while two REST clients hammer the feedback
+priority: a greedy one with many concurrent loops and a modest one with
+two. Without admission control everyone races into 429s (and the canned
+fallbacks); with the scheduler, voice turns are admitted first and the
+leftover budget is split evenly between the two feedback clients, whatever
+their concurrency. The scheduler starts from a much larger default budget
+and has to learn the real one from the rate-limit headers. Calls started in
+the first ``--warmup`` seconds (while the server's full one-minute budget
+is spent) are left out of the figures.
+
+    python bench/rate_limit_fairness.py --tokens-per-minute 60000 --seconds 30
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_groq import FakeGroqServer
+from model_gateway import DEFAULT_CHAT_MODEL, ModelGateway
+from scheduler import PRIORITY_FEEDBACK, PRIORITY_VOICE, Scheduler, call_priority, call_session
+
+MESSAGES = [{"role": "system", "content": "You are an IELTS Speaking examiner conducting Part 1. " * 3},
+            {"role": "user", "content": "I live in Tashkent and I really enjoy reading books in my free time."}]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def call(gateway: ModelGateway, results: dict, client: str):
+    start = time.perf_counter()
+    counted = start >= results["measure_from"]
+    try:
+        await gateway.chat(MESSAGES, max_tokens=150, timeout=10)
+        if counted:
+            results[client]["ok"].append(time.perf_counter() - start)
+    except Exception:
+        if counted:
+            results[client]["failed"] += 1
+
+
+async def voice_session(gateway, results, session: str, stop_at: float, interval: float):
+    call_priority.set(PRIORITY_VOICE)
+    call_session.set(session)
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        await call(gateway, results, "voice")
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+async def feedback_loop(gateway, results, client: str, stop_at: float):
+    call_priority.set(PRIORITY_FEEDBACK)
+    call_session.set(client)
+    while time.perf_counter() < stop_at:
+        await call(gateway, results, client)
+
+
+async def run(base_url: str, args, scheduler) -> dict:
+    gateway = ModelGateway(api_key="fake-key", base_url=base_url, max_retries=0, scheduler=scheduler)
+    results = defaultdict(lambda: {"ok": [], "failed": 0})
+    results["measure_from"] = time.perf_counter() + args.warmup
+    stop_at = results["measure_from"] + args.seconds
+    await asyncio.gather(
+        *(voice_session(gateway, results, f"voice-{i}", stop_at, args.turn_interval)
+          for i in range(args.voice_sessions)),
+        *(feedback_loop(gateway, results, "greedy", stop_at) for _ in range(args.greedy_loops)),
+        *(feedback_loop(gateway, results, "modest", stop_at) for _ in range(2)),
+    )
+    await gateway.aclose()
+    return results
+
+
+def print_results(label: str, results: dict, seconds: float):
+    print(label)
+    print(f"  {'client':<8} {'ok/s':>6} {'failed':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for client in ("voice", "greedy", "modest"):
+        ok, failed = results[client]["ok"], results[client]["failed"]
+        p50 = statistics.median(ok) * 1000 if ok else float("nan")
+        p99 = percentile(ok, 99) * 1000 if ok else float("nan")
+        print(f"  {client:<8} {len(ok) / seconds:>6.2f} {failed:>7} {p50:>8.0f} {p99:>8.0f}")
+
+
+async def main(args, base_url: str, scheduler):
+    logging.disable(logging.WARNING)
+    results = await run(base_url, args, scheduler)
+    print_results("scheduler" if scheduler is not None else "no scheduler", results, args.seconds)
+    if scheduler is not None:
+        limits = scheduler.stats()[DEFAULT_CHAT_MODEL]
+        print(f"  learned {limits['tokens_per_minute']:.0f} tokens/min, "
+              f"{limits['rate_limited']} rate-limited responses")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens-per-minute", type=float, default=60000)
+    parser.add_argument("--seconds", type=float, default=30.0, help="Measured time after the warm-up")
+    parser.add_argument("--warmup", type=float, default=15.0)
+    parser.add_argument("--voice-sessions", type=int, default=4)
+    parser.add_argument("--turn-interval", type=float, default=2.0)
+    parser.add_argument("--greedy-loops", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--port", type=int, default=8913)
+    args = parser.parse_args()
+
+    print(f"{args.tokens_per_minute:.0f} tokens/min; {args.voice_sessions} voice sessions every "
+          f"{args.turn_interval:.1f}s, feedback clients with {args.greedy_loops} and 2 loops")
+    # A fresh server (full budget) for each run
+    for port, scheduler in ((args.port, None), (args.port + 1, Scheduler())):
+        with FakeGroqServer(port=port, latency_ms=args.latency_ms,
+                            tokens_per_minute=args.tokens_per_minute) as server:
+            asyncio.run(main(args, server.base_url, scheduler))
@@ -0,0 +1,56 @@
+"""Two workers sharing one RedisSessionStore, against the local stand-in.
+
+Worker A owns a session and saves snapshots; worker B reads them and ends the
+session through the control channel, which A receives.
+
+    python bench/session_store_check.py
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_redis import FakeRedis
+from session_store import RedisSessionStore
+
+
+async def main(port: int = 6391):
+    server = asyncio.create_task(FakeRedis().serve(port=port))
+    await asyncio.sleep(0.1)
+    url = f"redis://127.0.0.1:{port}/0?protocol=2"
+    worker_a = RedisSessionStore(url, prefix="check")
+    worker_b = RedisSessionStore(url, prefix="check")
+
+    received = asyncio.Queue()
+    listener = asyncio.create_task(worker_a.subscribe(received.put))
+    await asyncio.sleep(0.1)
+
+    session = {"connected_at": datetime.now(), "current_part": 2,
+               "conversation_history": [{"type": "candidate", "content": "hello"}]}
+    await worker_a.save("s1", session)
+    loaded = await worker_b.load("s1")
+    assert loaded["current_part"] == 2 and loaded["connected_at"] == session["connected_at"], loaded
+    print(f"worker B sees worker A's session: part {loaded['current_part']}, "
+          f"{len(loaded['conversation_history'])} turn(s)")
+
+    await worker_b.publish({"action": "end_session", "session_id": "s1"})
+    message = await asyncio.wait_for(received.get(), 2)
+    assert message == {"action": "end_session", "session_id": "s1"}, message
+    print(f"worker A received control message: {message}")
+
+    await worker_b.delete("s1")
+    assert await worker_a.load("s1") is None
+    print("session removed for both workers")
+
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
+    await worker_a.close()
+    await worker_b.close()
+    server.cancel()
+    await asyncio.gather(server, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,246 @@
+"""Benchmark suite for the REST endpoints and the ConnectionManager send path.
+
+Runs fully offline: the app is driven in-process over ASGI against the fake
+Groq server, whose latency follows a seeded distribution. Each case reports
+throughput and p50/p95/p99; results are saved as JSON so runs can be compared
+across commits.
+
+    python bench/suite.py --requests 200 --concurrency 20 --output before.json
+    python bench/suite.py --requests 200 --concurrency 20 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_groq import LATENCY_DISTRIBUTIONS, FakeGroqServer
+
+WAV_CLIP = b"RIFF" + (36 + 32000).to_bytes(4, "little") + b"WAVEfmt " + bytes.fromhex(
+    "1000000001000100803e0000007d00000200100064617461") + (32000).to_bytes(4, "little") + \
+    (b"\x00\x10\x00\xf0" * 8000)
+
+# name -> (method, path, request kwargs for the i-th request). Payloads vary by
+# request so the result caches measure the uncached path (see --repeat-payloads)
+REST_CASES = {
+    "start-session": ("POST", lambda i: "/start-session", lambda i: {}),
+    "session-status": ("GET", lambda i: f"/session/bench-{i}/status", lambda i: {}),
+    "transcribe": ("POST", lambda i: "/transcribe",
+                   lambda i: {"files": {"audio": ("clip.wav", WAV_CLIP, "audio/wav")}}),
+    "synthesize-speech": ("POST", lambda i: "/synthesize-speech",
+                          lambda i: {"json": {"text": f"This is examiner sentence number {i}."}}),
+    "generate-examiner-response": ("POST", lambda i: "/generate-examiner-response", lambda i: {"json": {
+        "conversation_history": [
+            {"type": "examiner", "content": "Do you work or are you a student?"},
+            {"type": "candidate", "content": f"I am a student, in year {i} of my degree."},
+        ],
+        "current_part": 1 + i % 3,
+    }}),
+    "quick-evaluate": ("POST", lambda i: "/quick-evaluate", lambda i: {"json": {
+        "question": "Do you like reading?", "answer": f"Yes, I have read {i} books this year."}}),
+    "realtime-feedback": ("POST", lambda i: "/realtime-feedback", lambda i: {"json": {"recent_conversation": [
+        {"type": "examiner", "content": "What do you do in your free time?"},
+        {"type": "candidate", "content": f"I usually play football, about {i} times a month."},
+    ]}}),
+    "save-session": ("POST", lambda i: "/save-session", lambda i: {"json": {
+        "session_id": f"bench-{i}", "conversation_history": [], "total_duration": 1000, "parts_completed": 3}}),
+    "analyze-audio-quality": ("POST", lambda i: "/analyze-audio-quality", lambda i: {"json": {"audio_chunk": ""}}),
+    "pronunciation-feedback": ("POST", lambda i: "/pronunciation-feedback", lambda i: {"json": {
+        "transcript": f"I think the three worlds {i} are comfortable"}}),
+    "metrics": ("GET", lambda i: "/metrics", lambda i: {}),
+}
+
+
+class NullWebSocket:
+    """Accepts sends without a network, so the send path itself is what is timed"""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def send_text(self, text: str):
+        self.bytes_sent += len(text)
+
+    async def send_bytes(self, data: bytes):
+        self.bytes_sent += len(data)
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def run_concurrently(call, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    next_index = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def rest_case(client, name: str, requests: int, concurrency: int, repeat_payloads: bool) -> dict:
+    method, path, kwargs = REST_CASES[name]
+
+    async def call(i: int) -> bool:
+        i = 0 if repeat_payloads else i
+        response = await client.request(method, path(i), **kwargs(i))
+        return response.status_code < 400 and "error" not in response.text[:20]
+
+    return await run_concurrently(call, requests, concurrency)
+
+
+async def send_path_cases(app_module, requests: int, sockets: int) -> dict:
+    """ConnectionManager send path: JSON messages, audio as base64 JSON and as binary frames, broadcast"""
+    manager = app_module.manager
+    feedback = {"type": "feedback", "feedback": "Clear answer with relevant detail.", "score": 6.5,
+                "timestamp": datetime.now().isoformat()}
+    audio = bytes(16 * 1024)
+    for i in range(sockets):
+        session_id = f"send-bench-{i}"
+        websocket = NullWebSocket()
+        manager.active_connections[session_id] = websocket
+        manager.attach_send_buffer(session_id, websocket)
+        manager.user_sessions[session_id] = {"binary_audio": i % 2 == 1}
+
+    # Sends are queued per connection, so each case waits until the frames are written
+    cases = {
+        "send_message": ("send-bench-0", lambda i: manager.send_message("send-bench-0", feedback)),
+        "send_audio_json": ("send-bench-0", lambda i: manager.send_audio("send-bench-0", audio, i)),
+        "send_audio_binary": ("send-bench-1", lambda i: manager.send_audio("send-bench-1", audio, i)),
+    }
+    results = {}
+    for name, (session_id, send) in cases.items():
+        async def call(i: int, session_id=session_id, send=send) -> bool:
+            await send(i)
+            await manager.send_buffers[session_id].flush()
+            return True
+        results[name] = await run_concurrently(call, requests, 1)
+
+    async def broadcast(i: int) -> bool:
+        await manager.broadcast(feedback)
+        await asyncio.gather(*(buffer.flush() for buffer in manager.send_buffers.values()))
+        return True
+    results[f"broadcast_{sockets}"] = await run_concurrently(broadcast, max(1, requests // 10), 1)
+
+    for i in range(sockets):
+        manager.active_connections.pop(f"send-bench-{i}", None)
+        manager.send_buffers.pop(f"send-bench-{i}").close()
+        manager.user_sessions.pop(f"send-bench-{i}", None)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def print_results(results: dict, baseline: dict = None):
+    header = f"{'case':<28} {'reqs':>5} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header + ("   p50 / p99 vs baseline" if baseline else ""))
+    for name, row in results.items():
+        line = (f"{name:<28} {row['requests']:>5} {row['errors']:>4} {row['throughput_rps']:>8.1f} "
+                f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+        before = (baseline or {}).get(name)
+        if before and before["p50_ms"] and before["p99_ms"]:
+            line += (f"   {row['p50_ms'] / before['p50_ms'] - 1:+7.1%} / "
+                     f"{row['p99_ms'] / before['p99_ms'] - 1:+7.1%}")
+        print(line)
+
+
+async def main(args):
+    logging.disable(logging.INFO)
+    import httpx
+    import app as app_module
+
+    results = {}
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with app_module.app.router.lifespan_context(app_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name in args.cases or REST_CASES:
+                results[name] = await rest_case(client, name, args.requests, args.concurrency,
+                                                args.repeat_payloads)
+        if not args.cases:
+            results.update(await send_path_cases(app_module, args.requests * 10, args.sockets))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per REST case")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--cases", nargs="+", choices=sorted(REST_CASES), help="only these REST cases")
+    parser.add_argument("--sockets", type=int, default=100, help="connections for the broadcast case")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=30.0)
+    parser.add_argument("--distribution", default="lognormal", choices=LATENCY_DISTRIBUTIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat-payloads", action="store_true", help="send identical payloads (cache hits)")
+    parser.add_argument("--port", type=int, default=8920)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    with FakeGroqServer(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        seed=args.seed, distribution=args.distribution) as server:
+        os.environ.update({
+            "GROQ_API_KEY": "bench",
+            "GROQ_BASE_URL": server.base_url,
+            "TTS_CACHE_PREWARM": "0",
+        })
+        results = asyncio.run(main(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print(f"fake Groq: {args.distribution} latency, mean {args.latency_ms} ms, sd {args.jitter_ms} ms; "
+          f"concurrency {args.concurrency}")
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
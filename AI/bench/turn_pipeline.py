@@ -0,0 +1,93 @@
+"""Time-to-first-message per voice turn: sequential, pipelined and streamed.
+
+Drives ``/ws/voice-chat/{session_id}`` in-process against the fake Groq
+server and times, from the client side, how long after sending an
+``audio_chunk`` the first result message, the first ``ai_audio`` and the
+last message of the turn arrive. Runs VOICE_TURN_PIPELINE off and on, then
+the token-streaming mode (``?stream=1``) with sentence-level TTS.
+
+    python bench/turn_pipeline.py --turns 10 --chat-ms 600 --speech-ms 500
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_groq import FakeGroqServer
+
+RESULT_TYPES = {"ai_response", "ai_response_delta", "ai_audio", "feedback"}
+
+
+def run_turns(client, turns: int, stream: bool) -> dict:
+    first, first_audio, last = [], [], []
+    audio = base64.b64encode(b"RIFF" + bytes(32000)).decode()
+    path = "/ws/voice-chat/bench" + ("?stream=1" if stream else "")
+    with client.websocket_connect(path) as ws:
+        ws.receive_json()  # greeting
+        ws.receive_json()  # greeting audio
+        for _ in range(turns):
+            start = time.perf_counter()
+            ws.send_text(json.dumps({"type": "audio_chunk", "audio_data": audio}))
+            seen = set()
+            audio_expected, audio_seen = 1, 0
+            while not ({"ai_response", "feedback"} <= seen and audio_seen >= audio_expected):
+                message = ws.receive_json()
+                if message["type"] not in RESULT_TYPES:
+                    continue
+                elapsed = time.perf_counter() - start
+                if not seen:
+                    first.append(elapsed)
+                seen.add(message["type"])
+                if message["type"] == "ai_response":
+                    audio_expected = message.get("audio_segments", 1)
+                elif message["type"] == "ai_audio":
+                    if not audio_seen:
+                        first_audio.append(elapsed)
+                    audio_seen += 1
+            last.append(time.perf_counter() - start)
+    return {
+        "first_p50_ms": statistics.median(first) * 1000,
+        "first_audio_p50_ms": statistics.median(first_audio) * 1000,
+        "last_p50_ms": statistics.median(last) * 1000,
+    }
+
+
+def main(args):
+    import app as app_module
+    from fastapi.testclient import TestClient
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"{'mode':>10} {'first msg':>10} {'first audio':>12} {'last msg':>10}  (p50 ms)")
+    with TestClient(app_module.app) as client:
+        for mode, pipelined, stream in (("sequential", False, False),
+                                        ("pipelined", True, False),
+                                        ("streamed", True, True)):
+            app_module.TURN_PIPELINE = pipelined
+            row = run_turns(client, args.turns, stream)
+            print(f"{mode:>10} {row['first_p50_ms']:>10.0f} {row['first_audio_p50_ms']:>12.0f} "
+                  f"{row['last_p50_ms']:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--transcribe-ms", type=float, default=300.0)
+    parser.add_argument("--chat-ms", type=float, default=600.0)
+    parser.add_argument("--speech-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=8.0)
+    parser.add_argument("--tts-char-ms", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+
+    latencies = {"transcribe": args.transcribe_ms, "chat": args.chat_ms, "speech": args.speech_ms}
+    with FakeGroqServer(port=args.port, endpoint_latency_ms=latencies,
+                        token_ms=args.token_ms, tts_char_ms=args.tts_char_ms) as server:
+        os.environ["GROQ_API_KEY"] = "fake-key"
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        main(args)
@@ -0,0 +1,358 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from groq import APIConnectionError, APIStatusError
+
+from metrics import MODEL_CALL_EVENTS, MODEL_CALL_SECONDS
+from scheduler import call_queued
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+FAST_CHAT_MODEL = "llama-3.1-8b-instant"
+FAST_STT_MODEL = "whisper-large-v3-turbo"
+
+
+class CircuitOpenError(Exception):
+    """The model's circuit is open and the call site has no fallback model"""
+
+
+class QueueTimeoutError(Exception):
+    """The call waited a whole budget in the local rate-limit queue without being sent"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx: worth another attempt and a mark against the
+    model. Anything else (a bad request, auth, a bug in the caller) would fail the same way again"""
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError, APIConnectionError))
+
+
+class CircuitBreaker:
+    """Per-model breaker over the outcomes of recent calls.
+
+    Opens after ``consecutive`` failures in a row, or when at least
+    ``failure_ratio`` of the last ``window`` calls failed (once there have
+    been ``min_calls``). After ``reset_seconds`` one probe call is let
+    through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_ratio: float = 0.5, window: int = 20, min_calls: int = 10,
+                 consecutive: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.consecutive = consecutive
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._outcomes: deque = deque(maxlen=window)
+        self._failure_run = 0
+        self._probe_in_flight = False
+
+    @classmethod
+    def from_env(cls, name: str) -> "CircuitBreaker":
+        return cls(
+            name,
+            failure_ratio=float(os.getenv("BREAKER_FAILURE_RATIO", "0.5")),
+            min_calls=int(os.getenv("BREAKER_MIN_CALLS", "10")),
+            consecutive=int(os.getenv("BREAKER_CONSECUTIVE_FAILURES", "5")),
+            reset_seconds=float(os.getenv("BREAKER_RESET_SECONDS", "30")),
+        )
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record(self, ok: bool) -> bool:
+        """Record a call outcome; returns True if this outcome opened the circuit"""
+        self._probe_in_flight = False
+        self._outcomes.append(ok)
+        if ok:
+            self._failure_run = 0
+            if self.state == "half_open":
+                logger.info(f"Circuit for {self.name} closed")
+                self.state = "closed"
+                self._outcomes.clear()
+            return False
+        self._failure_run += 1
+        failures = self._outcomes.count(False)
+        if self.state == "half_open" or (self.state == "closed" and (
+                self._failure_run >= self.consecutive
+                or (len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_ratio))):
+            logger.warning(f"Circuit for {self.name} opened after {self._failure_run} failure(s) in a row, "
+                           f"{failures}/{len(self._outcomes)} recent")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            return True
+        return False
+
+    def release(self):
+        """An attempt ended without a verdict (cancelled), so another call may probe"""
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "times_opened": self.times_opened,
+            "recent_failures": self._outcomes.count(False),
+            "recent_calls": len(self._outcomes),
+        }
+
+
+# One breaker per model, shared by every call site that uses it
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(model: str) -> CircuitBreaker:
+    breaker = breakers.get(model)
+    if breaker is None:
+        breaker = breakers[model] = CircuitBreaker.from_env(model)
+    return breaker
+
+
+class CallPolicy:
+    """Latency budget, hedging and model routing for one model call site.
+
+    ``run`` gives the call ``budget`` seconds in total. If the first attempt
+    has not answered by the site's ``hedge_percentile`` latency (or fails
+    early with a retryable error), a second attempt of the same call is started
+    on the same model and the first answer wins. Hedges are capped at
+    ``max_hedge_ratio`` of calls so a slow provider is not sent double the
+    load. While the primary model's circuit is open, calls go straight to
+    the fallback model. Errors that are not retryable (``is_retryable``) go
+    straight back to the caller and do not count against the circuit.
+
+    Time the first attempt spends in the local rate-limit queue does not
+    count against the budget or the hedge delay (the provider has not seen
+    the call yet); after a whole budget there it fails with
+    ``QueueTimeoutError``. A hedge that would have to queue is dropped.
+    """
+
+    def __init__(self, name: str, budget: float, model: str, fallback_model: Optional[str] = None,
+                 hedge: bool = True, hedge_percentile: float = 0.95, max_hedge_ratio: float = 0.1,
+                 latency_window: int = 200, min_samples: int = 20):
+        self.name = name
+        self.budget = budget
+        self.model = model
+        self.fallback_model = fallback_model
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self._latencies: deque = deque(maxlen=latency_window)
+        self.calls = 0
+        self.hedges = 0
+
+    @classmethod
+    def from_env(cls, name: str, budget: float, model: str, fallback_model: Optional[str] = None,
+                 hedge: bool = True) -> "CallPolicy":
+        """Site settings in code; MODEL_BUDGET_<NAME> overrides the budget and MODEL_HEDGING=0,
+        HEDGE_PERCENTILE and MAX_HEDGE_RATIO apply to every site"""
+        env_name = name.upper().replace("-", "_")
+        return cls(
+            name,
+            budget=float(os.getenv(f"MODEL_BUDGET_{env_name}", str(budget))),
+            model=model,
+            fallback_model=fallback_model,
+            hedge=hedge and os.getenv("MODEL_HEDGING", "1") != "0",
+            hedge_percentile=float(os.getenv("HEDGE_PERCENTILE", "0.95")),
+            max_hedge_ratio=float(os.getenv("MAX_HEDGE_RATIO", "0.1")),
+        )
+
+    def _event(self, event: str):
+        MODEL_CALL_EVENTS.inc(policy=self.name, event=event)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the first attempt before hedging"""
+        if len(self._latencies) < self.min_samples:
+            delay = self.budget / 2
+        else:
+            ordered = sorted(self._latencies)
+            delay = ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))]
+        return min(max(delay, 0.05), self.budget)
+
+    def choose_model(self) -> str:
+        """Primary model, or the fallback while the primary's circuit is open"""
+        if breaker_for(self.model).allow():
+            return self.model
+        if self.fallback_model is not None:
+            self._event("fallback_route")
+            return self.fallback_model
+        self._event("rejected")
+        raise CircuitOpenError(f"Circuit for {self.model} is open")
+
+    def record(self, model: str, ok: bool):
+        if breaker_for(model).record(ok):
+            self._event("breaker_open")
+
+    def _failed(self, model: str, error: Exception, elapsed: float):
+        if is_retryable(error):
+            MODEL_CALL_SECONDS.observe(elapsed, policy=self.name, model=model, outcome="error")
+            self.record(model, False)
+        else:
+            # The model answered; the request was at fault
+            MODEL_CALL_SECONDS.observe(elapsed, policy=self.name, model=model, outcome="rejected")
+            breaker_for(model).release()
+
+    def _can_hedge(self, model: str) -> bool:
+        return (self.hedge and self.hedges < self.max_hedge_ratio * self.calls + 1
+                and (model == self.model or breaker_for(model).allow()))
+
+    async def _attempt(self, call: Callable[[str, float], Awaitable[T]], model: str, timeout: float,
+                       queued: Optional[Callable[[bool], None]] = None) -> T:
+        call_queued.set(queued)
+        start = time.perf_counter()
+        try:
+            result = await call(model, timeout)
+        except asyncio.CancelledError:
+            breaker_for(model).release()
+            raise
+        except Exception as e:
+            self._failed(model, e, time.perf_counter() - start)
+            raise
+        elapsed = time.perf_counter() - start
+        MODEL_CALL_SECONDS.observe(elapsed, policy=self.name, model=model, outcome="ok")
+        self.record(model, True)
+        if model == self.model:
+            self._latencies.append(elapsed)
+        return result
+
+    async def run(self, call: Callable[[str, float], Awaitable[T]], hedge: bool = True) -> T:
+        """Run ``call(model, timeout)`` under this site's budget, hedging and routing
+        (``hedge=False`` for calls that cannot be sent twice, such as a streamed upload)"""
+        self.calls += 1
+        self._event("calls")
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        hedge_delay = self.hedge_delay()
+        # Attempts waiting for rate-limit admission, and since when
+        queued_since: Dict[asyncio.Task, float] = {}
+        queue_changed = asyncio.Event()
+        paused = 0.0
+
+        def queued(waiting: bool):
+            nonlocal paused
+            task = asyncio.current_task()
+            if waiting:
+                queued_since[task] = loop.time()
+            elif task in queued_since:
+                since = queued_since.pop(task)
+                if task is first:
+                    paused += loop.time() - since
+            queue_changed.set()
+
+        model = self.choose_model()
+        first = asyncio.ensure_future(self._attempt(call, model, self.budget, queued))
+        attempts: Dict[asyncio.Task, str] = {first: model}
+        hedge_task = None if hedge else False
+        error: Optional[BaseException] = None
+        try:
+            while attempts:
+                for task in [task for task in queued_since if task is not first]:
+                    # No rate-limit room for the hedge: queued, it would only add load
+                    queued_since.pop(task)
+                    if attempts.pop(task, None) is not None:
+                        task.cancel()
+                        self._event("hedge_queued")
+                now = loop.time()
+                if first in queued_since:
+                    if now - queued_since[first] >= self.budget:
+                        self._event("queue_timeout")
+                        raise QueueTimeoutError(f"{self.name} waited {self.budget:.1f}s for rate-limit admission")
+                    wait = queued_since[first] + self.budget - now
+                else:
+                    deadline = started + paused + self.budget
+                    if now >= deadline:
+                        break
+                    hedge_at = started + paused + hedge_delay
+                    wait = deadline - now if hedge_task is not None else max(0.0, min(deadline, hedge_at) - now)
+                queue_changed.clear()
+                changed = asyncio.ensure_future(queue_changed.wait())
+                try:
+                    done, _ = await asyncio.wait([*attempts, changed], timeout=wait,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    changed.cancel()
+                done.discard(changed)
+                for task in done:
+                    attempts.pop(task)
+                    queued_since.pop(task, None)
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self._event("hedge_won")
+                        return task.result()
+                    error = task.exception()
+                    if not is_retryable(error):
+                        raise error
+                if first in queued_since:
+                    continue
+                if hedge_task is None and (done or loop.time() >= started + paused + hedge_delay):
+                    # The hedge repeats the same call; the fallback model is only for an open circuit
+                    if self._can_hedge(model):
+                        self.hedges += 1
+                        self._event("retry" if done else "hedge")
+                        remaining = max(0.0, started + paused + self.budget - loop.time())
+                        hedge_task = asyncio.ensure_future(self._attempt(call, model, remaining, queued))
+                        attempts[hedge_task] = model
+                    elif not attempts:
+                        break
+                    else:
+                        # No hedge allowed: just wait for the first attempt
+                        hedge_task = False
+            if error is not None and not attempts:
+                raise error
+            self._event("timeout")
+            for attempt_model in {attempt_model for task, attempt_model in attempts.items()
+                                  if task not in queued_since}:
+                self.record(attempt_model, False)
+            raise asyncio.TimeoutError(f"{self.name} exceeded its {self.budget:.1f}s budget")
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    async def stream(self, open_stream: Callable[[str, float], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Yield from a streamed call on the routed model. ``budget`` bounds each wait
+        for the next chunk; streams are not hedged once output has started"""
+        self.calls += 1
+        self._event("calls")
+        model = self.choose_model()
+        start = time.perf_counter()
+        try:
+            async for delta in open_stream(model, self.budget):
+                yield delta
+        except asyncio.CancelledError:
+            breaker_for(model).release()
+            raise
+        except Exception as e:
+            self._failed(model, e, time.perf_counter() - start)
+            raise
+        MODEL_CALL_SECONDS.observe(time.perf_counter() - start, policy=self.name, model=model, outcome="ok")
+        self.record(model, True)
+
+    def stats(self) -> dict:
+        return {
+            "budget_seconds": self.budget,
+            "model": self.model,
+            "fallback_model": self.fallback_model,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_delay_seconds": round(self.hedge_delay(), 3) if self.hedge else None,
+            "events": {event: MODEL_CALL_EVENTS.value(policy=self.name, event=event)
+                       for event in ("hedge", "hedge_won", "hedge_queued", "retry", "timeout",
+                                     "queue_timeout", "fallback_route", "breaker_open", "rejected")},
+        }
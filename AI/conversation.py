@@ -0,0 +1,100 @@
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+
+
+class Turn:
+    """One entry of the conversation: who spoke, what they said and when (epoch seconds)"""
+
+    __slots__ = ("role", "content", "ts")
+
+    def __init__(self, role: str, content: str, ts: Optional[float] = None):
+        self.role = role
+        self.content = content
+        self.ts = time.time() if ts is None else ts
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.role,
+            "content": self.content,
+            "timestamp": datetime.fromtimestamp(self.ts).isoformat()
+        }
+
+
+class ConversationHistory:
+    """Bounded conversation history for one session.
+
+    The last ``window`` turns are kept verbatim in a ring buffer and are what
+    the examiner prompt sees. Turns pushed out of the window wait in
+    ``pending`` until they are folded into ``summary`` by the summariser, so
+    memory and prompt size stay constant however long the session runs.
+    """
+
+    def __init__(self, window: int = 10, summary_batch: int = 6, summary: str = "", total_turns: int = 0,
+                 last_question: Optional[str] = None):
+        self.window = window
+        self.summary_batch = summary_batch
+        self.recent: deque = deque(maxlen=window)
+        # If summarisation keeps failing, the oldest unsummarised turns are dropped
+        self.pending: deque = deque(maxlen=summary_batch * 4)
+        self.summary = summary
+        self.total_turns = total_turns
+        self.last_question = last_question
+        self.summarizing = False
+
+    @classmethod
+    def from_env(cls) -> "ConversationHistory":
+        """Build an empty history sized by HISTORY_* environment variables"""
+        return cls(
+            window=int(os.getenv("HISTORY_WINDOW", "10")),
+            summary_batch=int(os.getenv("HISTORY_SUMMARY_BATCH", "6")),
+        )
+
+    def __len__(self) -> int:
+        return self.total_turns
+
+    def append(self, role: str, content: str, ts: Optional[float] = None):
+        if len(self.recent) == self.window:
+            self.pending.append(self.recent[0])
+        self.recent.append(Turn(role, content, ts))
+        self.total_turns += 1
+        if role == "examiner":
+            self.last_question = content
+
+    def needs_summary(self) -> bool:
+        return not self.summarizing and len(self.pending) >= self.summary_batch
+
+    def fold_summary(self, folded: List[Turn], summary: str):
+        """Replace the summary once the ``folded`` pending turns have been summarised"""
+        folded_ids = {id(turn) for turn in folded}
+        while self.pending and id(self.pending[0]) in folded_ids:
+            self.pending.popleft()
+        self.summary = summary
+
+    def prompt_turns(self) -> List[Turn]:
+        return list(self.recent)
+
+    def to_dict(self) -> dict:
+        return {
+            "window": self.window,
+            "summary_batch": self.summary_batch,
+            "summary": self.summary,
+            "total_turns": self.total_turns,
+            "last_question": self.last_question,
+            "pending": [(turn.role, turn.content, turn.ts) for turn in self.pending],
+            "recent": [(turn.role, turn.content, turn.ts) for turn in self.recent],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ConversationHistory":
+        history = cls(data["window"], data["summary_batch"], data["summary"], data["total_turns"],
+                      data["last_question"])
+        history.pending.extend(Turn(*turn) for turn in data["pending"])
+        history.recent.extend(Turn(*turn) for turn in data["recent"])
+        return history
+
+    def entries(self) -> List[dict]:
+        """The recent turns as {type, content, timestamp} dicts"""
+        return [turn.to_dict() for turn in self.recent]
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Optional, Union
+
+from metrics import STAGE_SECONDS
+
+try:
+    import orjson
+except ImportError:  # Optional: json is used when orjson is not installed
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+logger = logging.getLogger(__name__)
+
+Frame = Union[str, bytes]
+
+
+def dumps(message: dict) -> str:
+    """Serialise an outgoing WebSocket message, with orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:
+            pass  # Types orjson does not handle, such as float subclasses
+    return json.dumps(message)
+
+
+_timestamp_ms = -1
+_timestamp = ""
+
+
+def message_timestamp() -> str:
+    """ISO timestamp for outgoing messages, formatted at most once per millisecond"""
+    global _timestamp_ms, _timestamp
+    now = time.time()
+    ms = int(now * 1000)
+    if ms != _timestamp_ms:
+        _timestamp_ms = ms
+        _timestamp = datetime.fromtimestamp(now).isoformat(timespec="milliseconds")
+    return _timestamp
+
+
+class SendBuffer:
+    """Outgoing frames for one WebSocket, written in order by a single task.
+
+    ``offer`` only queues the frame, so a broadcast or a turn never waits for
+    a slow client and no two sends run on the same socket at once. A client
+    that lets ``max_frames`` pile up is evicted through ``on_evict``, and so
+    is one stuck on a send for longer than ``send_timeout``; that is checked
+    by ``check_stalled`` from one periodic sweep rather than a timer per frame.
+    """
+
+    def __init__(self, websocket, on_evict: Callable[[str], None], max_frames: int = 256,
+                 send_timeout: float = 10.0):
+        self.websocket = websocket
+        self.on_evict = on_evict
+        self.send_timeout = send_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(max_frames)
+        self._writer: Optional[asyncio.Task] = None
+        self.evicted = False
+        self.frames_sent = 0
+        self.send_started: Optional[float] = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def offer(self, frame: Frame) -> bool:
+        """Queue a frame; False (and the client is evicted) if its buffer is full"""
+        if self.evicted:
+            return False
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self._evict(f"send buffer full ({self._queue.maxsize} frames)")
+            return False
+
+    def _evict(self, reason: str):
+        if not self.evicted:
+            self.evicted = True
+            self.on_evict(reason)
+
+    async def _write_loop(self):
+        websocket = self.websocket
+        while True:
+            frame = await self._queue.get()
+            self.send_started = start = time.perf_counter()
+            try:
+                if isinstance(frame, str):
+                    await websocket.send_text(frame)
+                else:
+                    await websocket.send_bytes(frame)
+            except Exception as e:
+                self._evict(f"send failed: {e}")
+                return
+            finally:
+                self.send_started = None
+                self._queue.task_done()
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage="socket_write", endpoint="ws", part="")
+            self.frames_sent += 1
+
+    def check_stalled(self, now: float) -> bool:
+        """Evict the client if its current send started more than ``send_timeout`` before ``now``"""
+        started = self.send_started
+        if started is None or now - started < self.send_timeout or self.evicted:
+            return False
+        self._writer.cancel()
+        self._evict(f"send took longer than {self.send_timeout:.1f}s")
+        return True
+
+    async def flush(self, timeout: float = 1.0):
+        """Wait (up to ``timeout``) for the queued frames to be written"""
+        if self._writer is None or self._writer.done() or (self._queue.empty() and self.send_started is None):
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._queue.qsize()} frames still unsent after {timeout:.1f}s")
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.cancel()
+
+    def queued(self) -> int:
+        return self._queue.qsize()
@@ -0,0 +1,138 @@
+import asyncio
+import struct
+from collections import deque
+from typing import NamedTuple, Optional, Union
+
+from audio_frames import CODEC_PCM16, CODEC_UNKNOWN, CODEC_WAV
+from audio_processing import decode_pcm16, encode_wav
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "reject")
+
+# encode_wav's header: RIFF size at 4, data size at 40, sample rate at 24
+_WAV_HEADER_LEN = 44
+
+
+class AudioItem(NamedTuple):
+    # A binary frame's payload stays a memoryview into the frame until something keeps it
+    data: Union[bytes, memoryview]
+    codec: int = CODEC_UNKNOWN
+    final: bool = False
+
+
+def merge_audio(first: AudioItem, second: AudioItem, max_bytes: Optional[int] = None) -> Optional[AudioItem]:
+    """Join two queued chunks into one, or None if their audio cannot simply be appended or the
+    result would pass ``max_bytes``.
+
+    The merged audio is a bytearray that later merges extend in place, so a
+    run of merges copies each chunk once. WAV is decoded once, into a
+    bytearray with a plain header whose sizes are patched as samples are
+    appended; only the new chunk is decoded on each later merge.
+    """
+    if max_bytes is not None and len(first.data) + len(second.data) > max_bytes:
+        return None
+    final = first.final or second.final
+    if first.codec == second.codec == CODEC_PCM16:
+        buffer = first.data if isinstance(first.data, bytearray) else bytearray(first.data)
+        buffer += second.data
+        return AudioItem(buffer, CODEC_PCM16, final)
+    if first.codec in (CODEC_UNKNOWN, CODEC_WAV) and second.codec in (CODEC_UNKNOWN, CODEC_WAV) \
+            and first.data[:4] == second.data[:4] == b"RIFF":
+        appended = decode_pcm16(second.data)
+        if appended is None:
+            return None
+        if isinstance(first.data, bytearray):
+            # Already a merge buffer
+            buffer = first.data
+            sample_rate = struct.unpack_from("<I", buffer, 24)[0]
+        else:
+            decoded = decode_pcm16(first.data)
+            if decoded is None:
+                return None
+            buffer = bytearray(encode_wav(*decoded))
+            sample_rate = decoded[1]
+        if appended[1] != sample_rate:
+            return None
+        buffer += appended[0].astype("<i2", copy=False).tobytes()
+        struct.pack_into("<I", buffer, 4, len(buffer) - 8)
+        struct.pack_into("<I", buffer, 40, len(buffer) - _WAV_HEADER_LEN)
+        return AudioItem(buffer, CODEC_WAV, final)
+    return None
+
+
+class InboundQueue:
+    """Per-session inbox between the WebSocket reader and its workers.
+
+    Control messages (ping, next_part) have their own lane so they never wait
+    behind audio. The audio lane holds at most ``max_audio`` chunks; when it
+    is full the ``overflow`` policy applies:
+
+    * ``drop_oldest``: discard the oldest queued chunk
+    * ``coalesce``: append the chunk to the newest queued one (PCM/WAV only,
+      up to ``max_merge_bytes``; otherwise the oldest chunk is dropped)
+    * ``reject``: refuse the new chunk, so the caller can tell the client
+    """
+
+    def __init__(self, max_audio: int = 16, overflow: str = "coalesce", max_control: int = 64,
+                 max_merge_bytes: int = 1024 * 1024):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.max_audio = max_audio
+        self.overflow = overflow
+        self.max_merge_bytes = max_merge_bytes
+        self.control: asyncio.Queue = asyncio.Queue(max_control)
+        self.audio: deque = deque()
+        self._audio_ready = asyncio.Event()
+        self.audio_received = 0
+        self.audio_dropped = 0
+        self.audio_coalesced = 0
+        self.audio_rejected = 0
+        self.control_dropped = 0
+
+    def put_control(self, message: dict) -> bool:
+        try:
+            self.control.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.control_dropped += 1
+            return False
+
+    def put_audio(self, item: AudioItem) -> bool:
+        """Queue a chunk; False means it was rejected"""
+        self.audio_received += 1
+        if len(self.audio) >= self.max_audio:
+            if self.overflow == "reject":
+                self.audio_rejected += 1
+                return False
+            merged = merge_audio(self.audio[-1], item, self.max_merge_bytes) if self.overflow == "coalesce" else None
+            if merged is not None:
+                self.audio[-1] = merged
+                self.audio_coalesced += 1
+                return True
+            self.audio.popleft()
+            self.audio_dropped += 1
+        self.audio.append(item)
+        self._audio_ready.set()
+        return True
+
+    async def get_control(self) -> dict:
+        return await self.control.get()
+
+    async def get_audio(self) -> AudioItem:
+        while not self.audio:
+            self._audio_ready.clear()
+            await self._audio_ready.wait()
+        item = self.audio.popleft()
+        if isinstance(item.data, bytearray):
+            # A finished merge buffer: hand on immutable bytes like every other chunk
+            item = item._replace(data=bytes(item.data))
+        return item
+
+    def stats(self) -> dict:
+        return {
+            "audio_queued": len(self.audio),
+            "audio_received": self.audio_received,
+            "audio_dropped": self.audio_dropped,
+            "audio_coalesced": self.audio_coalesced,
+            "audio_rejected": self.audio_rejected,
+            "control_dropped": self.control_dropped,
+        }
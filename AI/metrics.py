@@ -0,0 +1,187 @@
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Labels for stage timings, set where a request or turn starts and inherited
+# by every task it creates
+endpoint_label: ContextVar[str] = ContextVar("metrics_endpoint", default="other")
+part_label: ContextVar[str] = ContextVar("metrics_part", default="")
+
+# Test parts a label may name; anything else a client sends is counted as "other"
+PART_LABELS = ("1", "2", "3")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def part_name(part) -> str:
+    """Label value for a test part, from whatever type the part came in as"""
+    name = str(part)
+    return name if name in PART_LABELS else "other"
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value as the Prometheus text format requires"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Prometheus histogram with fixed buckets, one series per label combination"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            # Per-bucket counts, then sum and count
+            series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {series[-1]}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter, one series per label combination"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Prometheus gauge read from a callback when metrics are scraped"""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge",
+                f"{self.name} {self.read()}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "voice_stage_seconds",
+    "Time spent in each pipeline stage (transcribe, generate, synthesize, evaluate, parse, send)",
+    ("stage", "endpoint", "part"),
+))
+TURN_SECONDS = REGISTRY.register(Histogram(
+    "voice_turn_seconds",
+    "Time from candidate audio to each point of a voice turn (first_message, ai_audio, ...)",
+    ("milestone", "part"),
+))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "http_request_seconds",
+    "REST request latency by route",
+    ("endpoint", "status"),
+))
+
+MODEL_CALL_SECONDS = REGISTRY.register(Histogram(
+    "model_call_seconds",
+    "Latency of each model call attempt by call site, model and outcome",
+    ("policy", "model", "outcome"),
+))
+MODEL_CALL_EVENTS = REGISTRY.register(Counter(
+    "model_call_events_total",
+    "Call policy events: calls, hedge, hedge_won, hedge_queued, retry, timeout, queue_timeout, fallback_route, "
+    "breaker_open, rejected",
+    ("policy", "event"),
+))
+
+SCHEDULER_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "scheduler_wait_seconds",
+    "Time model calls waited for admission under the rate-limit budget, by model and priority",
+    ("model", "priority"),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+))
+PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "prompt_tokens",
+    "Estimated prompt tokens per model call by prompt site and test part",
+    ("site", "part"),
+    buckets=(64, 128, 256, 512, 768, 1024, 1536, 2048, 4096, 8192),
+))
+QUESTION_BANK_DRAWS = REGISTRY.register(Counter(
+    "question_bank_draws_total",
+    "Examiner questions served from the question bank (hit) or left to live generation (miss), by part",
+    ("part", "outcome"),
+))
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage, labelled with the current endpoint and test part"""
+    with STAGE_SECONDS.time(stage=name, endpoint=endpoint_label.get(), part=part_label.get()):
+        yield
@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import logging
+import os
+from typing import AsyncIterator, List, Optional
+
+import httpx
+from groq import APIStatusError, AsyncGroq
+
+from scheduler import Scheduler, chat_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHAT_MODEL = "llama-3.3-70b-versatile"
+DEFAULT_STT_MODEL = "whisper-large-v3"
+DEFAULT_TTS_MODEL = "tts-1"
+DEFAULT_TTS_VOICE = "alloy"
+
+
+class ModelGateway:
+    """Single async entry point for every Groq call (Whisper, Llama, TTS).
+
+    All calls share a pool of keep-alive httpx connections, split into a few
+    shards because httpcore's pool bookkeeping gets slow with hundreds of
+    connections in one pool. A semaphore caps how many requests are in flight
+    at once, and every call runs under a deadline. With a ``scheduler``,
+    each call is first admitted under the model's rate-limit budget, and the
+    provider's rate-limit headers are passed back to it.
+    Calls are plain coroutines, so cancelling the calling task (for example
+    when a WebSocket disconnects) aborts the HTTP request as well.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 256,
+        max_connections: int = 256,
+        max_keepalive: int = 256,
+        pool_shards: int = 8,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 1,
+        scheduler: Optional[Scheduler] = None,
+    ):
+        self.scheduler = scheduler
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        pool_shards = max(1, pool_shards)
+        self.clients: List[AsyncGroq] = []
+        for _ in range(pool_shards):
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max(1, max_connections // pool_shards),
+                    max_keepalive_connections=max(1, max_keepalive // pool_shards),
+                ),
+                timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            )
+            self.clients.append(AsyncGroq(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=http_client,
+                max_retries=max_retries,
+                timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            ))
+        self._next_client = itertools.cycle(self.clients)
+
+    @property
+    def client(self) -> AsyncGroq:
+        """Next pooled client, round-robin across shards"""
+        return next(self._next_client)
+
+    @classmethod
+    def from_env(cls, scheduler: Optional[Scheduler] = None) -> "ModelGateway":
+        """Build a gateway from GROQ_* environment variables"""
+        return cls(
+            scheduler=scheduler,
+            api_key=os.getenv("GROQ_API_KEY"),
+            base_url=os.getenv("GROQ_BASE_URL") or None,
+            max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", "256")),
+            max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "256")),
+            max_keepalive=int(os.getenv("GROQ_MAX_KEEPALIVE", "256")),
+            pool_shards=int(os.getenv("GROQ_POOL_SHARDS", "8")),
+            timeout=float(os.getenv("GROQ_TIMEOUT", "30")),
+            connect_timeout=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+            max_retries=int(os.getenv("GROQ_MAX_RETRIES", "1")),
+        )
+
+    async def _run(self, coro, model: str):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            coro.close()
+            raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            result = await coro
+        except APIStatusError as e:
+            self.observe(model, e.response.headers, e.status_code)
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+        self.observe(model, getattr(result, "headers", None))
+        return result
+
+    async def _admit(self, model: str, tokens: int):
+        if self.scheduler is None:
+            return
+        self.waiting += 1
+        try:
+            await self.scheduler.admit(model, tokens)
+        finally:
+            self.waiting -= 1
+
+    async def _call(self, coro, model: str, timeout: Optional[float] = None, tokens: int = 0):
+        """Run a client coroutine under the rate-limit budget, the concurrency limit and a deadline.
+        The deadline starts once the call is admitted: time in the local queue is not the provider's"""
+        try:
+            await self._admit(model, tokens)
+        except BaseException:
+            coro.close()
+            raise
+        return await asyncio.wait_for(self._run(coro, model), timeout or self.timeout)
+
+    def observe(self, model: str, headers, status: int = 200):
+        if self.scheduler is not None and headers is not None:
+            self.scheduler.observe(model, headers, status)
+
+    async def transcribe(self, file, model: str = DEFAULT_STT_MODEL,
+                         timeout: Optional[float] = None) -> str:
+        response = await self._call(
+            self.client.audio.transcriptions.with_raw_response.create(model=model, file=file),
+            model,
+            timeout,
+        )
+        transcript = await response.parse()
+        return transcript.text if transcript else ""
+
+    async def transcribe_words(self, file, model: str = DEFAULT_STT_MODEL,
+                               timeout: Optional[float] = None) -> dict:
+        """Transcript with per-word timestamps: {"text", "words": [{"word", "start", "end"}]}"""
+        response = await self._call(
+            self.client.audio.transcriptions.with_raw_response.create(
+                model=model,
+                file=file,
+                response_format="verbose_json",
+                timestamp_granularities=["word"],
+            ),
+            model,
+            timeout,
+        )
+        transcript = await response.parse()
+        words = []
+        for word in getattr(transcript, "words", None) or []:
+            if not isinstance(word, dict):
+                word = {"word": word.word, "start": word.start, "end": word.end}
+            words.append({"word": word["word"], "start": word["start"], "end": word["end"]})
+        return {"text": transcript.text if transcript else "", "words": words}
+
+    async def chat(self, messages: List[dict], model: str = DEFAULT_CHAT_MODEL,
+                   temperature: float = 0.7, max_tokens: int = 150,
+                   timeout: Optional[float] = None) -> str:
+        response = await self._call(
+            self.client.chat.completions.with_raw_response.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            ),
+            model,
+            timeout,
+            chat_tokens(messages, max_tokens),
+        )
+        completion = await response.parse()
+        return completion.choices[0].message.content
+
+    async def chat_stream(self, messages: List[dict], model: str = DEFAULT_CHAT_MODEL,
+                          temperature: float = 0.7, max_tokens: int = 150,
+                          timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield completion text deltas as they arrive.
+
+        The concurrency slot is held for the whole stream and ``timeout``
+        applies to each wait for the next chunk rather than to the total
+        (not to the wait for rate-limit admission).
+        """
+        timeout = timeout or self.timeout
+        await self._admit(model, chat_tokens(messages, max_tokens))
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.with_raw_response.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        stream=True,
+                    ),
+                    timeout,
+                )
+            except APIStatusError as e:
+                self.observe(model, e.response.headers, e.status_code)
+                raise
+            self.observe(model, response.headers)
+            stream = await response.parse()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def speech(self, text: str, model: str = DEFAULT_TTS_MODEL,
+                     voice: str = DEFAULT_TTS_VOICE,
+                     timeout: Optional[float] = None) -> bytes:
+        async def _speech():
+            response = await self.client.audio.speech.create(
+                model=model,
+                voice=voice,
+                input=text,
+            )
+            self.observe(model, response.headers)
+            return await response.read()
+
+        return await self._call(_speech(), model, timeout)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+        }
+
+    async def aclose(self):
+        for client in self.clients:
+            await client.close()
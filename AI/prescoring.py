@@ -0,0 +1,160 @@
+import os
+import re
+from typing import Dict, FrozenSet, List, Optional
+
+from pronunciation import PatternMatcher, normalize_transcript, text_metrics
+
+DEFAULT_COMMON_WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "common_words.txt")
+
+# Linking words and phrases, split into simple ones and those that show a more
+# developed argument
+BASIC_CONNECTIVES = ("and", "but", "so", "because", "also", "then", "or")
+LINKING_CONNECTIVES = (
+    "however", "although", "though", "even though", "whereas", "while", "therefore", "moreover",
+    "furthermore", "in addition", "on the other hand", "for example", "for instance", "such as",
+    "as a result", "in contrast", "nevertheless", "otherwise", "instead", "in fact", "actually",
+    "firstly", "secondly", "finally", "overall", "in my opinion", "personally", "as far as i know",
+    "to be honest", "apart from", "not only", "unless", "since", "which means", "in general",
+)
+MATTR_WINDOW = 50
+_SENTENCE_END = re.compile(r"[.!?]+")
+
+
+def _load_words(path: str) -> FrozenSet[str]:
+    words = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.startswith("#"):
+                words.update(line.lower().split())
+    return frozenset(words)
+
+
+def moving_average_ttr(words: List[str], window: int = MATTR_WINDOW) -> float:
+    """Type-token ratio averaged over a sliding window, so longer answers are not
+    penalised for repeating "the"; the window's word counts are updated in place"""
+    counts: Dict[str, int] = {}
+    for word in words[:window]:
+        counts[word] = counts.get(word, 0) + 1
+    total = len(counts)
+    for i in range(window, len(words)):
+        old, new = words[i - window], words[i]
+        counts[old] -= 1
+        if not counts[old]:
+            del counts[old]
+        counts[new] = counts.get(new, 0) + 1
+        total += len(counts)
+    return total / ((len(words) - window + 1) * window)
+
+
+def _band(value: float) -> float:
+    return max(4.0, min(8.0, round(value * 2) / 2))
+
+
+class LocalScorer:
+    """Deterministic IELTS band estimate from the transcript alone.
+
+    Lexical and fluency features only (type-token ratio, share of less common
+    words, sentence length, connectives, fillers and repetitions), so it runs
+    in microseconds and is capped at band 8. It is the provisional score
+    before the model's evaluation arrives, and the fallback when that fails.
+    """
+
+    def __init__(self, common_words: FrozenSet[str]):
+        self.common_words = common_words
+        self._connectives = PatternMatcher(
+            [(phrase, False, "basic") for phrase in BASIC_CONNECTIVES]
+            + [(phrase, False, "linking") for phrase in LINKING_CONNECTIVES]
+        )
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_COMMON_WORDS_PATH) -> "LocalScorer":
+        return cls(_load_words(path))
+
+    def is_common(self, word: str) -> bool:
+        if word in self.common_words or "'" in word or len(word) <= 3:
+            return True
+        for suffix in ("s", "es", "ed", "d", "ing", "ly", "er"):
+            if word.endswith(suffix) and word[:-len(suffix)] in self.common_words:
+                return True
+        return False
+
+    def features(self, transcript: str) -> dict:
+        text = normalize_transcript(transcript)
+        words = text.split()
+        count = len(words)
+        ttr = moving_average_ttr(words) if count > MATTR_WINDOW else (len(set(words)) / count if count else 0.0)
+        less_common = {word for word in words if not self.is_common(word)}
+        sentences = [s for s in _SENTENCE_END.split(transcript) if s.strip()]
+        connectives = {"basic": set(), "linking": set()}
+        for start, end, kind in self._connectives.find(text):
+            connectives[kind].add(text[start:end])
+        fluency = text_metrics(transcript)
+        return {
+            "word_count": count,
+            "type_token_ratio": round(ttr, 3),
+            "less_common_ratio": round(sum(1 for word in words if word in less_common) / count, 3) if count else 0.0,
+            "less_common_words": sorted(less_common, key=len, reverse=True)[:5],
+            "mean_sentence_length": round(count / max(len(sentences), 1), 1),
+            "basic_connectives": len(connectives["basic"]),
+            "linking_connectives": sorted(connectives["linking"]),
+            "filler_count": fluency["filler_count"],
+            "repetitions": fluency["repetitions"],
+        }
+
+    def score(self, transcript: str, features: Optional[dict] = None) -> dict:
+        """Band estimates per criterion, an overall score, feedback and suggestions"""
+        f = features or self.features(transcript)
+        count = max(f["word_count"], 1)
+        filler_rate = 100 * f["filler_count"] / count
+        repetition_rate = 100 * f["repetitions"] / count
+
+        # Answer length carries most of the fluency estimate for short turns
+        fluency = 4.0 + min(2.5, count / 20) + min(1.0, len(f["linking_connectives"]) / 2) \
+            - min(1.5, filler_rate / 4) - min(0.5, repetition_rate / 4)
+        vocabulary = 4.0 + min(2.0, f["type_token_ratio"] * 2.5) + min(2.0, f["less_common_ratio"] * 12)
+        if count < 10:
+            vocabulary = min(vocabulary, 5.5)
+        grammar = 4.5 + min(1.5, f["mean_sentence_length"] / 10) \
+            + min(1.5, len(f["linking_connectives"]) / 2 + f["basic_connectives"] / 6)
+        result = {
+            "fluency": _band(fluency),
+            "vocabulary": _band(vocabulary),
+            "grammar": _band(grammar),
+        }
+        # Nothing in a transcript shows pronunciation; follow fluency
+        result["pronunciation"] = result["fluency"]
+        result["score"] = _band(sum(result.values()) / 4)
+        result["feedback"], result["strengths"], result["suggestions"] = self._advice(f, result)
+        result["features"] = f
+        return result
+
+    @staticmethod
+    def _advice(f: dict, bands: dict):
+        strengths: List[str] = []
+        suggestions: List[str] = []
+        if f["word_count"] >= 30:
+            strengths.append("You gave a well-developed answer")
+        else:
+            suggestions.append("Extend your answer with a reason or an example")
+        if f["linking_connectives"]:
+            strengths.append("Good use of linking words such as '" + f["linking_connectives"][0] + "'")
+        else:
+            suggestions.append("Link your ideas with phrases like 'however' or 'for example'")
+        if f["less_common_words"] and f["less_common_ratio"] >= 0.08:
+            strengths.append("Some less common vocabulary, e.g. '" + f["less_common_words"][0] + "'")
+        else:
+            suggestions.append("Try using more precise, less common words")
+        if f["filler_count"] * 100 / max(f["word_count"], 1) > 3:
+            suggestions.append("Use fewer fillers such as 'um' and 'you know'")
+        weakest = min(("fluency", "vocabulary", "grammar"), key=lambda name: bands[name])
+        if bands[weakest] >= 7:
+            feedback = "Keep it up: this is a fluent, well-linked answer."
+        else:
+            feedback = {
+                "fluency": "Try to keep talking for longer and connect your ideas.",
+                "vocabulary": "Vary your vocabulary and avoid repeating the same words.",
+                "grammar": "Use a mix of longer sentences joined by linking words.",
+            }[weakest]
+        if strengths:
+            feedback = strengths[0] + ". " + feedback
+        return feedback, strengths[:2], suggestions[:2]
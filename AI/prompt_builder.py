@@ -0,0 +1,163 @@
+import os
+import re
+import textwrap
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from metrics import PROMPT_TOKENS, part_name
+
+# Chat formats add a few tokens per message for the role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARK = "… "
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count: one per punctuation mark, one per short word and
+    one more per five further letters. Cached, since history turns are re-sent every turn"""
+    return sum(1 + (len(piece) - 1) // 5 for piece in _TOKEN.findall(text))
+
+
+def clean_prompt(text: str) -> str:
+    """Dedent a triple-quoted prompt and join its wrapped lines, keeping blank lines"""
+    paragraphs = textwrap.dedent(text).strip().split("\n\n")
+    return "\n\n".join(" ".join(line.strip() for line in paragraph.splitlines()) for paragraph in paragraphs)
+
+
+class PromptTemplate:
+    """Prompt text parsed once into literal chunks and field names.
+
+    ``render`` only joins strings, and the literal part's token count is known
+    up front, so a caller can budget the fields before filling them in.
+    """
+
+    def __init__(self, text: str):
+        self.text = clean_prompt(text)
+        self._parts: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in Formatter().parse(self.text)]
+        self.fields = tuple(field for _, field in self._parts if field)
+        self.static_tokens = sum(estimate_tokens(literal) for literal, _ in self._parts)
+
+    def render(self, **values: str) -> str:
+        return "".join(literal + (values[field] if field else "") for literal, field in self._parts)
+
+
+class Prompt(NamedTuple):
+    messages: List[dict]
+    prompt_tokens: int
+    turns_included: int
+    turns_truncated: int
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Keep the end of ``text`` (the most recent words) within about ``tokens``"""
+    total = estimate_tokens(text)
+    if total <= tokens:
+        return text
+    keep = max(0, len(text) * tokens // total - len(TRUNCATION_MARK))
+    tail = text[len(text) - keep:]
+    # Start on a word boundary
+    space = tail.find(" ")
+    return TRUNCATION_MARK + (tail[space + 1:] if 0 <= space < len(tail) - 1 else tail)
+
+
+class PromptBuilder:
+    """Examiner prompts packed into a fixed token budget.
+
+    The per-part system prompt is always the first message and is the same
+    string object on every call, so providers that cache prompt prefixes can
+    reuse it. The rolling summary comes next, then the most recent turns,
+    newest first, until ``budget_tokens`` is used up; a newest turn that is
+    too long on its own (a Part 2 monologue) keeps only its end. With
+    ``transcript`` set, the turns are rendered as one user message through
+    that template (a ``{conversation}`` field) instead of chat messages.
+    """
+
+    def __init__(self, name: str, system_prompts: Dict[int, str], budget_tokens: int = 1200,
+                 max_turns: Optional[int] = None, transcript: Optional[str] = None):
+        self.name = name
+        self.budget_tokens = budget_tokens
+        self.max_turns = max_turns
+        self.system_prompts = {part: clean_prompt(prompt) for part, prompt in system_prompts.items()}
+        self._system_tokens = {part: estimate_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS
+                               for part, prompt in self.system_prompts.items()}
+        self.transcript = PromptTemplate(transcript) if transcript is not None else None
+        self.calls = 0
+        self.total_tokens = 0
+        self.turns_truncated = 0
+        self.turns_dropped = 0
+
+    @classmethod
+    def from_env(cls, name: str, system_prompts: Dict[int, str], budget_tokens: int = 1200,
+                 max_turns: Optional[int] = None, transcript: Optional[str] = None) -> "PromptBuilder":
+        """PROMPT_BUDGET_<NAME> overrides the token budget"""
+        env_name = name.upper().replace("-", "_")
+        return cls(name, system_prompts, int(os.getenv(f"PROMPT_BUDGET_{env_name}", str(budget_tokens))),
+                   max_turns, transcript)
+
+    def _pack(self, turns: List[Tuple[str, str]], budget: int, overhead: int) -> Tuple[list, int, int]:
+        """Newest-first (role, content) pairs that fit, oldest first, with their tokens and truncations"""
+        packed: List[Tuple[str, str]] = []
+        used = truncated = 0
+        for role, content in reversed(turns):
+            cost = estimate_tokens(content) + overhead
+            if used + cost > budget:
+                # Older turns are never packed around a gap
+                if not packed and budget - used - overhead > 0:
+                    content = truncate_to_tokens(content, budget - used - overhead)
+                    packed.append((role, content))
+                    used += estimate_tokens(content) + overhead
+                    truncated = 1
+                break
+            packed.append((role, content))
+            used += cost
+        packed.reverse()
+        return packed, used, truncated
+
+    def build(self, part: int, turns: Iterable[Tuple[str, str]], summary: str = "") -> Prompt:
+        """Messages for ``part`` from (role, content) turns, oldest first ("candidate" or "examiner");
+        only the last ``max_turns`` are considered"""
+        if part not in self.system_prompts:
+            part = 1
+        turns = list(turns)
+        if self.max_turns is not None:
+            turns = turns[-self.max_turns:]
+        messages = [{"role": "system", "content": self.system_prompts[part]}]
+        used = self._system_tokens[part]
+        if summary:
+            summary_message = f"Summary of the conversation so far: {summary}"
+            messages.append({"role": "system", "content": summary_message})
+            used += estimate_tokens(summary_message) + MESSAGE_OVERHEAD_TOKENS
+
+        if self.transcript is not None:
+            used += self.transcript.static_tokens + MESSAGE_OVERHEAD_TOKENS
+            # Each "Candidate: ..." line costs its label and newline
+            packed, turn_tokens, truncated = self._pack(turns, self.budget_tokens - used, 3)
+            conversation = "\n".join(f"{'Candidate' if role == 'candidate' else 'Examiner'}: {content}"
+                                     for role, content in packed) or "(the test has just started)"
+            messages.append({"role": "user", "content": self.transcript.render(conversation=conversation)})
+        else:
+            packed, turn_tokens, truncated = self._pack(turns, self.budget_tokens - used, MESSAGE_OVERHEAD_TOKENS)
+            messages.extend({"role": "user" if role == "candidate" else "assistant", "content": content}
+                            for role, content in packed)
+        used += turn_tokens
+
+        self.calls += 1
+        self.total_tokens += used
+        self.turns_truncated += truncated
+        self.turns_dropped += len(turns) - len(packed)
+        PROMPT_TOKENS.observe(used, site=self.name, part=part_name(part))
+        return Prompt(messages, used, len(packed), truncated)
+
+    def stats(self) -> dict:
+        return {
+            "budget_tokens": self.budget_tokens,
+            "calls": self.calls,
+            "mean_prompt_tokens": round(self.total_tokens / self.calls, 1) if self.calls else 0.0,
+            "turns_truncated": self.turns_truncated,
+            "turns_dropped": self.turns_dropped,
+            "estimate_cache": estimate_tokens.cache_info()._asdict(),
+        }
@@ -0,0 +1,240 @@
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pronunciation_lexicon.tsv")
+
+# What each lexicon tag asks the candidate to practise
+TAG_DESCRIPTIONS = {
+    "th": "the /θ/ and /ð/ sounds (tongue between the teeth)",
+    "w_v": "the difference between /w/ and /v/",
+    "silent_letter": "silent letters",
+    "word_stress": "word stress",
+    "cluster": "consonant clusters",
+    "r_l": "the /r/ and /l/ sounds",
+    "schwa": "the weak /ə/ vowel in unstressed syllables",
+    "vowel_length": "long and short vowels",
+    "ed_ending": "-ed endings (/t/, /d/ or /ɪd/)",
+}
+
+FILLERS = ("um", "uh", "uhm", "er", "erm", "ah", "hmm", "mm", "you know", "i mean", "sort of", "kind of")
+
+# Gaps between words (seconds) counted as pauses, and as long pauses
+PAUSE_SECONDS = 0.3
+LONG_PAUSE_SECONDS = 1.0
+
+# Fewer words than this are too little speech to give a band
+MIN_SCORED_WORDS = 10
+# Best band without word timings, when pace and pauses could not be checked
+UNTIMED_MAX_SCORE = 7.0
+
+_NON_WORD = re.compile(r"[^a-z']+")
+_WORD = re.compile(r"[a-z']+")
+
+
+def normalize_transcript(text: str) -> str:
+    """Lower case, with everything but letters and apostrophes collapsed to single spaces"""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton over many patterns, matched at word boundaries.
+
+    ``find`` makes one pass over the text whatever the number of patterns.
+    Each pattern either matches whole words only or, as a prefix, any word
+    that starts with it. Text must be normalised first (``normalize_transcript``).
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, bool, object]]):
+        # State 0 is the root; per state: transitions, failure link, outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, bool, object]]] = [[]]
+        self.size = 0
+        for pattern, prefix, value in patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((len(pattern), prefix, value))
+            self.size += 1
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        # Breadth first, so each state's failure target is complete before its children
+        # copy transitions from it; the result is a full transition table (a DFA)
+        # and matching never has to follow failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            fail = self._fail[state]
+            for char, next_state in list(self._goto[state].items()):
+                queue.append(next_state)
+                target = self._goto[fail].get(char, 0) if state else 0
+                self._fail[next_state] = target
+                self._out[next_state] = self._out[next_state] + self._out[target]
+            for char, target in self._goto[fail].items():
+                if state and char not in self._goto[state]:
+                    self._goto[state][char] = target
+
+    def find(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """Yield (start, end, value) for each match that starts a word (and ends one, unless a prefix)"""
+        goto, out = self._goto, self._out
+        state = 0
+        last = len(text) - 1
+        for i, char in enumerate(text):
+            state = goto[state].get(char, 0)
+            if not out[state]:
+                continue
+            for length, prefix, value in out[state]:
+                start = i - length + 1
+                if start and text[start - 1] != " ":
+                    continue
+                if not prefix and i < last and text[i + 1] != " ":
+                    continue
+                yield start, i + 1, value
+
+
+class PronunciationLexicon:
+    """Words that are often mispronounced, tagged with the sounds to practise"""
+
+    def __init__(self, entries: Iterable[Tuple[str, List[str]]]):
+        patterns = []
+        for pattern, tags in entries:
+            prefix = pattern.endswith("*")
+            patterns.append((pattern.rstrip("*"), prefix, tuple(tags)))
+        self.matcher = PatternMatcher(patterns)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_LEXICON_PATH) -> "PronunciationLexicon":
+        """Read a lexicon file: one ``pattern<TAB>tag,tag`` per line, # for comments"""
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                pattern, tags = line.split("\t")
+                entries.append((pattern.lower(), [tag for tag in tags.split(",") if tag]))
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return self.matcher.size
+
+    def difficult_words(self, transcript: str) -> List[dict]:
+        """Each lexicon word in the transcript, in order, with the union of its matching tags"""
+        text = normalize_transcript(transcript)
+        tags_at: Dict[int, list] = {}
+        for start, _, tags in self.matcher.find(text):
+            word_tags = tags_at.setdefault(start, [])
+            word_tags.extend(tag for tag in tags if tag not in word_tags)
+        if not tags_at:
+            return []
+        return [{"word": match.group(), "tags": tags_at[match.start()]}
+                for match in _WORD.finditer(text) if match.start() in tags_at]
+
+
+_filler_matcher = PatternMatcher((filler, False, filler) for filler in FILLERS)
+
+
+def text_metrics(transcript: str) -> dict:
+    """Filler and repetition counts from the transcript alone"""
+    text = normalize_transcript(transcript)
+    words = text.split()
+    fillers: Dict[str, int] = {}
+    for _, _, filler in _filler_matcher.find(text):
+        fillers[filler] = fillers.get(filler, 0) + 1
+    repetitions = sum(1 for a, b in zip(words, words[1:]) if a == b)
+    return {
+        "word_count": len(words),
+        "filler_count": sum(fillers.values()),
+        "fillers": fillers,
+        "repetitions": repetitions,
+    }
+
+
+def timing_metrics(words: List[dict]) -> Optional[dict]:
+    """Speech rate and pauses from Whisper word timestamps ({"word", "start", "end"})"""
+    if len(words) < 2:
+        return None
+    starts = np.fromiter((float(word["start"]) for word in words), dtype=np.float64, count=len(words))
+    ends = np.fromiter((float(word["end"]) for word in words), dtype=np.float64, count=len(words))
+    speaking_time = float(ends[-1] - starts[0])
+    if speaking_time <= 0:
+        return None
+    gaps = starts[1:] - ends[:-1]
+    pauses = gaps[gaps >= PAUSE_SECONDS]
+    pause_time = float(pauses.sum())
+    articulation_time = max(speaking_time - pause_time, 1e-3)
+    return {
+        "speaking_seconds": round(speaking_time, 2),
+        "words_per_minute": round(len(words) * 60 / speaking_time, 1),
+        "articulation_rate": round(len(words) * 60 / articulation_time, 1),
+        "pause_count": int(len(pauses)),
+        "long_pause_count": int(np.count_nonzero(pauses >= LONG_PAUSE_SECONDS)),
+        "mean_pause_seconds": round(float(pauses.mean()), 2) if len(pauses) else 0.0,
+        "longest_pause_seconds": round(float(pauses.max()), 2) if len(pauses) else 0.0,
+        "pause_ratio": round(pause_time / speaking_time, 3),
+    }
+
+
+def estimate_score(text: dict, timing: Optional[dict], difficult: List[dict]) -> Optional[float]:
+    """Rough fluency/pronunciation band (4-9) from the local metrics; no model involved.
+    None when the transcript is too short to rate"""
+    if text["word_count"] < MIN_SCORED_WORDS:
+        return None
+    score = 8.5
+    per_hundred = 100 / text["word_count"]
+    score -= min(1.5, 0.15 * text["filler_count"] * per_hundred)
+    score -= min(0.5, 0.1 * text["repetitions"] * per_hundred)
+    # Dense hard sounds leave more room for slips the transcript cannot show
+    score -= min(1.0, 0.1 * len(difficult) * per_hundred)
+    if timing is None:
+        score = min(score, UNTIMED_MAX_SCORE)
+    else:
+        wpm = timing["words_per_minute"]
+        if wpm < 100:
+            score -= min(2.0, (100 - wpm) / 20)
+        elif wpm > 190:
+            score -= min(1.0, (wpm - 190) / 30)
+        long_pauses_per_minute = timing["long_pause_count"] * 60 / timing["speaking_seconds"]
+        score -= min(1.5, 0.25 * long_pauses_per_minute)
+    return max(4.0, min(9.0, round(score * 2) / 2))
+
+
+def feedback_text(difficult: List[dict], text: dict, timing: Optional[dict]) -> str:
+    sentences = []
+    if text["word_count"] < MIN_SCORED_WORDS:
+        sentences.append("There is too little speech to give a band; answer in a few full sentences.")
+    if timing is not None:
+        if timing["words_per_minute"] < 100:
+            sentences.append("You are speaking quite slowly; aim for a steady, natural pace.")
+        elif timing["words_per_minute"] > 190:
+            sentences.append("You are speaking very fast; slow down a little so every word is clear.")
+        if timing["long_pause_count"]:
+            sentences.append(f"You paused for more than a second {timing['long_pause_count']} time(s); "
+                             f"short linking phrases can help you keep going.")
+    if text["filler_count"] * 100 / max(text["word_count"], 1) > 3:
+        sentences.append("Try to use fewer fillers such as 'um' and 'you know'.")
+    if difficult:
+        tags: Dict[str, List[str]] = {}
+        for entry in difficult:
+            for tag in entry["tags"]:
+                words = tags.setdefault(tag, [])
+                if entry["word"] not in words:
+                    words.append(entry["word"])
+        tag, words = max(tags.items(), key=lambda item: len(item[1]))
+        examples = ", ".join(f"'{word}'" for word in words[:3])
+        sentences.append(f"Practise {TAG_DESCRIPTIONS.get(tag, tag)} in words like {examples}.")
+    if not sentences:
+        return "Your pronunciation is generally clear. Keep working on natural word stress and intonation."
+    return " ".join(sentences)
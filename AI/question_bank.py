@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+import random
+import re
+from array import array
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from metrics import QUESTION_BANK_DRAWS, part_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTION_BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "question_bank.tsv")
+
+# (part, topic, count) -> model output with one question per line
+QuestionGenerator = Callable[[int, str, int], Awaitable[str]]
+
+_LIST_MARKER = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Key for spotting the same question with different case or punctuation"""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def parse_questions(text: str) -> List[str]:
+    """Questions from model output, one per line, without list numbering, quotes or stray lines"""
+    questions = []
+    for line in text.splitlines():
+        line = _LIST_MARKER.sub("", line).strip().strip('"').strip()
+        # Preambles such as "Here are 8 questions:" are not questions
+        if len(line) >= 12 and not line.endswith(":"):
+            questions.append(line)
+    return questions
+
+
+class BankQuestion(NamedTuple):
+    id: int
+    part: int
+    topic: str
+    text: str
+
+
+class QuestionBank:
+    """Examiner questions and Part 2 cue cards generated ahead of time, by part and topic.
+
+    Question texts are kept once in a list and each (part, topic) holds an
+    array of their ids, so the questions a session has been asked are one int
+    used as a bitmask, and ``draw`` picks an unseen question without a model
+    call. A topic runs low when a draw finds fewer than ``low_water``
+    questions the session has not seen, or it holds fewer than
+    ``min_per_topic``; it is then queued for the background worker, which
+    asks ``generate`` for ``refill_batch`` more (up to ``max_per_topic``) and
+    drops any the bank already has.
+    """
+
+    def __init__(self, generate: Optional[QuestionGenerator] = None, low_water: int = 3, min_per_topic: int = 8,
+                 refill_batch: int = 8, max_per_topic: int = 64):
+        self.generate = generate
+        self.low_water = low_water
+        self.min_per_topic = min_per_topic
+        self.refill_batch = refill_batch
+        self.max_per_topic = max_per_topic
+        self.texts: List[str] = []
+        self._topics: Dict[Tuple[int, str], array] = {}
+        self._ids: Dict[str, int] = {}
+        self._refill_queue: asyncio.Queue = asyncio.Queue()
+        self._refills_pending: set = set()
+        self._worker: Optional[asyncio.Task] = None
+        self.draws = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_failures = 0
+        self.generated = 0
+        self.duplicates = 0
+
+    @classmethod
+    def from_env(cls, generate: Optional[QuestionGenerator] = None) -> Optional["QuestionBank"]:
+        """Seed questions from QUESTION_BANK_PATH, refill settings from QUESTION_BANK_*;
+        QUESTION_BANK=0 turns the bank off"""
+        if os.getenv("QUESTION_BANK", "1") == "0":
+            return None
+        bank = cls(
+            generate,
+            low_water=int(os.getenv("QUESTION_BANK_LOW_WATER", "3")),
+            min_per_topic=int(os.getenv("QUESTION_BANK_MIN_PER_TOPIC", "8")),
+            refill_batch=int(os.getenv("QUESTION_BANK_REFILL_BATCH", "8")),
+            max_per_topic=int(os.getenv("QUESTION_BANK_MAX_PER_TOPIC", "64")),
+        )
+        bank.load(os.getenv("QUESTION_BANK_PATH", DEFAULT_QUESTION_BANK_PATH))
+        return bank
+
+    def load(self, path: str) -> int:
+        """Add the questions of a ``part<TAB>topic<TAB>question`` file (# for comments)"""
+        added = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                part, topic, text = line.split("\t")
+                added += self.add(int(part), topic, text)
+        return added
+
+    def add(self, part: int, topic: str, text: str) -> bool:
+        """Store a question unless the bank already has it or the topic is full"""
+        key = normalize_question(text)
+        if not key or key in self._ids:
+            self.duplicates += 1
+            return False
+        ids = self._topics.setdefault((part, topic), array("I"))
+        if len(ids) >= self.max_per_topic:
+            return False
+        self._ids[key] = len(self.texts)
+        ids.append(len(self.texts))
+        self.texts.append(text)
+        return True
+
+    def topics(self, part: int) -> List[str]:
+        return [topic for topic_part, topic in self._topics if topic_part == part]
+
+    def seen_mask(self, texts: Iterable[str]) -> int:
+        """Bitmask of the bank questions among ``texts`` (questions already asked). A message
+        matches on its whole text or on what follows any of its sentences, since questions may
+        come after a lead-in ("Let's talk about <topic>." in Part 1)"""
+        mask = 0
+        for text in texts:
+            sentences = _SENTENCE_BREAK.split(text.strip())
+            for start in range(len(sentences)):
+                question_id = self._ids.get(normalize_question(" ".join(sentences[start:])))
+                if question_id is not None:
+                    mask |= 1 << question_id
+                    break
+        return mask
+
+    def draw(self, part: int, topic: Optional[str] = None, seen: int = 0,
+             exclude_topic: Optional[str] = None) -> Optional[BankQuestion]:
+        """A random question for ``part`` whose bit is not set in ``seen``: from ``topic`` while
+        it has one, else from a random topic other than ``exclude_topic``; None if there is none"""
+        topics = [name for name in self.topics(part) if name != topic and name != exclude_topic]
+        random.shuffle(topics)
+        if topic is not None:
+            topics.insert(0, topic)
+        for name in topics:
+            ids = self._topics.get((part, name))
+            if ids is None:
+                continue
+            unseen = [question_id for question_id in ids if not seen >> question_id & 1]
+            if len(unseen) < self.low_water or len(ids) < self.min_per_topic:
+                self.request_refill(part, name)
+            if unseen:
+                self.draws += 1
+                QUESTION_BANK_DRAWS.inc(part=part_name(part), outcome="hit")
+                question_id = random.choice(unseen)
+                return BankQuestion(question_id, part, name, self.texts[question_id])
+        self.misses += 1
+        QUESTION_BANK_DRAWS.inc(part=part_name(part), outcome="miss")
+        return None
+
+    def request_refill(self, part: int, topic: str):
+        """Queue a topic for the background worker (once, however many draws find it low)"""
+        key = (part, topic)
+        if self.generate is None or key in self._refills_pending:
+            return
+        if len(self._topics.get(key, ())) >= self.max_per_topic:
+            return
+        self._refills_pending.add(key)
+        self._refill_queue.put_nowait(key)
+
+    def start(self):
+        """Start the refill worker and top up every topic below ``min_per_topic``"""
+        if self.generate is None:
+            return
+        self._worker = asyncio.create_task(self._refill_loop())
+        for (part, topic), ids in list(self._topics.items()):
+            if len(ids) < self.min_per_topic:
+                self.request_refill(part, topic)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def _refill_loop(self):
+        # One topic at a time: refills are background work and should not compete with sessions
+        while True:
+            part, topic = await self._refill_queue.get()
+            try:
+                await self._refill(part, topic)
+            except Exception as e:
+                self.refill_failures += 1
+                logger.error(f"Question bank refill failed for Part {part} '{topic}': {e}")
+            finally:
+                self._refills_pending.discard((part, topic))
+
+    async def _refill(self, part: int, topic: str):
+        room = self.max_per_topic - len(self._topics.get((part, topic), ()))
+        if room <= 0:
+            return
+        output = await self.generate(part, topic, min(self.refill_batch, room))
+        added = sum(self.add(part, topic, text) for text in parse_questions(output))
+        self.refills += 1
+        self.generated += added
+        logger.info(f"Question bank: {added} new questions for Part {part} '{topic}'")
+
+    def stats(self) -> dict:
+        by_part: Dict[str, int] = {}
+        for (part, _), ids in self._topics.items():
+            by_part[str(part)] = by_part.get(str(part), 0) + len(ids)
+        return {
+            "questions": len(self.texts),
+            "questions_by_part": by_part,
+            "topics": len(self._topics),
+            "draws": self.draws,
+            "misses": self.misses,
+            "refills_pending": len(self._refills_pending),
+            "refills": self.refills,
+            "refill_failures": self.refill_failures,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+        }
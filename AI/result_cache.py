@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+
+def normalize_text(value: Any) -> Any:
+    """Case- and whitespace-insensitive form of a prompt input"""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    return value
+
+
+class ResultCache:
+    """TTL + LRU cache for model results, with single-flight coalescing.
+
+    Concurrent requests for a key that is still being computed share the one
+    in-flight call instead of starting their own. Only successful results are
+    stored; cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @classmethod
+    def from_env(cls, name: str, ttl_seconds: float = 300.0, max_entries: int = 1024) -> "ResultCache":
+        """Per-endpoint settings from RESULT_CACHE_<NAME>_TTL and RESULT_CACHE_<NAME>_MAX_ENTRIES
+        (a TTL of 0 turns caching off but keeps coalescing)"""
+        prefix = "RESULT_CACHE_" + name.upper().replace("-", "_")
+        return cls(
+            name,
+            max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", str(max_entries))),
+            ttl_seconds=float(os.getenv(f"{prefix}_TTL", str(ttl_seconds))),
+        )
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        normalized = [normalize_text(part) for part in parts]
+        return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # Shielded so one caller going away does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, task.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Mapping, Optional
+
+from metrics import SCHEDULER_WAIT_SECONDS
+from prompt_builder import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Lower numbers are admitted first; within a priority, sessions take turns
+PRIORITY_VOICE = 0        # live WebSocket turns
+PRIORITY_INTERACTIVE = 1  # REST calls a user is waiting on
+PRIORITY_FEEDBACK = 2     # /realtime-feedback
+PRIORITY_BACKGROUND = 3   # summaries, cache prewarming, analytics
+PRIORITY_NAMES = {PRIORITY_VOICE: "voice", PRIORITY_INTERACTIVE: "interactive",
+                  PRIORITY_FEEDBACK: "feedback", PRIORITY_BACKGROUND: "background"}
+
+# Set where a turn or request starts and inherited by every task it creates, like the metric labels
+call_priority: ContextVar[int] = ContextVar("call_priority", default=PRIORITY_INTERACTIVE)
+call_session: ContextVar[str] = ContextVar("call_session", default="")
+# Told True when a call has to wait in the queue and False once it is admitted (set by CallPolicy per attempt)
+call_queued: ContextVar[Optional[Callable[[bool], None]]] = ContextVar("call_queued", default=None)
+
+_DURATION_PART = re.compile(r"([\d.]+)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+_MODEL_LIMIT = re.compile(r"^\d+(\.\d+)?/\d+(\.\d+)?$")
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds from a rate-limit reset header ("7.66s", "2m59.56s", "120ms" or plain seconds)"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def chat_tokens(messages: List[dict], max_tokens: int) -> int:
+    """Tokens a chat call counts against the quota: the estimated prompt plus the completion limit"""
+    return sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages) + max_tokens
+
+
+class TokenBucket:
+    """``capacity`` units, refilled continuously at ``rate`` per second"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` (at most the capacity) is available"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate > 0 else (0.0 if missing <= 0 else float("inf"))
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def set_limit(self, capacity: float, rate: float, now: float):
+        self._refill(now)
+        self.capacity, self.rate = capacity, rate
+        self.level = min(self.level, capacity)
+
+    def lower_to(self, level: float, now: float):
+        """Take the provider's remaining count when it is below ours (other workers use it too)"""
+        self._refill(now)
+        self.level = min(self.level, level)
+
+
+class ModelLimiter:
+    """Request and token budget for one model, with its queue of waiting calls.
+
+    Waiting calls are grouped by priority, then by session; the pump serves
+    the highest priority first and, within it, one call per session in turn,
+    so one busy session cannot take a whole minute's quota.
+    """
+
+    def __init__(self, model: str, requests_per_minute: float, tokens_per_minute: float):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.paused_until = 0.0
+        # priority -> session -> waiting [future, tokens, enqueued_at]
+        self._waiting: Dict[int, "OrderedDict[str, deque]"] = {}
+        self._pump_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.admitted = 0
+        self.queued_calls = 0
+        self.rate_limited = 0
+
+    def queued(self) -> int:
+        return sum(len(calls) for sessions in self._waiting.values() for calls in sessions.values())
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        return max(self.paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def _grant(self, tokens: int, now: float):
+        self.requests.take(1, now)
+        self.tokens.take(tokens, now)
+        self.admitted += 1
+
+    async def admit(self, tokens: int, priority: int, session: str):
+        now = time.monotonic()
+        if not self._waiting and self._wait_time(tokens, now) == 0:
+            self._grant(tokens, now)
+            SCHEDULER_WAIT_SECONDS.observe(0.0, model=self.model, priority=PRIORITY_NAMES.get(priority, ""))
+            return
+        future = asyncio.get_running_loop().create_future()
+        sessions = self._waiting.setdefault(priority, OrderedDict())
+        sessions.setdefault(session, deque()).append([future, tokens, now])
+        self.queued_calls += 1
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        notify = call_queued.get()
+        if notify is not None:
+            notify(True)
+        # A cancelled caller leaves its future behind; the pump skips it
+        await future
+        if notify is not None:
+            notify(False)
+
+    def _next_call(self) -> Optional[list]:
+        """Head of the highest-priority queue, next session in turn; drops cancelled calls"""
+        for priority in sorted(self._waiting):
+            sessions = self._waiting[priority]
+            while sessions:
+                session, calls = next(iter(sessions.items()))
+                while calls and calls[0][0].done():
+                    calls.popleft()
+                if not calls:
+                    del sessions[session]
+                    continue
+                return [priority, session, calls]
+            del self._waiting[priority]
+        return None
+
+    async def _pump(self):
+        while True:
+            head = self._next_call()
+            if head is None:
+                return
+            priority, session, calls = head
+            future, tokens, enqueued_at = calls[0]
+            now = time.monotonic()
+            wait = self._wait_time(tokens, now)
+            if wait > 0:
+                # Header updates can lower or lift the wait, so wake early on them
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            calls.popleft()
+            sessions = self._waiting[priority]
+            # Round robin: this session goes to the back of its priority
+            if calls:
+                sessions.move_to_end(session)
+            else:
+                del sessions[session]
+            if future.done():
+                continue
+            self._grant(tokens, now)
+            SCHEDULER_WAIT_SECONDS.observe(now - enqueued_at, model=self.model,
+                                           priority=PRIORITY_NAMES.get(priority, ""))
+            future.set_result(None)
+
+    def observe(self, headers: Mapping[str, str], status: int = 200):
+        """Adapt to the provider's x-ratelimit-* and retry-after headers"""
+        now = time.monotonic()
+        limit_tokens = headers.get("x-ratelimit-limit-tokens")
+        if limit_tokens:
+            # Groq's token limit is per minute
+            tpm = float(limit_tokens)
+            if tpm != self.tokens.capacity:
+                logger.info(f"Token limit for {self.model} is {tpm:.0f}/min")
+                self.tokens.set_limit(tpm, tpm / 60, now)
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_tokens:
+            self.tokens.lower_to(float(remaining_tokens), now)
+            if float(remaining_tokens) <= 0:
+                self._pause(parse_reset(headers.get("x-ratelimit-reset-tokens")), now)
+        # Groq's request limit is per day: only its exhaustion matters here
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        if remaining_requests and float(remaining_requests) <= 0:
+            self._pause(parse_reset(headers.get("x-ratelimit-reset-requests")), now)
+        if status == 429:
+            self.rate_limited += 1
+            self._pause(parse_reset(headers.get("retry-after")) or 1.0, now)
+        self._wakeup.set()
+
+    def _pause(self, seconds: Optional[float], now: float):
+        if seconds:
+            if now + seconds > self.paused_until:
+                logger.warning(f"Rate limit reached for {self.model}, holding calls for {seconds:.1f}s")
+            self.paused_until = max(self.paused_until, now + seconds)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity,
+            "tokens_available": round(self.tokens.level),
+            "paused_seconds": round(max(0.0, self.paused_until - now), 2),
+            "queued": {PRIORITY_NAMES.get(priority, str(priority)): sum(len(calls) for calls in sessions.values())
+                       for priority, sessions in self._waiting.items()},
+            "admitted": self.admitted,
+            "queued_calls": self.queued_calls,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class Scheduler:
+    """Admission control for model calls across every session and endpoint on this worker.
+
+    ``admit`` returns at once while the model's request and token buckets
+    have room, and otherwise queues the call by priority and session (read
+    from ``call_priority`` and ``call_session``). Limits start from
+    configuration and follow the provider's rate-limit headers.
+    """
+
+    def __init__(self, requests_per_minute: float = 1000, tokens_per_minute: float = 300000,
+                 model_limits: Optional[Dict[str, tuple]] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.model_limits = model_limits or {}
+        self.limiters: Dict[str, ModelLimiter] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["Scheduler"]:
+        """RATE_LIMIT_RPM / RATE_LIMIT_TPM per model, RATE_LIMIT_<MODEL>=rpm/tpm for one model;
+        SCHEDULER=0 turns admission control off"""
+        if os.getenv("SCHEDULER", "1") == "0":
+            return None
+        model_limits = {}
+        for key, value in os.environ.items():
+            if key.startswith("RATE_LIMIT_") and key not in ("RATE_LIMIT_RPM", "RATE_LIMIT_TPM"):
+                # Other tools share the RATE_LIMIT_ prefix: only rpm/tpm pairs are model limits
+                if not _MODEL_LIMIT.match(value.strip()):
+                    logger.warning(f"Ignoring {key}={value!r}: per-model rate limits are rpm/tpm, e.g. 30/6000")
+                    continue
+                rpm, tpm = value.strip().split("/")
+                model_limits[key[len("RATE_LIMIT_"):]] = (float(rpm), float(tpm))
+        return cls(float(os.getenv("RATE_LIMIT_RPM", "1000")), float(os.getenv("RATE_LIMIT_TPM", "300000")),
+                   model_limits)
+
+    def limiter(self, model: str) -> ModelLimiter:
+        limiter = self.limiters.get(model)
+        if limiter is None:
+            rpm, tpm = self.model_limits.get(re.sub(r"\W", "_", model).upper(),
+                                             (self.requests_per_minute, self.tokens_per_minute))
+            limiter = self.limiters[model] = ModelLimiter(model, rpm, tpm)
+        return limiter
+
+    async def admit(self, model: str, tokens: int = 0):
+        await self.limiter(model).admit(tokens, call_priority.get(), call_session.get())
+
+    def observe(self, model: str, headers: Mapping[str, str], status: int = 200):
+        self.limiter(model).observe(headers, status)
+
+    def queued(self) -> int:
+        return sum(limiter.queued() for limiter in self.limiters.values())
+
+    def stats(self) -> dict:
+        return {model: limiter.stats() for model, limiter in self.limiters.items()}
@@ -0,0 +1,46 @@
+import re
+from typing import List
+
+# End of a sentence: terminal punctuation (optionally closed by a quote or
+# bracket) followed by whitespace
+SENTENCE_END = re.compile(r"""[.!?]+["')\]]*\s+""")
+
+# Abbreviations that end in a full stop but do not end the sentence
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "prof.", "st.", "e.g.", "i.e.", "etc.", "vs.", "approx."}
+
+
+class SentenceSplitter:
+    """Incrementally split streamed text into sentences.
+
+    ``feed`` takes each token delta as it arrives and returns the sentences it
+    completed; ``flush`` returns whatever is left once the stream ends.
+    Sentences shorter than ``min_chars`` are joined with the next one, so
+    short interjections ("Right.") do not become separate TTS calls.
+    """
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self.buffer = ""
+        self.scan_from = 0
+
+    def feed(self, delta: str) -> List[str]:
+        self.buffer += delta
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer, self.scan_from):
+            candidate = self.buffer[start:match.end()].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower() if candidate else ""
+            if len(candidate) < self.min_chars or last_word in ABBREVIATIONS:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        # Only rescan the tail: a boundary needs the whitespace after it
+        self.scan_from = max(0, len(self.buffer) - 1)
+        return sentences
+
+    def flush(self) -> str:
+        rest = self.buffer.strip()
+        self.buffer = ""
+        self.scan_from = 0
+        return rest
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_ARCHIVE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "session_archive.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_records (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_records_session ON session_records (session_id, recorded_at);
+CREATE INDEX IF NOT EXISTS session_records_time ON session_records (recorded_at);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # With WAL, NORMAL only risks the last commits on power loss, never corruption
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+def _row_to_record(row) -> dict:
+    record_id, session_id, kind, recorded_at, payload = row
+    return {"id": record_id, "session_id": session_id, "kind": kind,
+            "recorded_at": recorded_at, "data": json.loads(payload)}
+
+
+class SessionArchive:
+    """Append-only SQLite (WAL) archive of finished and saved sessions.
+
+    ``submit`` only queues the record, so callers on the WebSocket loop never
+    wait for disk. A single writer drains the queue in batches of up to
+    ``batch_max`` records (waiting at most ``flush_ms`` to fill one) and
+    commits each batch in one transaction on its own thread. Reads use a
+    separate connection and thread, which WAL lets run alongside the writer.
+    """
+
+    def __init__(self, path: str, batch_max: int = 512, flush_ms: float = 50.0, max_queue: int = 100000):
+        self.path = path
+        self.batch_max = batch_max
+        self.flush_ms = flush_ms
+        self._queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self._writer_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-archive-writer")
+        self._reader_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-archive-reader")
+        self._write_conn: Optional[sqlite3.Connection] = None
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.records_written = 0
+        self.batches_written = 0
+        self.records_dropped = 0
+        self.write_errors = 0
+        self.last_commit_ms = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["SessionArchive"]:
+        """Archive at SESSION_ARCHIVE_PATH (default data/session_archive.db next to this module;
+        empty to turn it off)"""
+        path = os.getenv("SESSION_ARCHIVE_PATH", DEFAULT_SESSION_ARCHIVE_PATH)
+        if not path:
+            return None
+        return cls(
+            path,
+            batch_max=int(os.getenv("SESSION_ARCHIVE_BATCH_MAX", "512")),
+            flush_ms=float(os.getenv("SESSION_ARCHIVE_FLUSH_MS", "50")),
+        )
+
+    async def _in_writer(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._writer_thread, fn, *args)
+
+    async def _in_reader(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._reader_thread, fn, *args)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_conn = _connect(self.path)
+        self._write_conn.executescript(SCHEMA)
+        self._read_conn = _connect(self.path)
+
+    async def start(self):
+        await self._in_writer(self._open)
+        self._writer = asyncio.create_task(self._write_loop())
+        logger.info(f"Session archive at {self.path}")
+
+    def submit(self, session_id: str, kind: str, data: dict) -> bool:
+        """Queue a record for the writer; never blocks. False if the queue is full.
+        ``data`` is serialised later on the writer thread, so it must not be changed afterwards."""
+        try:
+            self._queue.put_nowait((session_id, kind, time.time(), data))
+            return True
+        except asyncio.QueueFull:
+            self.records_dropped += 1
+            logger.warning(f"Session archive queue full, dropped {kind} record for {session_id}")
+            return False
+
+    def _write_batch(self, batch: list):
+        start = time.perf_counter()
+        rows = [(session_id, kind, recorded_at, json.dumps(data, default=str))
+                for session_id, kind, recorded_at, data in batch]
+        conn = self._write_conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO session_records (session_id, kind, recorded_at, payload) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.last_commit_ms = (time.perf_counter() - start) * 1000
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, asyncio.Future):
+                # flush(): everything queued before it has been written
+                if not item.done():
+                    item.set_result(None)
+                continue
+            batch, flushed = [item], []
+            flush_at = loop.time() + self.flush_ms / 1000
+            while len(batch) < self.batch_max:
+                if self._queue.empty():
+                    remaining = flush_at - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is None:
+                    # close(): everything queued before it is in this batch
+                    stopping = True
+                    break
+                if isinstance(item, asyncio.Future):
+                    flushed.append(item)
+                    break
+                batch.append(item)
+            try:
+                await self._in_writer(self._write_batch, batch)
+                self.records_written += len(batch)
+                self.batches_written += 1
+            except Exception as e:
+                self.write_errors += 1
+                logger.error(f"Session archive write of {len(batch)} records failed: {e}")
+            for written in flushed:
+                if not written.done():
+                    written.set_result(None)
+
+    async def flush(self):
+        """Wait until everything submitted so far has been written"""
+        if self._writer is None or self._writer.done():
+            return
+        written = asyncio.get_running_loop().create_future()
+        await self._queue.put(written)
+        await written
+
+    async def close(self):
+        """Write what is still queued, then close the database"""
+        if self._writer is not None:
+            await self._queue.put(None)
+            await self._writer
+        for conn in (self._write_conn, self._read_conn):
+            if conn is not None:
+                conn.close()
+        self._writer_thread.shutdown()
+        self._reader_thread.shutdown()
+
+    def _query(self, session_id: Optional[str], since: Optional[float], until: Optional[float],
+               after: Optional[tuple], limit: int, kind: Optional[str] = None) -> List[dict]:
+        # Keyset pagination on (recorded_at, id), which both indexes cover
+        clauses, params = ["1"], []
+        if after is not None:
+            clauses.append("(recorded_at, id) > (?, ?)")
+            params.extend(after)
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if since is not None:
+            clauses.append("recorded_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("recorded_at < ?")
+            params.append(until)
+        rows = self._read_conn.execute(
+            f"SELECT id, session_id, kind, recorded_at, payload FROM session_records "
+            f"WHERE {' AND '.join(clauses)} ORDER BY recorded_at, id LIMIT ?", params + [limit]).fetchall()
+        return [_row_to_record(row) for row in rows]
+
+    async def lookup(self, session_id: Optional[str] = None, since: Optional[float] = None,
+                     until: Optional[float] = None, limit: int = 100) -> List[dict]:
+        """Records for one session and/or a time range (epoch seconds, ``until`` exclusive), oldest first"""
+        return await self._in_reader(self._query, session_id, since, until, None, limit)
+
+    async def transcript(self, session_id: str, page_size: int = 1000) -> List[dict]:
+        """Every turn of a session in order, including those still queued for the writer"""
+        await self.flush()
+        turns, after = [], None
+        while True:
+            page = await self._in_reader(self._query, session_id, None, None, after, page_size, "turn")
+            turns.extend({key: value for key, value in record["data"].items() if key != "turn"} for record in page)
+            if len(page) < page_size:
+                return turns
+            after = (page[-1]["recorded_at"], page[-1]["id"])
+
+    async def export(self, since: Optional[float] = None, until: Optional[float] = None,
+                     page_size: int = 1000) -> AsyncIterator[dict]:
+        """Every record in the range, read a page at a time so memory stays flat"""
+        after = None
+        while True:
+            page = await self._in_reader(self._query, None, since, until, after, page_size)
+            for record in page:
+                yield record
+            if len(page) < page_size:
+                return
+            after = (page[-1]["recorded_at"], page[-1]["id"])
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "records_written": self.records_written,
+            "batches_written": self.batches_written,
+            "mean_batch_size": round(self.records_written / self.batches_written, 1) if self.batches_written else 0.0,
+            "last_commit_ms": round(self.last_commit_ms, 2),
+            "records_dropped": self.records_dropped,
+            "write_errors": self.write_errors,
+        }
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from conversation import ConversationHistory
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Only needed for SESSION_STORE=redis
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+ControlHandler = Callable[[dict], Awaitable[None]]
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ConversationHistory):
+        return value.to_dict()
+    return str(value)
+
+
+def serialize_session(session: dict) -> str:
+    """JSON snapshot of the shareable parts of a session"""
+    return json.dumps(session, default=_encode_value)
+
+
+def deserialize_session(data: str) -> dict:
+    session = json.loads(data)
+    if isinstance(session.get("connected_at"), str):
+        session["connected_at"] = datetime.fromisoformat(session["connected_at"])
+    if isinstance(session.get("conversation_history"), dict):
+        session["conversation_history"] = ConversationHistory.from_dict(session["conversation_history"])
+    return session
+
+
+class SessionStore:
+    """Session state and control messages shared by every worker.
+
+    The worker holding a session's WebSocket owns the live state and writes
+    snapshots here; any worker can read them, and ``publish`` reaches the
+    ``subscribe`` handlers of all workers (e.g. to end a session held
+    elsewhere).
+    """
+
+    async def save(self, session_id: str, session: dict):
+        raise NotImplementedError
+
+    async def load(self, session_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def delete(self, session_id: str):
+        raise NotImplementedError
+
+    async def publish(self, message: dict):
+        raise NotImplementedError
+
+    async def subscribe(self, handler: ControlHandler):
+        """Deliver control messages to ``handler`` until cancelled"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Single-process store: the default, and what one uvicorn worker needs"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._handlers = []
+
+    async def save(self, session_id: str, session: dict):
+        self._sessions[session_id] = serialize_session(session)
+
+    async def load(self, session_id: str) -> Optional[dict]:
+        data = self._sessions.get(session_id)
+        return deserialize_session(data) if data is not None else None
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    async def publish(self, message: dict):
+        for handler in list(self._handlers):
+            await handler(message)
+
+    async def subscribe(self, handler: ControlHandler):
+        self._handlers.append(handler)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._handlers.remove(handler)
+
+
+class RedisSessionStore(SessionStore):
+    """Store backed by any Redis-protocol server (Redis, Valkey, KeyDB, ...)"""
+
+    def __init__(self, url: str, prefix: str = "ielts", ttl_seconds: int = 4 * 3600):
+        if aioredis is None:
+            raise RuntimeError("SESSION_STORE=redis needs the 'redis' package")
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.channel = f"{prefix}:session-control"
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}:session:{session_id}"
+
+    async def save(self, session_id: str, session: dict):
+        await self.redis.set(self._key(session_id), serialize_session(session), ex=self.ttl_seconds)
+
+    async def load(self, session_id: str) -> Optional[dict]:
+        data = await self.redis.get(self._key(session_id))
+        return deserialize_session(data) if data is not None else None
+
+    async def delete(self, session_id: str):
+        await self.redis.delete(self._key(session_id))
+
+    async def publish(self, message: dict):
+        await self.redis.publish(self.channel, json.dumps(message))
+
+    async def subscribe(self, handler: ControlHandler):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        try:
+            async for item in pubsub.listen():
+                try:
+                    await handler(json.loads(item["data"]))
+                except Exception as e:
+                    logger.error(f"Session control message failed: {e}")
+        finally:
+            await pubsub.aclose()
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def session_store_from_env() -> SessionStore:
+    """SESSION_STORE=memory (default) or redis, with REDIS_URL"""
+    backend = os.getenv("SESSION_STORE", "memory")
+    if backend == "redis":
+        return RedisSessionStore(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            prefix=os.getenv("SESSION_STORE_PREFIX", "ielts"),
+            ttl_seconds=int(os.getenv("SESSION_TTL_SECONDS", str(4 * 3600))),
+        )
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
+    return InMemorySessionStore()
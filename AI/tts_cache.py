@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """Content-addressed cache for synthesized speech.
+
+    Entries are keyed by a hash of (model, voice, text). The memory tier is an
+    LRU bounded by total bytes; the optional disk tier keeps one file per
+    entry under ``disk_dir`` so it survives restarts. Disk reads and writes run
+    in worker threads, and an index of the files in write order (built once at
+    startup) keeps the running size, so evicting the least recently written
+    files past ``disk_max_bytes`` never walks the directory.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.disk_entries = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # key -> size of each disk entry, oldest write first
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_lock = threading.Lock()
+        self._disk_writes: set = set()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            files = []
+            for path in self._disk_files():
+                stat = os.stat(path)
+                files.append((stat.st_mtime, os.path.basename(path)[:-len(".audio")], stat.st_size))
+            for _, key, size in sorted(files):
+                self._disk_index[key] = size
+                self.disk_bytes += size
+            self.disk_entries = len(self._disk_index)
+
+    @classmethod
+    def from_env(cls) -> "TTSCache":
+        """Build a cache from TTS_CACHE_* environment variables"""
+        return cls(
+            max_bytes=int(float(os.getenv("TTS_CACHE_MAX_MB", "64")) * 1024 * 1024),
+            disk_dir=os.getenv("TTS_CACHE_DIR") or None,
+            disk_max_bytes=int(float(os.getenv("TTS_CACHE_DISK_MAX_MB", "1024")) * 1024 * 1024),
+        )
+
+    @staticmethod
+    def key(text: str, voice: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{voice}\0{text}".encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return audio
+        audio = None
+        if key in self._disk_index:
+            audio = await asyncio.to_thread(self._read_disk, key)
+        if audio is not None:
+            self.disk_hits += 1
+            self._remember(key, audio)
+            return audio
+        self.misses += 1
+        return None
+
+    def put(self, key: str, audio: bytes):
+        """Store in memory now and write the disk entry in the background"""
+        if not audio:
+            return
+        self._remember(key, audio)
+        if self.disk_dir and key not in self._disk_index:
+            task = asyncio.create_task(asyncio.to_thread(self._write_disk, key, audio))
+            self._disk_writes.add(task)
+            task.add_done_callback(self._disk_writes.discard)
+
+    async def flush(self):
+        """Wait for pending disk writes"""
+        if self._disk_writes:
+            await asyncio.gather(*self._disk_writes, return_exceptions=True)
+
+    def _remember(self, key: str, audio: bytes):
+        if len(audio) > self.max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous)
+        self._memory[key] = audio
+        self.memory_bytes += len(audio)
+        while self.memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".audio")
+
+    def _disk_files(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".audio"):
+                    yield os.path.join(root, name)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read() or None
+        except FileNotFoundError:
+            # Removed behind our back: forget it so later lookups skip the disk
+            with self._disk_lock:
+                self._forget_disk(key)
+            return None
+        except OSError as e:
+            logger.warning(f"TTS cache read failed for {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, audio: bytes):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a crash never leaves a truncated entry behind
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"TTS cache write failed for {key}: {e}")
+            return
+        with self._disk_lock:
+            self._forget_disk(key)
+            self._disk_index[key] = len(audio)
+            self.disk_bytes += len(audio)
+            self.disk_entries += 1
+            if self.disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _forget_disk(self, key: str):
+        size = self._disk_index.pop(key, None)
+        if size is not None:
+            self.disk_bytes -= size
+            self.disk_entries -= 1
+
+    def _evict_disk(self):
+        # Called with _disk_lock held
+        while self._disk_index and self.disk_bytes > self.disk_max_bytes * 0.9:
+            key, size = self._disk_index.popitem(last=False)
+            self.disk_bytes -= size
+            self.disk_entries -= 1
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"TTS cache eviction failed for {key}: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "memory_bytes": self.memory_bytes,
+            "max_bytes": self.max_bytes,
+            "disk_entries": self.disk_entries,
+            "disk_bytes": self.disk_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }